@@ -5,7 +5,7 @@ from src.models.inventario import Inventario
 from src.models.cliente import Cliente
 from src.models.venta import Venta
 from src.models.proveedor import Proveedor
-from werkzeug.security import generate_password_hash
+from src.services.contrasenas import generar_hash
 
 with app.app_context():
     # Crear todas las tablas
@@ -19,7 +19,7 @@ with app.app_context():
         admin_user = User(
             username='admin',
             email='admin@farmacia.com',
-            password=generate_password_hash('admin123'),
+            password=generar_hash('admin123'),
             rol='admin'
         )
         
@@ -3,14 +3,16 @@ import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from src.models.user import db, User
-from werkzeug.security import generate_password_hash
+from src.services import base_datos
+from src.services.contrasenas import generar_hash
 from flask import Flask
 
 app = Flask(__name__)
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'src', 'database', 'app.db')}"
+base_datos.configurar(app)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db.init_app(app)
+base_datos.init_app(app)
 
 with app.app_context():
     # Verificar si ya existe un admin
@@ -21,7 +23,7 @@ with app.app_context():
         admin_user = User(
             username='admin',
             email='admin@farmacia.com',
-            password=generate_password_hash('admin123'),
+            password=generar_hash('admin123'),
             rol='admin'
         )
         
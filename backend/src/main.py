@@ -12,18 +12,30 @@ from src.models.cliente import Cliente
 from src.models.venta import Venta, VentaDetalle
 from src.models.proveedor import Proveedor, ListaPrecioProveedor
 from src.models.lista_proveedor import ListaProveedor
+from src.models.importacion import TrabajoImportacion
+from src.models.comparacion_precio import ComparacionPrecio
+from src.models.politica_reposicion import PoliticaReposicion
+from src.models.venta_diaria import VentaDiaria, VentaDiariaLaboratorio, VentaDiariaPago
+from src.models.migracion import MigracionEsquema
 from src.routes.user import user_bp
 from src.routes.farmacia import farmacia_bp
 from src.routes.inventario import inventario_bp
 from src.routes.lista_comparativa import lista_comparativa_bp
 from src.routes.proveedor import proveedor_bp
 from src.routes.reportes import reportes_bp
+from src.routes.importacion import importacion_bp
+from src.routes.reposicion import reposicion_bp
+from src.routes.venta import venta_bp
+from src.routes.analitica import analitica_bp
+from src.services import importaciones, busqueda, contador_consultas, comparacion_precios, normalizacion, resumen_ventas, esquema, base_datos, autenticacion, contrasenas, cache_respuestas, permisos
 
 app = Flask(__name__, static_folder=os.path.join(os.path.dirname(__file__), 'static'))
 app.config['SECRET_KEY'] = 'asdf#FGSgvasgf$5$WGT'
+# Con AUTH_REQUERIDA=1 cada ruta exige el token de /auth/login y el permiso que declara
+app.config['AUTH_REQUERIDA'] = os.environ.get('AUTH_REQUERIDA') == '1'
 
 # Enable CORS for all routes
-CORS(app)
+CORS(app, expose_headers=['X-Total-Count', 'X-Next-Cursor', 'ETag'])
 
 app.register_blueprint(user_bp, url_prefix='/api')
 app.register_blueprint(farmacia_bp, url_prefix='/api')
@@ -31,16 +43,48 @@ app.register_blueprint(inventario_bp, url_prefix='/api')
 app.register_blueprint(lista_comparativa_bp, url_prefix='/api')
 app.register_blueprint(proveedor_bp, url_prefix='/api')
 app.register_blueprint(reportes_bp, url_prefix='/api')
+app.register_blueprint(importacion_bp, url_prefix='/api')
+app.register_blueprint(reposicion_bp, url_prefix='/api')
+app.register_blueprint(venta_bp, url_prefix='/api')
+app.register_blueprint(analitica_bp, url_prefix='/api')
 
-# uncomment if you need to use database
-app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(os.path.dirname(__file__), 'database', 'app.db')}"
+# Base de datos: SQLite local o DATABASE_URL (p. ej. Postgres); DB_PERFIL=produccion|basico
+base_datos.configurar(app)
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Header X-Consultas-SQL con el número de consultas de cada petición (diagnóstico)
+app.config['CONTAR_CONSULTAS'] = os.environ.get('CONTAR_CONSULTAS') == '1'
 db.init_app(app)
+# PRAGMAs de SQLite (WAL, busy_timeout, caché) en cada conexión
+base_datos.init_app(app)
+contador_consultas.init_app(app)
+# Versión de los permisos de cada usuario y caché de permisos efectivos
+permisos.init_app(app)
+autenticacion.init_app(app)
+# Hash de contraseñas (PASSWORD_METODO) en un pool acotado y límite de intentos de login
+contrasenas.init_app(app)
+# Caché de respuestas del dashboard con ETag, invalidada al confirmar escrituras en sus tablas
+cache_respuestas.init_app(app)
 with app.app_context():
     db.create_all()
 
+# Columnas e índices que create_all() no agrega a una base existente
+esquema.init_app(app)
+
+# Claves canónicas de producto para datos cargados antes de existir la columna
+normalizacion.init_app(app)
+# Índice de búsqueda de productos (FTS5 en SQLite, tsvector en Postgres)
+busqueda.init_app(app)
+# Tabla precalculada de la lista comparativa
+comparacion_precios.init_app(app)
+# Resúmenes diarios de ventas (pronóstico de los reportes y analítica)
+resumen_ventas.init_app(app)
+
+# Pool de importaciones en segundo plano (reanuda trabajos pendientes)
+importaciones.init_app(app)
+
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
+@autenticacion.ruta_publica
 def serve(path):
     static_folder_path = app.static_folder
     if static_folder_path is None:
@@ -0,0 +1,66 @@
+from src.models.user import db
+from src.services.normalizacion import LARGO_CLAVE
+
+class ComparacionPrecio(db.Model):
+    """Oferta precalculada de un producto por proveedor para la lista comparativa.
+
+    Se mantiene al cargar la lista de un proveedor o al cambiar sus descuentos
+    (ver src/services/comparacion_precios.py); nunca se edita directamente.
+    """
+    __tablename__ = 'comparacion_precio'
+    __table_args__ = (
+        # Lectura de la búsqueda: ofertas de cada producto ordenadas por precio (ranking de la respuesta)
+        db.Index('ix_comparacion_precio_clave_precio', 'clave_producto', 'precio_con_descuento_comercial'),
+        # Ofertas de los productos del inventario en la optimización de compras
+        db.Index('ix_comparacion_precio_clave_codigo', 'clave_codigo', 'proveedor_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    lista_proveedor_id = db.Column(db.Integer, db.ForeignKey('lista_proveedor.id'), nullable=False, unique=True)
+    proveedor_id = db.Column(db.Integer, db.ForeignKey('proveedor.id'), nullable=False, index=True)
+    proveedor_nombre = db.Column(db.String(100), nullable=True)
+    clave_producto = db.Column(db.String(LARGO_CLAVE), nullable=False)  # Copia de lista_proveedor.clave_producto
+    clave_codigo = db.Column(db.String(LARGO_CLAVE), nullable=True)  # Copia de lista_proveedor.clave_codigo
+    codigo = db.Column(db.String(50), nullable=False)
+    descripcion = db.Column(db.String(500), nullable=False)
+    laboratorio = db.Column(db.String(200))
+
+    # Precios con descuentos del proveedor aplicados
+    precio_original = db.Column(db.Float, nullable=False)
+    descuento_comercial = db.Column(db.Float, default=0.0)
+    descuento_pronto_pago = db.Column(db.Float, default=0.0)
+    precio_con_descuento_comercial = db.Column(db.Float, nullable=False)
+    precio_con_descuento_total = db.Column(db.Float, nullable=False)
+    ahorro_comercial = db.Column(db.Float, default=0.0)
+    ahorro_pronto_pago = db.Column(db.Float, default=0.0)
+    dias_credito = db.Column(db.Integer, default=0)
+    fecha_actualizacion = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<ComparacionPrecio {self.codigo} - {self.proveedor_nombre}>'
+
+    def to_dict(self, ranking, mejor_precio):
+        """Oferta para la respuesta; `ranking` (1 = mejor precio) y `mejor_precio` se calculan
+        entre las ofertas con las que se compara (p. ej. las de una búsqueda filtrada)"""
+        diferencia = self.precio_con_descuento_comercial - mejor_precio
+        porcentaje = (diferencia / mejor_precio) * 100 if mejor_precio > 0 else 0
+        oferta = {
+            'proveedor_id': self.proveedor_id,
+            'proveedor_nombre': self.proveedor_nombre,
+            'precio_original': self.precio_original,
+            'descuento_comercial': self.descuento_comercial or 0,
+            'descuento_pronto_pago': self.descuento_pronto_pago or 0,
+            'precio_con_descuento_comercial': self.precio_con_descuento_comercial,
+            'precio_con_descuento_total': self.precio_con_descuento_total,
+            'ahorro_comercial': self.ahorro_comercial,
+            'ahorro_pronto_pago': self.ahorro_pronto_pago,
+            'ahorro_total': self.ahorro_comercial + self.ahorro_pronto_pago,
+            'dias_credito': self.dias_credito or 0,
+            'fecha_actualizacion': self.fecha_actualizacion.isoformat() if self.fecha_actualizacion else None
+        }
+        if ranking == 1:
+            oferta['es_mejor_precio'] = True
+        else:
+            oferta['diferencia_con_mejor'] = diferencia
+            oferta['porcentaje_diferencia'] = porcentaje
+        return oferta
@@ -0,0 +1,48 @@
+from src.models.user import db
+from datetime import datetime
+import json
+
+class TrabajoImportacion(db.Model):
+    __tablename__ = 'trabajo_importacion'
+
+    id = db.Column(db.String(32), primary_key=True)
+    tipo = db.Column(db.String(30), nullable=False)  # inventario, lista_proveedor
+    referencia_id = db.Column(db.Integer, nullable=False)  # farmacia_id o proveedor_id según el tipo
+    nombre_archivo = db.Column(db.String(255), nullable=True)
+    archivo = db.Column(db.String(500), nullable=False)  # Ruta del archivo encolado
+    estado = db.Column(db.String(20), default='pendiente', index=True)  # pendiente, procesando, completado, error
+    filas_procesadas = db.Column(db.Integer, default=0)
+    errores = db.Column(db.Text, default='[]')  # JSON con los errores de fila
+    resultado = db.Column(db.Text, nullable=True)  # JSON con el resumen final
+    mensaje_error = db.Column(db.Text, nullable=True)
+    fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
+    fecha_inicio = db.Column(db.DateTime, nullable=True)
+    latido = db.Column(db.DateTime, nullable=True)  # Última señal del proceso que lo ejecuta
+    fecha_fin = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f'<TrabajoImportacion {self.id} - {self.estado}>'
+
+    def filas_por_segundo(self):
+        """Velocidad de procesamiento desde que el trabajo comenzó"""
+        if not self.fecha_inicio:
+            return 0
+        segundos = ((self.fecha_fin or datetime.utcnow()) - self.fecha_inicio).total_seconds()
+        return round(self.filas_procesadas / segundos, 1) if segundos > 0 else 0
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'tipo': self.tipo,
+            'referencia_id': self.referencia_id,
+            'nombre_archivo': self.nombre_archivo,
+            'estado': self.estado,
+            'filas_procesadas': self.filas_procesadas or 0,
+            'filas_por_segundo': self.filas_por_segundo(),
+            'errores': json.loads(self.errores) if self.errores else [],
+            'resultado': json.loads(self.resultado) if self.resultado else None,
+            'mensaje_error': self.mensaje_error,
+            'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
+            'fecha_inicio': self.fecha_inicio.isoformat() if self.fecha_inicio else None,
+            'fecha_fin': self.fecha_fin.isoformat() if self.fecha_fin else None
+        }
@@ -1,7 +1,19 @@
 from src.models.user import db
 from datetime import datetime
+from src.services.normalizacion import clave_codigo, LARGO_CLAVE
 
 class Inventario(db.Model):
+    __table_args__ = (
+        # Un producto aparece una sola vez por farmacia; soporta el upsert masivo
+        db.Index('ix_inventario_farmacia_codigo', 'farmacia_id', 'codigo', unique=True),
+        # Rango de fechas de vencimiento en toda la red (o por farmacia) para el reporte de vencimientos
+        db.Index('ix_inventario_vencimiento_farmacia', 'fecha_vencimiento', 'farmacia_id'),
+        # Productos por código en toda la red (ventas y analítica sin farmacia)
+        db.Index('ix_inventario_codigo', 'codigo'),
+        # Conteos de productos sin stock o bajo un límite fijo, en la red o por farmacia
+        db.Index('ix_inventario_pedido_farmacia', 'pedido', 'farmacia_id'),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     farmacia_id = db.Column(db.Integer, db.ForeignKey('farmacia.id'), nullable=False)
     codigo = db.Column(db.String(50), nullable=False)
@@ -15,12 +27,49 @@ class Inventario(db.Model):
     precio_neto = db.Column(db.Float, nullable=False)
     pedido = db.Column(db.Integer, default=0)  # Cantidad disponible/stock
     total = db.Column(db.Float, nullable=True)  # Total calculado
+    clave_producto = db.Column(db.String(LARGO_CLAVE), nullable=True, index=True)  # Agrupa el mismo producto entre farmacias (EAN o código, sin la descripción)
     
     farmacia = db.relationship('Farmacia', backref=db.backref('inventarios', lazy=True))
     
+    @db.validates('codigo')
+    def _actualizar_clave(self, campo, valor):
+        # Las cargas masivas calculan la clave al parsear; esto cubre altas y cambios individuales
+        self.clave_producto = clave_codigo(valor)
+        return valor
+    
     def __repr__(self):
         return f'<Inventario {self.codigo} - {self.descripcion}>'
     
+    # Campos que se pueden pedir con ?fields= (mismos nombres que to_dict)
+    CAMPOS = (
+        'id', 'farmacia_id', 'codigo', 'descripcion', 'laboratorio', 'nacional', 'departamento',
+        'fecha_vencimiento', 'precio', 'descuento', 'precio_neto', 'pedido', 'total', 'farmacia'
+    )
+    
+    @classmethod
+    def query_campos(cls, campos):
+        """Consulta que selecciona solo las columnas pedidas (une farmacia solo si se pide su nombre)"""
+        from src.models.farmacia import Farmacia
+        
+        columnas = [Farmacia.nombre.label('farmacia') if campo == 'farmacia' else getattr(cls, campo) for campo in campos]
+        query = db.session.query(*columnas)
+        if 'farmacia' in campos:
+            query = query.join(Farmacia, cls.farmacia_id == Farmacia.id)
+        return query
+    
+    @staticmethod
+    def fila_a_dict(fila):
+        """Serializa una fila de query_campos con el mismo formato que to_dict"""
+        datos = fila._asdict()
+        if datos.get('fecha_vencimiento'):
+            datos['fecha_vencimiento'] = datos['fecha_vencimiento'].isoformat()
+        return datos
+    
+    @classmethod
+    def query_con_farmacia(cls):
+        """Consulta que trae la farmacia en el mismo SELECT, para serializar listas sin una consulta por fila"""
+        return cls.query.options(db.joinedload(cls.farmacia))
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -1,8 +1,15 @@
 from src.models.user import db
 from datetime import datetime
+from src.services.normalizacion import clave_producto as calcular_clave_producto, clave_codigo, LARGO_CLAVE
 
 class ListaProveedor(db.Model):
     __tablename__ = 'lista_proveedor'
+    __table_args__ = (
+        # Lista de un proveedor (mapa codigo -> id de la carga, recálculo de sus ofertas); cubre la consulta
+        db.Index('ix_lista_proveedor_proveedor_codigo', 'proveedor_id', 'codigo'),
+        # Productos distintos entre todas las listas
+        db.Index('ix_lista_proveedor_codigo', 'codigo'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     proveedor_id = db.Column(db.Integer, db.ForeignKey('proveedor.id'), nullable=False)
@@ -13,10 +20,21 @@ class ListaProveedor(db.Model):
     precio_descuento = db.Column(db.Float)
     disponible = db.Column(db.Boolean, default=True)
     fecha_actualizacion = db.Column(db.DateTime, default=datetime.utcnow)
+    clave_producto = db.Column(db.String(LARGO_CLAVE), nullable=True, index=True)  # Agrupa el mismo producto entre proveedores
+    clave_codigo = db.Column(db.String(LARGO_CLAVE), nullable=True, index=True)  # Une la oferta con el inventario (EAN o código)
     
     # Relación con proveedor
     proveedor = db.relationship('Proveedor', backref=db.backref('productos', lazy=True))
     
+    @db.validates('codigo', 'descripcion')
+    def _actualizar_clave(self, campo, valor):
+        codigo = valor if campo == 'codigo' else self.codigo
+        descripcion = valor if campo == 'descripcion' else self.descripcion
+        self.clave_producto = calcular_clave_producto(codigo, descripcion)
+        if campo == 'codigo':
+            self.clave_codigo = clave_codigo(valor)
+        return valor
+    
     def to_dict(self):
         return {
             'id': self.id,
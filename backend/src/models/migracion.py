@@ -0,0 +1,12 @@
+from src.models.user import db
+from datetime import datetime
+
+class MigracionEsquema(db.Model):
+    """Cambio de esquema ya aplicado a la base (ver src/services/esquema.py)"""
+    __tablename__ = 'migracion_esquema'
+
+    version = db.Column(db.String(100), primary_key=True)
+    fecha_aplicacion = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<MigracionEsquema {self.version}>'
@@ -0,0 +1,53 @@
+from sqlalchemy import func
+from src.models.user import db
+from src.services.normalizacion import LARGO_CLAVE
+from datetime import datetime
+
+class PoliticaReposicion(db.Model):
+    """Regla de reposición (mínimo, máximo y punto de reorden) para un ámbito.
+
+    El ámbito lo definen farmacia_id (None = todas las farmacias) y, a lo sumo,
+    uno de clave_producto o departamento (ambos None = regla por defecto). Cada
+    campo en None se hereda de la regla más general (ver src/services/reposicion.py).
+    """
+    __tablename__ = 'politica_reposicion'
+    __table_args__ = (
+        db.Index('ix_politica_reposicion_producto', 'clave_producto', 'farmacia_id'),
+        db.Index('ix_politica_reposicion_departamento', 'departamento', 'farmacia_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    farmacia_id = db.Column(db.Integer, db.ForeignKey('farmacia.id'), nullable=True)
+    clave_producto = db.Column(db.String(LARGO_CLAVE), nullable=True)
+    departamento = db.Column(db.String(100), nullable=True)
+
+    stock_minimo = db.Column(db.Integer, nullable=True)  # Stock de seguridad
+    stock_maximo = db.Column(db.Integer, nullable=True)  # Se repone hasta este nivel
+    punto_reorden = db.Column(db.Integer, nullable=True)  # Se repone con stock <= punto (por defecto el mínimo)
+
+    fecha_actualizacion = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<PoliticaReposicion {self.farmacia_id} {self.clave_producto or self.departamento}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'farmacia_id': self.farmacia_id,
+            'clave_producto': self.clave_producto,
+            'departamento': self.departamento,
+            'stock_minimo': self.stock_minimo,
+            'stock_maximo': self.stock_maximo,
+            'punto_reorden': self.punto_reorden,
+            'fecha_actualizacion': self.fecha_actualizacion.isoformat() if self.fecha_actualizacion else None
+        }
+
+# Un solo registro por ámbito. Los ámbitos usan None como "todas", y en un índice único
+# los NULL no se comparan como iguales: se indexan con coalesce.
+db.Index(
+    'ix_politica_reposicion_ambito',
+    func.coalesce(PoliticaReposicion.farmacia_id, 0),
+    func.coalesce(PoliticaReposicion.clave_producto, ''),
+    func.coalesce(PoliticaReposicion.departamento, ''),
+    unique=True
+)
@@ -13,6 +13,7 @@ class Proveedor(db.Model):
     dias_credito = db.Column(db.Integer, default=0)  # Días de crédito
     descuento_comercial = db.Column(db.Float, default=0.0)  # Descuento comercial (%)
     descuento_pronto_pago = db.Column(db.Float, default=0.0)  # Descuento por pronto pago (%)
+    pedido_minimo = db.Column(db.Float, default=0.0)  # Monto mínimo de un pedido
     
     # Campos de auditoría
     fecha_creacion = db.Column(db.DateTime, default=datetime.utcnow)
@@ -32,6 +33,7 @@ class Proveedor(db.Model):
             'dias_credito': self.dias_credito,
             'descuento_comercial': self.descuento_comercial,
             'descuento_pronto_pago': self.descuento_pronto_pago,
+            'pedido_minimo': self.pedido_minimo or 0,
             'fecha_creacion': self.fecha_creacion.isoformat() if self.fecha_creacion else None,
             'activo': self.activo
         }
@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 import json
+from src.services.permisos import matriz_rol, efectivos as permisos_efectivos
 
 db = SQLAlchemy()
 
@@ -10,6 +11,8 @@ class User(db.Model):
     password = db.Column(db.String(255), nullable=False)
     rol = db.Column(db.String(50), default='vendedor')  # administrador, gerente, farmaceutico, vendedor
     permisos = db.Column(db.Text, default='{}')  # JSON con permisos específicos
+    # Se incrementa con cada cambio de rol o permisos (ver src/services/permisos.py)
+    permisos_version = db.Column(db.Integer, default=0, nullable=False)
 
     def __repr__(self):
         return f'<User {self.username}>'
@@ -27,65 +30,15 @@ class User(db.Model):
 
     def get_permisos_por_rol(self):
         """Obtiene permisos predefinidos según el rol"""
-        permisos_roles = {
-            'admin': {
-                'farmacias': {'ver': True, 'crear': True, 'editar': True, 'eliminar': True},
-                'inventarios': {'ver': True, 'crear': True, 'editar': True, 'eliminar': True},
-                'busqueda': {'ver': True, 'usar': True},
-                'usuarios': {'ver': True, 'crear': True, 'editar': True, 'eliminar': True, 'cambiar_password': True},
-                'ventas': {'ver': True, 'crear': True, 'editar': True, 'eliminar': True},
-                'proveedores': {'ver': True, 'crear': True, 'editar': True, 'eliminar': True},
-                'reportes': {'ver': True, 'generar': True, 'exportar': True}
-            },
-            'gerente': {
-                'farmacias': {'ver': True, 'crear': True, 'editar': True, 'eliminar': False},
-                'inventarios': {'ver': True, 'crear': True, 'editar': True, 'eliminar': False},
-                'busqueda': {'ver': True, 'usar': True},
-                'usuarios': {'ver': True, 'crear': True, 'editar': True, 'eliminar': False, 'cambiar_password': False},
-                'ventas': {'ver': True, 'crear': True, 'editar': True, 'eliminar': False},
-                'proveedores': {'ver': True, 'crear': True, 'editar': True, 'eliminar': False},
-                'reportes': {'ver': True, 'generar': True, 'exportar': True}
-            },
-            'farmaceutico': {
-                'farmacias': {'ver': True, 'crear': False, 'editar': False, 'eliminar': False},
-                'inventarios': {'ver': True, 'crear': True, 'editar': True, 'eliminar': False},
-                'busqueda': {'ver': True, 'usar': True},
-                'usuarios': {'ver': False, 'crear': False, 'editar': False, 'eliminar': False, 'cambiar_password': False},
-                'ventas': {'ver': True, 'crear': True, 'editar': True, 'eliminar': False},
-                'proveedores': {'ver': True, 'crear': False, 'editar': False, 'eliminar': False},
-                'reportes': {'ver': True, 'generar': False, 'exportar': False}
-            },
-            'vendedor': {
-                'farmacias': {'ver': True, 'crear': False, 'editar': False, 'eliminar': False},
-                'inventarios': {'ver': True, 'crear': False, 'editar': False, 'eliminar': False},
-                'busqueda': {'ver': True, 'usar': True},
-                'usuarios': {'ver': False, 'crear': False, 'editar': False, 'eliminar': False, 'cambiar_password': False},
-                'ventas': {'ver': True, 'crear': True, 'editar': False, 'eliminar': False},
-                'proveedores': {'ver': False, 'crear': False, 'editar': False, 'eliminar': False},
-                'reportes': {'ver': False, 'generar': False, 'exportar': False}
-            }
-        }
-        return permisos_roles.get(self.rol, permisos_roles['vendedor'])
+        return {modulo: dict(acciones) for modulo, acciones in matriz_rol(self.rol).items()}
 
     def get_permisos_efectivos(self):
         """Obtiene los permisos efectivos (rol + permisos personalizados)"""
-        permisos_rol = self.get_permisos_por_rol()
-        permisos_custom = self.get_permisos()
-        
-        # Combinar permisos del rol con permisos personalizados
-        permisos_efectivos = permisos_rol.copy()
-        for modulo, acciones in permisos_custom.items():
-            if modulo in permisos_efectivos:
-                permisos_efectivos[modulo].update(acciones)
-            else:
-                permisos_efectivos[modulo] = acciones
-        
-        return permisos_efectivos
+        return permisos_efectivos(self).to_dict()
 
     def tiene_permiso(self, modulo, accion):
         """Verifica si el usuario tiene un permiso específico"""
-        permisos = self.get_permisos_efectivos()
-        return permisos.get(modulo, {}).get(accion, False)
+        return permisos_efectivos(self).permite(modulo, accion)
 
     def to_dict(self):
         return {
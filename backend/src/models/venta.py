@@ -2,12 +2,22 @@ from src.models.user import db
 from datetime import datetime
 
 class Venta(db.Model):
+    __table_args__ = (
+        # Listado por farmacia o cliente, de la más reciente a la más antigua (cursor sobre id)
+        db.Index('ix_venta_farmacia_id', 'farmacia_id', 'id'),
+        db.Index('ix_venta_cliente_id', 'cliente_id', 'id'),
+        # Solo las ventas pendientes de sumar a los resúmenes diarios (pocas filas)
+        db.Index('ix_venta_sin_acumular', 'id', sqlite_where=db.text('acumulada = 0'), postgresql_where=db.text('NOT acumulada')),
+    )
+    
     id = db.Column(db.Integer, primary_key=True)
     cliente_id = db.Column(db.Integer, db.ForeignKey('cliente.id'), nullable=False)
     farmacia_id = db.Column(db.Integer, db.ForeignKey('farmacia.id'), nullable=False)
     total = db.Column(db.Float, nullable=False)
     metodo_pago = db.Column(db.String(50), nullable=False)
     fecha = db.Column(db.DateTime, default=datetime.utcnow)
+    # Ya sumada a los resúmenes diarios (ver src/services/resumen_ventas.py)
+    acumulada = db.Column(db.Boolean, nullable=False, default=False)
     
     cliente = db.relationship('Cliente', backref=db.backref('ventas', lazy=True))
     farmacia = db.relationship('Farmacia', backref=db.backref('ventas', lazy=True))
@@ -29,7 +39,7 @@ class Venta(db.Model):
 
 class VentaDetalle(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    venta_id = db.Column(db.Integer, db.ForeignKey('venta.id'), nullable=False)
+    venta_id = db.Column(db.Integer, db.ForeignKey('venta.id'), nullable=False, index=True)
     inventario_id = db.Column(db.Integer, db.ForeignKey('inventario.id'), nullable=False)
     cantidad = db.Column(db.Integer, nullable=False)
     precio = db.Column(db.Float, nullable=False)
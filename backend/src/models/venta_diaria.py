@@ -0,0 +1,69 @@
+from src.models.user import db
+
+class VentaDiaria(db.Model):
+    """Unidades y monto vendidos de un producto (por código) en una farmacia y un día.
+
+    Se llena de forma incremental desde venta_detalle (ver src/services/resumen_ventas.py):
+    cada venta se suma una sola vez y queda marcada con venta.acumulada.
+    """
+    __tablename__ = 'venta_diaria'
+    __table_args__ = (
+        db.Index('ix_venta_diaria_farmacia_codigo_fecha', 'farmacia_id', 'codigo', 'fecha', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    farmacia_id = db.Column(db.Integer, db.ForeignKey('farmacia.id'), nullable=False)
+    codigo = db.Column(db.String(50), nullable=False)
+    fecha = db.Column(db.Date, nullable=False, index=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    monto = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<VentaDiaria {self.farmacia_id} {self.codigo} {self.fecha}>'
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'farmacia_id': self.farmacia_id,
+            'codigo': self.codigo,
+            'fecha': self.fecha.isoformat() if self.fecha else None,
+            'cantidad': self.cantidad,
+            'monto': self.monto
+        }
+
+class VentaDiariaLaboratorio(db.Model):
+    """Unidades y monto vendidos de un laboratorio en una farmacia y un día (se llena como VentaDiaria)"""
+    __tablename__ = 'venta_diaria_laboratorio'
+    __table_args__ = (
+        db.Index('ix_venta_diaria_laboratorio_farmacia_laboratorio_fecha', 'farmacia_id', 'laboratorio', 'fecha', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    farmacia_id = db.Column(db.Integer, db.ForeignKey('farmacia.id'), nullable=False)
+    laboratorio = db.Column(db.String(100), nullable=False)
+    fecha = db.Column(db.Date, nullable=False, index=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)
+    monto = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<VentaDiariaLaboratorio {self.farmacia_id} {self.laboratorio} {self.fecha}>'
+
+class VentaDiariaPago(db.Model):
+    """Cantidad de ventas y monto cobrado con un método de pago en una farmacia y un día.
+
+    Se acumula desde venta (no desde el detalle), junto con VentaDiaria.
+    """
+    __tablename__ = 'venta_diaria_pago'
+    __table_args__ = (
+        db.Index('ix_venta_diaria_pago_farmacia_metodo_fecha', 'farmacia_id', 'metodo_pago', 'fecha', unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    farmacia_id = db.Column(db.Integer, db.ForeignKey('farmacia.id'), nullable=False)
+    metodo_pago = db.Column(db.String(50), nullable=False)
+    fecha = db.Column(db.Date, nullable=False, index=True)
+    cantidad = db.Column(db.Integer, nullable=False, default=0)  # Número de ventas
+    monto = db.Column(db.Float, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<VentaDiariaPago {self.farmacia_id} {self.metodo_pago} {self.fecha}>'
@@ -0,0 +1,208 @@
+from flask import Blueprint, request, jsonify
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
+from src.models.user import db
+from src.models.inventario import Inventario
+from src.models.venta_diaria import VentaDiaria, VentaDiariaLaboratorio, VentaDiariaPago
+from src.services.autenticacion import requiere_permiso
+
+analitica_bp = Blueprint('analitica', __name__)
+
+# Días que cubre la analítica si no se indica ?desde
+DIAS_DEFECTO = 30
+
+# Máximo de filas en los rankings
+MAX_LIMIT = 200
+
+def leer_rango():
+    """(desde, hasta) inclusivos desde ?desde y ?hasta (YYYY-MM-DD); por defecto los últimos DIAS_DEFECTO días"""
+    hasta = date.fromisoformat(request.args['hasta']) if request.args.get('hasta') else datetime.utcnow().date()
+    desde = date.fromisoformat(request.args['desde']) if request.args.get('desde') else hasta - timedelta(days=DIAS_DEFECTO - 1)
+    if desde > hasta:
+        raise ValueError('desde no puede ser posterior a hasta')
+    return desde, hasta
+
+def filtrar_resumen(query, modelo, desde, hasta):
+    """Rango de fechas y ?farmacia_id sobre una tabla de resumen (usa el índice de fecha)"""
+    query = query.filter(modelo.fecha >= desde, modelo.fecha <= hasta)
+    if request.args.get('farmacia_id'):
+        query = query.filter(modelo.farmacia_id == request.args.get('farmacia_id', type=int))
+    return query
+
+def leer_orden(cantidad, monto):
+    """Columna de orden del ranking según ?por=cantidad|monto"""
+    por = request.args.get('por', 'cantidad')
+    if por not in ('cantidad', 'monto'):
+        raise ValueError('por debe ser cantidad o monto')
+    return (cantidad if por == 'cantidad' else monto).desc()
+
+def inicio_periodo(fecha, periodo):
+    if periodo == 'semana':
+        return fecha - timedelta(days=fecha.weekday())
+    if periodo == 'mes':
+        return fecha.replace(day=1)
+    return fecha
+
+def siguiente_periodo(fecha, periodo):
+    if periodo == 'semana':
+        return fecha + timedelta(days=7)
+    if periodo == 'mes':
+        return (fecha.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return fecha + timedelta(days=1)
+
+@analitica_bp.route('/analitica/mas-vendidos', methods=['GET'])
+@requiere_permiso('reportes', 'ver')
+def get_mas_vendidos():
+    """Productos más vendidos en el rango (?desde, ?hasta, ?farmacia_id, ?por=cantidad|monto, ?limit).
+
+    Se calcula solo sobre venta_diaria; el inventario se consulta únicamente
+    para la descripción de los productos del ranking.
+    """
+    try:
+        desde, hasta = leer_rango()
+        limite = min(request.args.get('limit', 20, type=int), MAX_LIMIT)
+        
+        cantidad = func.sum(VentaDiaria.cantidad)
+        monto = func.sum(VentaDiaria.monto)
+        filas = filtrar_resumen(db.session.query(
+            VentaDiaria.codigo,
+            cantidad.label('cantidad'),
+            monto.label('monto'),
+            func.count(func.distinct(VentaDiaria.farmacia_id)).label('farmacias')
+        ), VentaDiaria, desde, hasta).group_by(VentaDiaria.codigo).order_by(
+            leer_orden(cantidad, monto), VentaDiaria.codigo
+        ).limit(limite).all()
+        
+        # Descripción y laboratorio de la primera fila de inventario de cada código
+        codigos = [fila.codigo for fila in filas]
+        referencias = db.session.query(func.min(Inventario.id)).filter(
+            Inventario.codigo.in_(codigos)
+        ).group_by(Inventario.codigo)
+        productos = {
+            inventario.codigo: inventario
+            for inventario in db.session.query(
+                Inventario.codigo, Inventario.descripcion, Inventario.laboratorio
+            ).filter(Inventario.id.in_(referencias))
+        } if codigos else {}
+        
+        return jsonify({
+            'desde': desde.isoformat(),
+            'hasta': hasta.isoformat(),
+            'productos': [{
+                'codigo': fila.codigo,
+                'descripcion': productos[fila.codigo].descripcion if fila.codigo in productos else None,
+                'laboratorio': productos[fila.codigo].laboratorio if fila.codigo in productos else None,
+                'cantidad': fila.cantidad,
+                'monto': fila.monto,
+                'farmacias': fila.farmacias
+            } for fila in filas]
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analitica_bp.route('/analitica/laboratorios', methods=['GET'])
+@requiere_permiso('reportes', 'ver')
+def get_ventas_laboratorios():
+    """Ventas por laboratorio en el rango (?desde, ?hasta, ?farmacia_id, ?por=cantidad|monto, ?limit)"""
+    try:
+        desde, hasta = leer_rango()
+        limite = min(request.args.get('limit', 20, type=int), MAX_LIMIT)
+        
+        cantidad = func.sum(VentaDiariaLaboratorio.cantidad)
+        monto = func.sum(VentaDiariaLaboratorio.monto)
+        filas = filtrar_resumen(db.session.query(
+            VentaDiariaLaboratorio.laboratorio,
+            cantidad.label('cantidad'),
+            monto.label('monto')
+        ), VentaDiariaLaboratorio, desde, hasta).group_by(VentaDiariaLaboratorio.laboratorio).order_by(
+            leer_orden(cantidad, monto), VentaDiariaLaboratorio.laboratorio
+        ).limit(limite).all()
+        
+        return jsonify({
+            'desde': desde.isoformat(),
+            'hasta': hasta.isoformat(),
+            'laboratorios': [fila._asdict() for fila in filas]
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analitica_bp.route('/analitica/tendencia', methods=['GET'])
+@requiere_permiso('reportes', 'ver')
+def get_tendencia_ventas():
+    """Ventas, monto y ticket promedio por ?periodo=dia|semana|mes en el rango (los periodos sin ventas van en 0)"""
+    try:
+        desde, hasta = leer_rango()
+        periodo = request.args.get('periodo', 'dia')
+        if periodo not in ('dia', 'semana', 'mes'):
+            return jsonify({'error': 'periodo debe ser dia, semana o mes'}), 400
+        
+        filas = filtrar_resumen(db.session.query(
+            VentaDiariaPago.fecha,
+            func.sum(VentaDiariaPago.cantidad),
+            func.sum(VentaDiariaPago.monto)
+        ), VentaDiariaPago, desde, hasta).group_by(VentaDiariaPago.fecha)
+        
+        # Los días se agrupan por periodo en Python: a lo sumo una fila por día del rango
+        totales = {}
+        for fecha, ventas, monto in filas:
+            inicio = inicio_periodo(fecha, periodo)
+            acumulado = totales.setdefault(inicio, [0, 0.0])
+            acumulado[0] += ventas
+            acumulado[1] += monto or 0
+        
+        serie = []
+        inicio = inicio_periodo(desde, periodo)
+        while inicio <= hasta:
+            ventas, monto = totales.get(inicio, (0, 0.0))
+            serie.append({
+                'periodo': inicio.isoformat(),
+                'ventas': ventas,
+                'monto': monto,
+                'ticket_promedio': monto / ventas if ventas else 0
+            })
+            inicio = siguiente_periodo(inicio, periodo)
+        
+        return jsonify({'desde': desde.isoformat(), 'hasta': hasta.isoformat(), 'periodo': periodo, 'serie': serie})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analitica_bp.route('/analitica/metodos-pago', methods=['GET'])
+@requiere_permiso('reportes', 'ver')
+def get_metodos_pago():
+    """Participación de cada método de pago (cantidad de ventas y monto) en el rango"""
+    try:
+        desde, hasta = leer_rango()
+        
+        filas = filtrar_resumen(db.session.query(
+            VentaDiariaPago.metodo_pago,
+            func.sum(VentaDiariaPago.cantidad).label('ventas'),
+            func.sum(VentaDiariaPago.monto).label('monto')
+        ), VentaDiariaPago, desde, hasta).group_by(VentaDiariaPago.metodo_pago).order_by(
+            func.sum(VentaDiariaPago.monto).desc()
+        ).all()
+        
+        total_ventas = sum(fila.ventas for fila in filas)
+        total_monto = sum(fila.monto or 0 for fila in filas)
+        return jsonify({
+            'desde': desde.isoformat(),
+            'hasta': hasta.isoformat(),
+            'total_ventas': total_ventas,
+            'total_monto': total_monto,
+            'metodos_pago': [{
+                'metodo_pago': fila.metodo_pago,
+                'ventas': fila.ventas,
+                'monto': fila.monto,
+                'porcentaje_ventas': fila.ventas * 100 / total_ventas if total_ventas else 0,
+                'porcentaje_monto': (fila.monto or 0) * 100 / total_monto if total_monto else 0
+            } for fila in filas]
+        })
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
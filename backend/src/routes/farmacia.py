@@ -1,10 +1,14 @@
 from flask import Blueprint, request, jsonify
 from src.models.user import db
 from src.models.farmacia import Farmacia
+from src.services.autenticacion import requiere_permiso
+from src.services.cache_respuestas import cache_respuesta
 
 farmacia_bp = Blueprint('farmacia', __name__)
 
 @farmacia_bp.route('/farmacias', methods=['GET'])
+@requiere_permiso('farmacias', 'ver')
+@cache_respuesta(Farmacia)
 def get_farmacias():
     try:
         farmacias = Farmacia.query.all()
@@ -13,6 +17,7 @@ def get_farmacias():
         return jsonify({'error': str(e)}), 500
 
 @farmacia_bp.route('/farmacias', methods=['POST'])
+@requiere_permiso('farmacias', 'crear')
 def create_farmacia():
     try:
         data = request.get_json()
@@ -30,6 +35,7 @@ def create_farmacia():
         return jsonify({'error': str(e)}), 500
 
 @farmacia_bp.route('/farmacias/<int:farmacia_id>', methods=['GET'])
+@requiere_permiso('farmacias', 'ver')
 def get_farmacia(farmacia_id):
     try:
         farmacia = Farmacia.query.get_or_404(farmacia_id)
@@ -38,6 +44,7 @@ def get_farmacia(farmacia_id):
         return jsonify({'error': str(e)}), 500
 
 @farmacia_bp.route('/farmacias/<int:farmacia_id>', methods=['PUT'])
+@requiere_permiso('farmacias', 'editar')
 def update_farmacia(farmacia_id):
     try:
         farmacia = Farmacia.query.get_or_404(farmacia_id)
@@ -55,6 +62,7 @@ def update_farmacia(farmacia_id):
         return jsonify({'error': str(e)}), 500
 
 @farmacia_bp.route('/farmacias/<int:farmacia_id>', methods=['DELETE'])
+@requiere_permiso('farmacias', 'eliminar')
 def delete_farmacia(farmacia_id):
     try:
         farmacia = Farmacia.query.get_or_404(farmacia_id)
@@ -0,0 +1,36 @@
+from flask import Blueprint, request, jsonify
+from src.models.importacion import TrabajoImportacion
+from src.services.autenticacion import requiere_sesion
+
+importacion_bp = Blueprint('importacion', __name__)
+
+@importacion_bp.route('/imports', methods=['GET'])
+@requiere_sesion
+def get_importaciones():
+    """Obtener los trabajos de importación más recientes"""
+    try:
+        query = TrabajoImportacion.query
+        
+        if request.args.get('tipo'):
+            query = query.filter_by(tipo=request.args.get('tipo'))
+        if request.args.get('estado'):
+            query = query.filter_by(estado=request.args.get('estado'))
+        
+        limite = int(request.args.get('limit', 50))
+        trabajos = query.order_by(TrabajoImportacion.fecha_creacion.desc()).limit(limite).all()
+        
+        return jsonify([trabajo.to_dict() for trabajo in trabajos])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@importacion_bp.route('/imports/<job_id>', methods=['GET'])
+@requiere_sesion
+def get_importacion(job_id):
+    """Obtener el progreso de un trabajo de importación"""
+    try:
+        trabajo = TrabajoImportacion.query.get(job_id)
+        if not trabajo:
+            return jsonify({'error': 'Trabajo de importación no encontrado'}), 404
+        return jsonify(trabajo.to_dict())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
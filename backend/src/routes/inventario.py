@@ -1,75 +1,108 @@
 from flask import Blueprint, request, jsonify
-import openpyxl
-import os
 from datetime import datetime
-from werkzeug.utils import secure_filename
+from sqlalchemy.exc import IntegrityError
 from src.models.user import db
 from src.models.inventario import Inventario
 from src.models.farmacia import Farmacia
+from src.services.importaciones import encolar_importacion
+from src.services.lectura_archivos import allowed_file, error_formato
+from src.services.busqueda import filtrar_busqueda
+from src.services.streaming import modo_streaming, respuesta_lista, TAMANO_LOTE_STREAMING
+from src.services.autenticacion import requiere_permiso
 
 inventario_bp = Blueprint('inventario', __name__)
 
-UPLOAD_FOLDER = '/tmp/uploads'
-ALLOWED_EXTENSIONS = {'xlsx', 'xls'}
-
-def allowed_file(filename):
-    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
-
-def parse_descuento(descuento_str):
-    """Parsea el descuento que puede venir en diferentes formatos"""
-    if not descuento_str:
-        return 0.0
-    
-    if isinstance(descuento_str, (int, float)):
-        return float(descuento_str)
-    
-    # Si es string, limpiar y convertir
-    descuento_str = str(descuento_str).replace(',', '.').strip()
-    
-    # Si contiene %, extraer el número
-    if '%' in descuento_str:
-        descuento_str = descuento_str.replace('%', '').strip()
-        return float(descuento_str) / 100
-    
-    try:
-        return float(descuento_str)
-    except:
-        return 0.0
+# Máximo de filas por página en GET /inventarios
+MAX_LIMIT = 5000
 
 @inventario_bp.route('/inventarios', methods=['GET'])
+@requiere_permiso('inventarios', 'ver')
 def get_inventarios():
+    """Listar inventario con paginación por cursor (limit/after sobre id) y proyección de campos.
+
+    Con ?stream=ndjson o ?stream=json la respuesta se envía a medida que se lee;
+    en ese modo no hay X-Next-Cursor y el cursor es el id del último elemento.
+    """
     try:
         farmacia_id = request.args.get('farmacia_id')
-        if farmacia_id:
-            inventarios = Inventario.query.filter_by(farmacia_id=farmacia_id).all()
+        limit = request.args.get('limit', type=int)
+        after = request.args.get('after', type=int)
+        fields = request.args.get('fields')
+        
+        if limit is not None and limit <= 0:
+            return jsonify({'error': 'limit debe ser mayor que 0'}), 400
+        if limit:
+            limit = min(limit, MAX_LIMIT)
+        
+        # Seleccionar solo las columnas pedidas; el id siempre se incluye porque es el cursor
+        campos = None
+        if fields:
+            campos = [campo.strip() for campo in fields.split(',') if campo.strip()]
+            invalidos = [campo for campo in campos if campo not in Inventario.CAMPOS]
+            if invalidos:
+                return jsonify({'error': f'Campos no válidos: {", ".join(invalidos)}'}), 400
+            if 'id' not in campos:
+                campos.insert(0, 'id')
+            query = Inventario.query_campos(campos)
         else:
-            inventarios = Inventario.query.all()
+            query = Inventario.query_con_farmacia()
+        
+        if farmacia_id:
+            query = query.filter(Inventario.farmacia_id == farmacia_id)
+        
+        # El total solo se calcula en la primera página, con un COUNT sobre el índice
+        total = None
+        if limit and after is None:
+            conteo = db.session.query(db.func.count(Inventario.id))
+            if farmacia_id:
+                conteo = conteo.filter(Inventario.farmacia_id == farmacia_id)
+            total = conteo.scalar()
+        
+        if after is not None:
+            query = query.filter(Inventario.id > after)
+        query = query.order_by(Inventario.id)
+        if limit:
+            query = query.limit(limit)
+        
+        serializar = Inventario.fila_a_dict if campos else Inventario.to_dict
+        
+        # En modo streaming se serializa fila por fila mientras se lee el cursor
+        modo = modo_streaming()
+        if modo:
+            response = respuesta_lista(
+                (serializar(fila) for fila in query.yield_per(TAMANO_LOTE_STREAMING)), modo
+            )
+            if total is not None:
+                response.headers['X-Total-Count'] = str(total)
+            return response
         
-        return jsonify([inventario.to_dict() for inventario in inventarios])
+        inventarios = [serializar(fila) for fila in query]
+        
+        response = jsonify(inventarios)
+        if total is not None:
+            response.headers['X-Total-Count'] = str(total)
+        if limit and len(inventarios) == limit:
+            response.headers['X-Next-Cursor'] = str(inventarios[-1]['id'])
+        return response
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @inventario_bp.route('/inventarios/search', methods=['GET'])
+@requiere_permiso('busqueda', 'usar')
 def search_inventarios():
     try:
         query = request.args.get('q', '').strip()
         if not query:
             return jsonify([])
         
-        # Buscar en todas las farmacias
-        inventarios = Inventario.query.filter(
-            db.or_(
-                Inventario.descripcion.ilike(f'%{query}%'),
-                Inventario.codigo.ilike(f'%{query}%'),
-                Inventario.laboratorio.ilike(f'%{query}%')
-            )
-        ).all()
+        # Buscar en todas las farmacias usando el índice de búsqueda (ordenado por relevancia)
+        inventarios = filtrar_busqueda(Inventario.query_con_farmacia(), query).all()
         
-        # Agrupar por código para mostrar en qué farmacias está disponible
+        # Agrupar por clave de producto para mostrar en qué farmacias está disponible
         productos = {}
         for inv in inventarios:
-            if inv.codigo not in productos:
-                productos[inv.codigo] = {
+            if inv.clave_producto not in productos:
+                productos[inv.clave_producto] = {
                     'codigo': inv.codigo,
                     'descripcion': inv.descripcion,
                     'laboratorio': inv.laboratorio,
@@ -79,7 +112,7 @@ def search_inventarios():
                     'farmacias': []
                 }
             
-            productos[inv.codigo]['farmacias'].append({
+            productos[inv.clave_producto]['farmacias'].append({
                 'farmacia_id': inv.farmacia_id,
                 'farmacia_nombre': inv.farmacia.nombre,
                 'precio': inv.precio,
@@ -94,6 +127,7 @@ def search_inventarios():
         return jsonify({'error': str(e)}), 500
 
 @inventario_bp.route('/inventarios', methods=['POST'])
+@requiere_permiso('inventarios', 'crear')
 def create_inventario():
     try:
         data = request.get_json()
@@ -122,11 +156,16 @@ def create_inventario():
         db.session.commit()
         
         return jsonify(inventario.to_dict()), 201
+    except IntegrityError:
+        # Índice único (farmacia_id, codigo): el producto ya está en esa farmacia
+        db.session.rollback()
+        return jsonify({'error': f'El producto {data["codigo"]} ya existe en la farmacia {data["farmacia_id"]}'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @inventario_bp.route('/inventarios/upload', methods=['POST'])
+@requiere_permiso('inventarios', 'crear')
 def upload_inventario():
     try:
         if 'file' not in request.files:
@@ -137,136 +176,35 @@ def upload_inventario():
         
         if not farmacia_id:
             return jsonify({'error': 'farmacia_id es requerido'}), 400
+        try:
+            farmacia_id = int(farmacia_id)
+        except ValueError:
+            return jsonify({'error': 'farmacia_id debe ser un número'}), 400
+        # Se valida antes de encolar: el trabajo no debe fallar recién en segundo plano
+        if db.session.get(Farmacia, farmacia_id) is None:
+            return jsonify({'error': 'Farmacia no encontrada'}), 404
         
         if file.filename == '':
             return jsonify({'error': 'No se seleccionó archivo'}), 400
         
         if file and allowed_file(file.filename):
-            # Crear directorio si no existe
-            os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-            
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(UPLOAD_FOLDER, filename)
-            file.save(filepath)
-            
-            # Procesar archivo Excel
-            workbook = openpyxl.load_workbook(filepath)
-            sheet = workbook.active
-            
-            inventarios_creados = 0
-            errores = []
-            
-            # Buscar la fila de headers (normalmente fila 2)
-            header_row = None
-            for row_num in range(1, 5):  # Buscar en las primeras 4 filas
-                row = [cell.value for cell in sheet[row_num]]
-                if any('CODIGO' in str(cell).upper() if cell else False for cell in row):
-                    header_row = row_num
-                    break
-            
-            if not header_row:
-                return jsonify({'error': 'No se encontraron headers válidos en el archivo'}), 400
-            
-            # Procesar datos desde la fila siguiente a los headers
-            for row_num, row in enumerate(sheet.iter_rows(min_row=header_row + 1, values_only=True), start=header_row + 1):
-                try:
-                    if not any(row):  # Saltar filas vacías
-                        continue
-                    
-                    # Mapear columnas según la estructura del archivo
-                    codigo = str(row[0]) if row[0] else None
-                    descripcion = str(row[1]).strip() if row[1] else None
-                    laboratorio = str(row[2]).strip() if row[2] else None
-                    nacional = str(row[3]).strip() if row[3] else None
-                    departamento = str(row[4]).strip() if row[4] else None
-                    fecha_vencimiento = row[5] if row[5] else None
-                    precio = float(row[6]) if row[6] else 0
-                    descuento_raw = row[7] if row[7] else 0
-                    precio_neto = float(row[10]) if row[10] and isinstance(row[10], (int, float)) else precio
-                    pedido = int(row[11]) if row[11] and isinstance(row[11], (int, float)) else 0  # Columna PEDIDO
-                    total = float(row[12]) if row[12] and isinstance(row[12], (int, float)) else 0  # Columna TOTAL
-                    
-                    if not all([codigo, descripcion, laboratorio]):
-                        errores.append(f'Fila {row_num}: Datos básicos incompletos')
-                        continue
-                    
-                    # Parsear descuento
-                    descuento = parse_descuento(descuento_raw)
-                    
-                    # Calcular precio neto si no está disponible
-                    if precio_neto == precio and descuento > 0:
-                        precio_neto = precio - (precio * descuento)
-                    
-                    # Parsear fecha de vencimiento
-                    fecha_venc_date = None
-                    if fecha_vencimiento:
-                        if isinstance(fecha_vencimiento, datetime):
-                            fecha_venc_date = fecha_vencimiento.date()
-                        else:
-                            try:
-                                fecha_venc_date = datetime.strptime(str(fecha_vencimiento), '%Y-%m-%d').date()
-                            except:
-                                pass
-                    
-                    # Verificar si ya existe el producto en esta farmacia
-                    existing = Inventario.query.filter_by(
-                        farmacia_id=farmacia_id, 
-                        codigo=codigo
-                    ).first()
-                    
-                    if existing:
-                        # Actualizar existente
-                        existing.descripcion = descripcion
-                        existing.laboratorio = laboratorio
-                        existing.nacional = nacional
-                        existing.departamento = departamento
-                        existing.fecha_vencimiento = fecha_venc_date
-                        existing.precio = precio
-                        existing.descuento = descuento
-                        existing.precio_neto = precio_neto
-                        existing.pedido = pedido
-                        existing.total = total
-                    else:
-                        # Crear nuevo
-                        inventario = Inventario(
-                            farmacia_id=int(farmacia_id),
-                            codigo=codigo,
-                            descripcion=descripcion,
-                            laboratorio=laboratorio,
-                            nacional=nacional,
-                            departamento=departamento,
-                            fecha_vencimiento=fecha_venc_date,
-                            precio=precio,
-                            descuento=descuento,
-                            precio_neto=precio_neto,
-                            pedido=pedido,
-                            total=total
-                        )
-                        db.session.add(inventario)
-                    
-                    inventarios_creados += 1
-                    
-                except Exception as e:
-                    errores.append(f'Fila {row_num}: {str(e)}')
-            
-            db.session.commit()
-            
-            # Limpiar archivo temporal
-            os.remove(filepath)
+            # Encolar el archivo; se procesa en segundo plano
+            trabajo = encolar_importacion('inventario', farmacia_id, file)
             
             return jsonify({
-                'message': f'Inventario procesado exitosamente',
-                'inventarios_procesados': inventarios_creados,
-                'errores': errores
-            })
+                'message': 'Inventario recibido, procesando en segundo plano',
+                'job_id': trabajo.id,
+                'estado': trabajo.estado
+            }), 202
         
-        return jsonify({'error': 'Tipo de archivo no permitido'}), 400
+        return jsonify({'error': error_formato(file.filename)}), 400
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @inventario_bp.route('/inventarios/<int:inventario_id>', methods=['PUT'])
+@requiere_permiso('inventarios', 'editar')
 def update_inventario(inventario_id):
     try:
         inventario = Inventario.query.get_or_404(inventario_id)
@@ -299,11 +237,15 @@ def update_inventario(inventario_id):
         db.session.commit()
         
         return jsonify(inventario.to_dict())
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': f'El producto {data["codigo"]} ya existe en la farmacia {inventario.farmacia_id}'}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 @inventario_bp.route('/inventarios/<int:inventario_id>', methods=['DELETE'])
+@requiere_permiso('inventarios', 'eliminar')
 def delete_inventario(inventario_id):
     try:
         inventario = Inventario.query.get_or_404(inventario_id)
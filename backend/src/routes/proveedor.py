@@ -1,10 +1,18 @@
 from flask import Blueprint, request, jsonify
 from src.models.proveedor import Proveedor
 from src.models.user import db
+from src.services.comparacion_precios import actualizar_comparacion_proveedor
+from src.services.autenticacion import requiere_permiso
+from src.services.cache_respuestas import cache_respuesta
 
 proveedor_bp = Blueprint('proveedor', __name__)
 
+# Campos del proveedor que se copian a la tabla de comparación de precios
+CAMPOS_COMPARACION = ('nombre', 'dias_credito', 'descuento_comercial', 'descuento_pronto_pago')
+
 @proveedor_bp.route('/proveedores', methods=['GET'])
+@requiere_permiso('proveedores', 'ver')
+@cache_respuesta(Proveedor)
 def get_proveedores():
     """Obtener todos los proveedores"""
     try:
@@ -14,6 +22,7 @@ def get_proveedores():
         return jsonify({'error': str(e)}), 500
 
 @proveedor_bp.route('/proveedores/<int:proveedor_id>', methods=['GET'])
+@requiere_permiso('proveedores', 'ver')
 def get_proveedor(proveedor_id):
     """Obtener un proveedor específico"""
     try:
@@ -25,6 +34,7 @@ def get_proveedor(proveedor_id):
         return jsonify({'error': str(e)}), 500
 
 @proveedor_bp.route('/proveedores', methods=['POST'])
+@requiere_permiso('proveedores', 'crear')
 def create_proveedor():
     """Crear un nuevo proveedor"""
     try:
@@ -48,7 +58,8 @@ def create_proveedor():
             direccion=data.get('direccion', ''),
             dias_credito=int(data.get('dias_credito', 0)),
             descuento_comercial=float(data.get('descuento_comercial', 0.0)),
-            descuento_pronto_pago=float(data.get('descuento_pronto_pago', 0.0))
+            descuento_pronto_pago=float(data.get('descuento_pronto_pago', 0.0)),
+            pedido_minimo=float(data.get('pedido_minimo', 0.0))
         )
         
         db.session.add(nuevo_proveedor)
@@ -64,6 +75,7 @@ def create_proveedor():
         return jsonify({'error': str(e)}), 500
 
 @proveedor_bp.route('/proveedores/<int:proveedor_id>', methods=['PUT'])
+@requiere_permiso('proveedores', 'editar')
 def update_proveedor(proveedor_id):
     """Actualizar un proveedor existente"""
     try:
@@ -96,6 +108,13 @@ def update_proveedor(proveedor_id):
             proveedor.descuento_comercial = float(data['descuento_comercial'])
         if 'descuento_pronto_pago' in data:
             proveedor.descuento_pronto_pago = float(data['descuento_pronto_pago'])
+        if 'pedido_minimo' in data:
+            proveedor.pedido_minimo = float(data['pedido_minimo'])
+        
+        # Los precios precalculados de la lista comparativa dependen de estos campos
+        if any(campo in data for campo in CAMPOS_COMPARACION):
+            db.session.flush()
+            actualizar_comparacion_proveedor(proveedor.id)
         
         db.session.commit()
         
@@ -109,6 +128,7 @@ def update_proveedor(proveedor_id):
         return jsonify({'error': str(e)}), 500
 
 @proveedor_bp.route('/proveedores/<int:proveedor_id>', methods=['DELETE'])
+@requiere_permiso('proveedores', 'eliminar')
 def delete_proveedor(proveedor_id):
     """Eliminar un proveedor (soft delete)"""
     try:
@@ -127,6 +147,7 @@ def delete_proveedor(proveedor_id):
         return jsonify({'error': str(e)}), 500
 
 @proveedor_bp.route('/proveedores/<int:proveedor_id>/activar', methods=['PUT'])
+@requiere_permiso('proveedores', 'editar')
 def activar_proveedor(proveedor_id):
     """Reactivar un proveedor"""
     try:
@@ -147,6 +168,8 @@ def activar_proveedor(proveedor_id):
         return jsonify({'error': str(e)}), 500
 
 @proveedor_bp.route('/proveedores/estadisticas', methods=['GET'])
+@requiere_permiso('proveedores', 'ver')
+@cache_respuesta(Proveedor)
 def get_estadisticas_proveedores():
     """Obtener estadísticas de proveedores"""
     try:
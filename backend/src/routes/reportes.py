@@ -2,135 +2,239 @@ from flask import Blueprint, request, jsonify
 from src.models.inventario import Inventario
 from src.models.farmacia import Farmacia
 from src.models.user import db
-from sqlalchemy import func, and_, or_
+from sqlalchemy import func, and_, case
+from itertools import groupby
+from src.services.streaming import modo_streaming, respuesta_lista, respuesta_lista_con_resumen, TAMANO_LOTE_STREAMING
+from src.services.reposicion import Reposicion, reposicion_solicitada
+from src.services.pronostico import pronostico_vigente
+from src.services.vencimientos import reporte_vencimientos, DIAS_VENCIMIENTO_DEFECTO
+from src.services.ordenes_compra import optimizar_ordenes
+from src.services.autenticacion import requiere_permiso
 
 reportes_bp = Blueprint('reportes', __name__)
 
+def precio_referencia_sql():
+    """Precio neto del inventario, o el precio de lista si no tiene neto"""
+    return func.coalesce(func.nullif(Inventario.precio_neto, 0), Inventario.precio, 0)
+
+def totales_por_producto(filtros, reposicion, pronostico=None):
+    """Subconsulta con una fila por producto (clave_producto) y sus totales en las filas filtradas.
+
+    `referencia_id` es la primera fila del producto; de ella se toman código,
+    descripción, laboratorio y precio de referencia. Con `pronostico` se suma
+    también la venta diaria de las farmacias (`venta_diaria`).
+    """
+    stock = reposicion.stock
+    sugerencia = reposicion.sugerencia
+    columnas = (func.sum(pronostico.venta_diaria).label('venta_diaria'),) if pronostico else ()
+    query = reposicion.unir(db.session.query(
+        Inventario.clave_producto.label('clave_producto'),
+        func.min(Inventario.id).label('referencia_id'),
+        func.count(Inventario.id).label('total_farmacias'),
+        func.sum(stock).label('stock_total'),
+        func.sum(case((stock == 0, 1), else_=0)).label('farmacias_sin_stock'),
+        func.sum(case((sugerencia > 0, 1), else_=0)).label('farmacias_con_sugerencia'),
+        func.sum(sugerencia).label('cantidad_total'),
+        func.sum(sugerencia * precio_referencia_sql()).label('valor_total'),
+        *columnas
+    ))
+    if pronostico:
+        query = pronostico.unir(query)
+    return query.filter(*filtros).group_by(Inventario.clave_producto).subquery()
+
+def productos_ordenados(totales, orden, limite=None, columnas=()):
+    """Subconsulta de productos con sus datos de referencia y su `posicion` según `orden`.
+
+    Con `limite` solo se incluyen los primeros productos; la posición (función
+    de ventana) permite luego ordenar por prioridad o por clave sin repetir `orden`.
+    """
+    posicion = func.row_number().over(order_by=orden + (totales.c.clave_producto,))
+    query = db.session.query(
+        totales,
+        Inventario.codigo,
+        Inventario.descripcion,
+        Inventario.laboratorio,
+        precio_referencia_sql().label('precio_referencia'),
+        *columnas,
+        posicion.label('posicion')
+    ).join(Inventario, Inventario.id == totales.c.referencia_id)
+    if limite:
+        query = query.order_by(posicion).limit(limite)
+    return query.subquery()
+
+def totales_generales(totales):
+    """Columnas con los totales de todos los productos (funciones de ventana, se calculan antes de ?limit)"""
+    return (
+        func.count().over().label('total_productos'),
+        func.sum(totales.c.cantidad_total).over().label('total_unidades'),
+        func.sum(totales.c.valor_total).over().label('total_valor')
+    )
+
+def detalle_por_farmacia(filtros, reposicion, productos=None, orden=(), pronostico=None):
+    """Filas por farmacia ordenadas por clave_producto (usa su índice).
+
+    Si se indica la subconsulta `productos` (p. ej. con ?limit) solo se traen
+    las filas de esos productos; con `pronostico`, la venta diaria de cada fila.
+    """
+    columnas = (pronostico.venta_diaria.label('venta_diaria'),) if pronostico else ()
+    query = reposicion.unir(db.session.query(
+        Inventario.clave_producto,
+        Inventario.pedido,
+        precio_referencia_sql().label('precio'),
+        reposicion.sugerencia.label('sugerencia'),
+        reposicion.traslado_entrante.label('traslado_entrante'),
+        Farmacia.id.label('farmacia_id'),
+        Farmacia.nombre.label('farmacia_nombre'),
+        *columnas
+    ).join(Farmacia, Inventario.farmacia_id == Farmacia.id)).filter(*filtros)
+    if pronostico:
+        query = pronostico.unir(query)
+    if productos is not None:
+        query = query.filter(Inventario.clave_producto.in_(db.session.query(productos.c.clave_producto)))
+    return query.order_by(Inventario.clave_producto, *orden, Inventario.id)
+
+def emparejar_detalle(productos, detalle, por_clave):
+    """Genera (producto, filas_detalle) para cada producto.
+
+    Con `por_clave` ambos vienen ordenados por clave_producto y se recorren en
+    paralelo sin acumular nada (streaming); si no, los productos vienen en otro
+    orden y el detalle se agrupa primero por clave.
+    """
+    grupos = groupby(detalle, key=lambda fila: fila.clave_producto)
+    if not por_clave:
+        filas_por_clave = {clave: list(filas) for clave, filas in grupos}
+        for producto in productos:
+            yield producto, filas_por_clave.get(producto.clave_producto, [])
+        return
+
+    grupo = next(grupos, None)
+    for producto in productos:
+        filas = []
+        if grupo is not None and grupo[0] == producto.clave_producto:
+            filas = list(grupo[1])
+            grupo = next(grupos, None)
+        yield producto, filas
+
+def leer_productos(productos, modo):
+    """Con streaming los productos se leen por lotes y por clave; si no, todos y por posición"""
+    if modo:
+        return db.session.query(productos).order_by(productos.c.clave_producto).yield_per(TAMANO_LOTE_STREAMING)
+    return db.session.query(productos).order_by(productos.c.posicion).all()
+
+def leer(query, modo):
+    """Con streaming trae las filas del cursor por lotes; si no, todas de una vez"""
+    return query.yield_per(TAMANO_LOTE_STREAMING) if modo else query.all()
+
+def armar_productos_falla(filas, pronostico):
+    """Arma la respuesta de cada producto en falla con su detalle por farmacia y su proyección de ventas"""
+    for fila, detalle in filas:
+        precio_referencia = float(fila.precio_referencia or 0)
+        yield {
+            'codigo': fila.codigo,
+            'descripcion': fila.descripcion,
+            'laboratorio': fila.laboratorio,
+            'precio_referencia': precio_referencia,
+            'farmacias_afectadas': [{
+                'farmacia_id': item.farmacia_id,
+                'farmacia_nombre': item.farmacia_nombre,
+                'stock_actual': item.pedido or 0,
+                'sugerencia_compra': item.sugerencia,
+                'traslado_entrante': item.traslado_entrante,
+                'valor_estimado': item.sugerencia * precio_referencia,
+                **pronostico.proyeccion(item.pedido, item.venta_diaria)
+            } for item in detalle],
+            'stock_total': fila.stock_total,
+            'farmacias_sin_stock': fila.farmacias_sin_stock,
+            'cantidad_total_sugerida': fila.cantidad_total,
+            'valor_total_estimado': fila.cantidad_total * precio_referencia,
+            'prioridad': fila.prioridad,
+            'total_farmacias_afectadas': fila.total_farmacias,
+            **pronostico.proyeccion(fila.stock_total, fila.venta_diaria)
+        }
+
 @reportes_bp.route('/reportes/productos-falla', methods=['GET'])
+@requiere_permiso('reportes', 'ver')
 def get_productos_falla():
+    """Productos en falla agrupados por clave de producto, ordenados por prioridad y cantidad sugerida.
+
+    Los totales, la sugerencia (según las políticas de reposición; ?limite_stock
+    reemplaza su punto de reorden) y la prioridad se calculan en la BD; el detalle
+    por farmacia sale de una segunda consulta limitada a los mismos productos.
+    Con ?limit=N solo se devuelven los N productos más prioritarios y con
+    ?stream=ndjson|json se envían ordenados por clave de producto a medida que
+    se leen. Cada producto y farmacia incluye su venta diaria de los últimos
+    ?dias_venta días, los días de cobertura y la fecha estimada de quiebre.
+    La sugerencia ya descuenta el traslado_entrante desde farmacias con
+    excedente (?traslados=0 para no descontarlo).
+    """
     try:
         farmacia_id = request.args.get('farmacia_id')
-        limite_stock = int(request.args.get('limite_stock', 5))
-        
-        # Query base para productos en falla
-        query = db.session.query(
-            Inventario.codigo,
-            Inventario.descripcion,
-            Inventario.laboratorio,
-            Inventario.precio,
-            Inventario.precio_neto,
-            Inventario.pedido,
-            Farmacia.id.label('farmacia_id'),
-            Farmacia.nombre.label('farmacia_nombre')
-        ).join(Farmacia, Inventario.farmacia_id == Farmacia.id)
-        
-        # Filtrar por productos con stock bajo o sin stock
-        query = query.filter(
-            or_(
-                Inventario.pedido == 0,  # Sin stock
-                Inventario.pedido <= limite_stock  # Stock bajo
-            )
-        )
+        limite = request.args.get('limit', type=int)
+        reposicion = reposicion_solicitada()
+        pronostico = pronostico_vigente(request.args.get('dias_venta', type=int))
+        
+        # Productos en o bajo su punto de reorden (stock bajo o sin stock)
+        filtros = [reposicion.en_reorden()]
         
         # Filtrar por farmacia específica si se proporciona
         if farmacia_id:
-            query = query.filter(Inventario.farmacia_id == farmacia_id)
+            filtros.append(Inventario.farmacia_id == farmacia_id)
         
-        productos_falla = query.all()
+        totales = totales_por_producto(filtros, reposicion, pronostico)
         
-        # Agrupar productos por código para consolidar información
-        productos_consolidados = {}
+        # Prioridad según la proporción de farmacias sin stock
+        porcentaje_sin_stock = totales.c.farmacias_sin_stock * 1.0 / totales.c.total_farmacias
+        prioridad = case((porcentaje_sin_stock >= 0.7, 'Alta'), (porcentaje_sin_stock >= 0.3, 'Media'), else_='Baja')
+        orden_prioridad = case((porcentaje_sin_stock >= 0.7, 3), (porcentaje_sin_stock >= 0.3, 2), else_=1)
         
-        for producto in productos_falla:
-            codigo = producto.codigo
-            
-            if codigo not in productos_consolidados:
-                productos_consolidados[codigo] = {
-                    'codigo': producto.codigo,
-                    'descripcion': producto.descripcion,
-                    'laboratorio': producto.laboratorio,
-                    'precio_referencia': float(producto.precio_neto or producto.precio or 0),
-                    'farmacias_afectadas': [],
-                    'stock_total': 0,
-                    'farmacias_sin_stock': 0,
-                    'cantidad_total_sugerida': 0,
-                    'valor_total_estimado': 0
-                }
-            
-            # Calcular sugerencia de compra por farmacia
-            stock_actual = producto.pedido or 0
-            stock_minimo = max(15, limite_stock * 3)  # Stock mínimo sugerido
-            sugerencia_farmacia = max(0, stock_minimo - stock_actual)
-            
-            # Agregar información de la farmacia
-            productos_consolidados[codigo]['farmacias_afectadas'].append({
-                'farmacia_id': producto.farmacia_id,
-                'farmacia_nombre': producto.farmacia_nombre,
-                'stock_actual': stock_actual,
-                'sugerencia_compra': sugerencia_farmacia,
-                'valor_estimado': sugerencia_farmacia * productos_consolidados[codigo]['precio_referencia']
-            })
-            
-            # Actualizar totales
-            productos_consolidados[codigo]['stock_total'] += stock_actual
-            if stock_actual == 0:
-                productos_consolidados[codigo]['farmacias_sin_stock'] += 1
-            productos_consolidados[codigo]['cantidad_total_sugerida'] += sugerencia_farmacia
-            productos_consolidados[codigo]['valor_total_estimado'] += sugerencia_farmacia * productos_consolidados[codigo]['precio_referencia']
-        
-        # Calcular prioridad y ordenar
-        resultado = []
-        for codigo, producto in productos_consolidados.items():
-            # Determinar prioridad basada en farmacias sin stock
-            porcentaje_sin_stock = producto['farmacias_sin_stock'] / len(producto['farmacias_afectadas'])
-            if porcentaje_sin_stock >= 0.7:
-                prioridad = 'Alta'
-            elif porcentaje_sin_stock >= 0.3:
-                prioridad = 'Media'
-            else:
-                prioridad = 'Baja'
-            
-            producto['prioridad'] = prioridad
-            producto['total_farmacias_afectadas'] = len(producto['farmacias_afectadas'])
-            
-            # Ordenar farmacias por sugerencia de compra (mayor a menor)
-            producto['farmacias_afectadas'].sort(key=lambda x: x['sugerencia_compra'], reverse=True)
-            
-            resultado.append(producto)
-        
-        # Ordenar por prioridad y cantidad sugerida
-        prioridad_orden = {'Alta': 3, 'Media': 2, 'Baja': 1}
-        resultado.sort(key=lambda x: (prioridad_orden[x['prioridad']], x['cantidad_total_sugerida']), reverse=True)
+        productos = productos_ordenados(
+            totales,
+            (orden_prioridad.desc(), totales.c.cantidad_total.desc()),
+            limite,
+            (prioridad.label('prioridad'),)
+        )
         
-        return jsonify(resultado)
+        # Farmacias de cada producto ordenadas por sugerencia de compra (mayor a menor)
+        detalle = detalle_por_farmacia(
+            filtros, reposicion, productos if limite else None, (reposicion.sugerencia.desc(),), pronostico
+        )
+        
+        modo = modo_streaming()
+        filas = emparejar_detalle(leer_productos(productos, modo), leer(detalle, modo), por_clave=bool(modo))
+        
+        if modo:
+            return respuesta_lista(armar_productos_falla(filas, pronostico), modo)
+        
+        return jsonify(list(armar_productos_falla(filas, pronostico)))
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @reportes_bp.route('/reportes/estadisticas-fallas', methods=['GET'])
+@requiere_permiso('reportes', 'ver')
 def get_estadisticas_fallas():
     try:
-        limite_stock = int(request.args.get('limite_stock', 5))
+        reposicion = Reposicion(request.args.get('limite_stock', type=int))
         
         # Productos sin stock
         productos_sin_stock = db.session.query(func.count(Inventario.id)).filter(
             Inventario.pedido == 0
         ).scalar()
         
-        # Productos con stock bajo
-        productos_stock_bajo = db.session.query(func.count(Inventario.id)).filter(
-            and_(Inventario.pedido > 0, Inventario.pedido <= limite_stock)
+        # Productos con stock bajo (en o bajo su punto de reorden)
+        productos_stock_bajo = reposicion.unir(db.session.query(func.count(Inventario.id))).filter(
+            and_(Inventario.pedido > 0, reposicion.en_reorden())
         ).scalar()
         
         # Total productos en falla
         total_productos_falla = productos_sin_stock + productos_stock_bajo
         
         # Farmacias más afectadas
-        farmacias_afectadas = db.session.query(
+        farmacias_afectadas = reposicion.unir(db.session.query(
             Farmacia.nombre,
             func.count(Inventario.id).label('productos_falla')
-        ).join(Inventario, Farmacia.id == Inventario.farmacia_id).filter(
-            Inventario.pedido <= limite_stock
+        ).join(Inventario, Farmacia.id == Inventario.farmacia_id)).filter(
+            reposicion.en_reorden()
         ).group_by(Farmacia.id, Farmacia.nombre).order_by(
             func.count(Inventario.id).desc()
         ).limit(5).all()
@@ -149,66 +253,50 @@ def get_estadisticas_fallas():
         return jsonify({'error': str(e)}), 500
 
 @reportes_bp.route('/reportes/sugerencias-compra', methods=['GET'])
+@requiere_permiso('reportes', 'ver')
 def get_sugerencias_compra():
     try:
-        # Obtener productos en falla y calcular sugerencias
-        productos_falla = db.session.query(
-            Inventario.codigo,
-            Inventario.descripcion,
-            Inventario.pedido,
-            Inventario.precio,
-            Inventario.precio_neto,
-            Farmacia.nombre.label('farmacia_nombre')
-        ).join(Farmacia, Inventario.farmacia_id == Farmacia.id).filter(
-            Inventario.pedido <= 5
-        ).all()
-        
-        # Consolidar sugerencias por producto
-        sugerencias_consolidadas = {}
-        total_unidades = 0
-        total_valor = 0
-        
-        for producto in productos_falla:
+        reposicion = reposicion_solicitada()
+        filtros = [reposicion.en_reorden()]
+        
+        # Totales por producto y resumen por prioridad (cantidad de farmacias con sugerencia) en la BD
+        totales = totales_por_producto(filtros, reposicion)
+        productos = productos_ordenados(totales, (), columnas=totales_generales(totales) + (
+            func.sum(case((totales.c.farmacias_con_sugerencia >= 4, 1), else_=0)).over().label('alta'),
+            func.sum(case((totales.c.farmacias_con_sugerencia.between(2, 3), 1), else_=0)).over().label('media')
+        ))
+        productos = db.session.query(productos).order_by(productos.c.clave_producto).all()
+        
+        # Detalle solo de las farmacias que necesitan comprar
+        detalle = detalle_por_farmacia(filtros + [reposicion.sugerencia > 0], reposicion)
+        
+        sugerencias_por_producto = {}
+        for producto, filas in emparejar_detalle(productos, detalle, por_clave=True):
+            # La respuesta se indexa por el código del producto (por la clave si dos productos comparten código)
             codigo = producto.codigo
-            stock_actual = producto.pedido or 0
-            stock_minimo = 15
-            sugerencia = max(0, stock_minimo - stock_actual)
-            precio = float(producto.precio_neto or producto.precio or 0)
-            
-            if codigo not in sugerencias_consolidadas:
-                sugerencias_consolidadas[codigo] = {
-                    'descripcion': producto.descripcion,
-                    'cantidad_total': 0,
-                    'valor_total': 0,
-                    'farmacias': []
-                }
-            
-            if sugerencia > 0:
-                sugerencias_consolidadas[codigo]['cantidad_total'] += sugerencia
-                sugerencias_consolidadas[codigo]['valor_total'] += sugerencia * precio
-                sugerencias_consolidadas[codigo]['farmacias'].append({
-                    'farmacia': producto.farmacia_nombre,
-                    'cantidad': sugerencia,
-                    'valor': sugerencia * precio
-                })
-                
-                total_unidades += sugerencia
-                total_valor += sugerencia * precio
-        
-        # Calcular resumen por prioridad
-        productos_alta = sum(1 for p in sugerencias_consolidadas.values() if len(p['farmacias']) >= 4)
-        productos_media = sum(1 for p in sugerencias_consolidadas.values() if 2 <= len(p['farmacias']) < 4)
-        productos_baja = len(sugerencias_consolidadas) - productos_alta - productos_media
+            sugerencias_por_producto[producto.clave_producto if codigo in sugerencias_por_producto else codigo] = {
+                'descripcion': producto.descripcion,
+                'cantidad_total': producto.cantidad_total,
+                'valor_total': producto.valor_total,
+                'farmacias': [{
+                    'farmacia': fila.farmacia_nombre,
+                    'cantidad': fila.sugerencia,
+                    'valor': fila.sugerencia * float(fila.precio or 0)
+                } for fila in filas]
+            }
+        
+        # Los totales generales vienen repetidos en cada producto
+        resumen = productos[0] if productos else None
         
         return jsonify({
-            'sugerencias_por_producto': sugerencias_consolidadas,
+            'sugerencias_por_producto': sugerencias_por_producto,
             'resumen': {
-                'total_unidades_sugeridas': total_unidades,
-                'valor_total_estimado': total_valor,
-                'productos_alta_prioridad': productos_alta,
-                'productos_media_prioridad': productos_media,
-                'productos_baja_prioridad': productos_baja,
-                'total_productos_diferentes': len(sugerencias_consolidadas)
+                'total_unidades_sugeridas': resumen.total_unidades if resumen else 0,
+                'valor_total_estimado': resumen.total_valor if resumen else 0,
+                'productos_alta_prioridad': resumen.alta if resumen else 0,
+                'productos_media_prioridad': resumen.media if resumen else 0,
+                'productos_baja_prioridad': resumen.total_productos - resumen.alta - resumen.media if resumen else 0,
+                'total_productos_diferentes': len(productos)
             }
         })
         
@@ -216,19 +304,20 @@ def get_sugerencias_compra():
         return jsonify({'error': str(e)}), 500
 
 @reportes_bp.route('/reportes/resumen-por-farmacia', methods=['GET'])
+@requiere_permiso('reportes', 'ver')
 def get_resumen_por_farmacia():
     try:
-        limite_stock = int(request.args.get('limite_stock', 5))
+        reposicion = Reposicion(request.args.get('limite_stock', type=int))
         
-        # Obtener resumen por farmacia
-        resumen_farmacias = db.session.query(
+        # Obtener resumen por farmacia (filas en o bajo su punto de reorden)
+        resumen_farmacias = reposicion.unir(db.session.query(
             Farmacia.id,
             Farmacia.nombre,
             func.count(Inventario.id).label('total_productos_falla'),
-            func.sum(func.case([(Inventario.pedido == 0, 1)], else_=0)).label('productos_sin_stock'),
-            func.sum(func.case([(and_(Inventario.pedido > 0, Inventario.pedido <= limite_stock), 1)], else_=0)).label('productos_stock_bajo')
-        ).join(Inventario, Farmacia.id == Inventario.farmacia_id).filter(
-            Inventario.pedido <= limite_stock
+            func.sum(case((Inventario.pedido == 0, 1), else_=0)).label('productos_sin_stock'),
+            func.sum(case((Inventario.pedido > 0, 1), else_=0)).label('productos_stock_bajo')
+        ).join(Inventario, Farmacia.id == Inventario.farmacia_id)).filter(
+            reposicion.en_reorden()
         ).group_by(Farmacia.id, Farmacia.nombre).all()
         
         resultado = []
@@ -246,76 +335,129 @@ def get_resumen_por_farmacia():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+
+def armar_compras(filas, resumen, pronostico):
+    """Genera los productos del consolidado (con su proyección de ventas) y copia en `resumen` los totales generales"""
+    for fila, detalle in filas:
+        resumen.update(
+            total_productos_diferentes=fila.total_productos,
+            total_unidades_necesarias=fila.total_unidades,
+            valor_total_estimado=fila.total_valor
+        )
+        yield {
+            'codigo': fila.codigo,
+            'descripcion': fila.descripcion,
+            'laboratorio': fila.laboratorio,
+            'precio_unitario': float(fila.precio_referencia or 0),
+            'total_necesario': fila.cantidad_total,
+            'valor_total': fila.valor_total,
+            'detalle_farmacias': [{
+                'farmacia_id': item.farmacia_id,
+                'farmacia_nombre': item.farmacia_nombre,
+                'stock_actual': item.pedido or 0,
+                'cantidad_necesaria': item.sugerencia,
+                'traslado_entrante': item.traslado_entrante,
+                'valor_farmacia': item.sugerencia * float(item.precio or 0),
+                **pronostico.proyeccion(item.pedido, item.venta_diaria)
+            } for item in detalle],
+            **pronostico.proyeccion(fila.stock_total, fila.venta_diaria)
+        }
+
 @reportes_bp.route('/reportes/consolidado-compras', methods=['GET'])
+@requiere_permiso('reportes', 'ver')
 def get_consolidado_compras():
-    """Obtener reporte consolidado de compras con totales por producto y detalle por farmacia"""
+    """Obtener reporte consolidado de compras con totales por producto y detalle por farmacia.
+
+    Los productos vienen ordenados por valor total (mayor a menor) y sus totales
+    se calculan en la BD a partir de las políticas de reposición. Con ?limit=N solo se devuelven los N de mayor valor
+    (el resumen general sigue cubriendo todos) y con ?stream=ndjson|json se
+    envían ordenados por clave de producto a medida que se leen, con el resumen
+    general al final. Como en productos-falla, se incluye la proyección de
+    ventas (?dias_venta) de cada producto y farmacia, y las cantidades
+    descuentan los traslados sugeridos entre farmacias salvo con ?traslados=0.
+    """
     try:
-        limite_stock = int(request.args.get('limite_stock', 5))
-        
-        # Obtener todos los productos en falla con información de farmacia
-        productos_falla = db.session.query(
-            Inventario.codigo,
-            Inventario.descripcion,
-            Inventario.laboratorio,
-            Inventario.pedido,
-            Inventario.precio_neto,
-            Inventario.precio,
-            Farmacia.id.label('farmacia_id'),
-            Farmacia.nombre.label('farmacia_nombre')
-        ).join(Farmacia, Inventario.farmacia_id == Farmacia.id).filter(
-            Inventario.pedido <= limite_stock
-        ).all()
-        
-        # Consolidar por producto
-        consolidado = {}
-        
-        for item in productos_falla:
-            codigo = item.codigo
-            stock_actual = item.pedido or 0
-            stock_minimo = 15  # Stock mínimo deseado
-            sugerencia_farmacia = max(0, stock_minimo - stock_actual)
-            precio = float(item.precio_neto or item.precio or 0)
-            
-            if codigo not in consolidado:
-                consolidado[codigo] = {
-                    'codigo': codigo,
-                    'descripcion': item.descripcion,
-                    'laboratorio': item.laboratorio,
-                    'precio_unitario': precio,
-                    'total_necesario': 0,
-                    'valor_total': 0,
-                    'detalle_farmacias': []
-                }
-            
-            if sugerencia_farmacia > 0:
-                consolidado[codigo]['total_necesario'] += sugerencia_farmacia
-                consolidado[codigo]['valor_total'] += sugerencia_farmacia * precio
-                consolidado[codigo]['detalle_farmacias'].append({
-                    'farmacia_id': item.farmacia_id,
-                    'farmacia_nombre': item.farmacia_nombre,
-                    'stock_actual': stock_actual,
-                    'cantidad_necesaria': sugerencia_farmacia,
-                    'valor_farmacia': sugerencia_farmacia * precio
-                })
-        
-        # Convertir a lista y ordenar por valor total (mayor a menor)
-        resultado = list(consolidado.values())
-        resultado.sort(key=lambda x: x['valor_total'], reverse=True)
-        
-        # Calcular totales generales
-        total_productos = len(resultado)
-        total_unidades = sum(p['total_necesario'] for p in resultado)
-        total_valor = sum(p['valor_total'] for p in resultado)
+        limite = request.args.get('limit', type=int)
+        reposicion = reposicion_solicitada()
+        pronostico = pronostico_vigente(request.args.get('dias_venta', type=int))
+        filtros = [reposicion.en_reorden()]
+        
+        totales = totales_por_producto(filtros, reposicion, pronostico)
+        productos = productos_ordenados(totales, (totales.c.valor_total.desc(),), limite, totales_generales(totales))
+        
+        # Solo las farmacias que necesitan comprar
+        detalle = detalle_por_farmacia(
+            filtros + [reposicion.sugerencia > 0], reposicion, productos if limite else None, pronostico=pronostico
+        )
+        
+        # Totales de todos los productos (aunque se pida ?limit); se completan al leer el primero
+        resumen_general = {
+            'total_productos_diferentes': 0,
+            'total_unidades_necesarias': 0,
+            'valor_total_estimado': 0
+        }
+        
+        modo = modo_streaming()
+        filas = emparejar_detalle(leer_productos(productos, modo), leer(detalle, modo), por_clave=bool(modo))
+        
+        if modo:
+            productos = armar_compras(filas, resumen_general, pronostico)
+            return respuesta_lista_con_resumen('productos', productos, lambda: resumen_general, modo)
         
         return jsonify({
-            'productos': resultado,
-            'resumen_general': {
-                'total_productos_diferentes': total_productos,
-                'total_unidades_necesarias': total_unidades,
-                'valor_total_estimado': total_valor
-            }
+            'productos': list(armar_compras(filas, resumen_general, pronostico)),
+            'resumen_general': resumen_general
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@reportes_bp.route('/reportes/ordenes-compra', methods=['GET'])
+@requiere_permiso('reportes', 'ver')
+def get_ordenes_compra():
+    """Órdenes de compra por proveedor para las cantidades del consolidado de compras.
+
+    Cada producto se asigna al proveedor de menor costo efectivo entre las
+    ofertas disponibles: con descuento por pronto pago si conviene pagar de
+    contado, o descontando los días de crédito a ?tasa_anual (por defecto
+    COMPRAS_TASA_ANUAL). Los proveedores que no alcanzan su pedido mínimo se
+    cierran si sus productos se pueden comprar a otro. Acepta ?limite_stock y
+    ?traslados como el consolidado.
+    """
+    try:
+        tasa_anual = request.args.get('tasa_anual', type=float)
+        if tasa_anual is not None and tasa_anual < 0:
+            return jsonify({'error': 'tasa_anual no puede ser negativa'}), 400
+        reposicion = reposicion_solicitada()
+        
+        totales = totales_por_producto([reposicion.en_reorden()], reposicion)
+        productos = productos_ordenados(totales, ())
+        ordenes, sin_oferta, resumen = optimizar_ordenes(productos, tasa_anual)
+        
+        return jsonify({'ordenes': ordenes, 'sin_oferta': sin_oferta, 'resumen': resumen})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reportes_bp.route('/reportes/vencimientos', methods=['GET'])
+@requiere_permiso('reportes', 'ver')
+def get_vencimientos():
+    """Productos con stock que vencen en los próximos ?dias días (por defecto 60), por farmacia.
+
+    Incluye el valor en riesgo (stock × precio neto), las unidades que no se
+    alcanzarían a vender según la venta diaria de los últimos ?dias_venta días
+    y los traslados sugeridos a farmacias que venden el producto más rápido.
+    Acepta ?farmacia_id.
+    """
+    try:
+        dias = request.args.get('dias', DIAS_VENCIMIENTO_DEFECTO, type=int)
+        if dias < 0:
+            return jsonify({'error': 'dias no puede ser negativo'}), 400
+        pronostico = pronostico_vigente(request.args.get('dias_venta', type=int))
+        
+        productos, resumen = reporte_vencimientos(pronostico, dias, request.args.get('farmacia_id', type=int))
+        
+        return jsonify({'productos': productos, 'resumen': resumen})
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,207 @@
+from flask import Blueprint, request, jsonify
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.politica_reposicion import PoliticaReposicion
+from src.services.normalizacion import clave_codigo
+from src.services.reposicion import Reposicion, reposicion_solicitada, sugerencias_red, regla_por_defecto
+from src.services.traslados import plan_traslados
+from src.services.streaming import modo_streaming, respuesta_lista, TAMANO_LOTE_STREAMING
+from src.services.autenticacion import requiere_permiso
+
+reposicion_bp = Blueprint('reposicion', __name__)
+
+CAMPOS_STOCK = ('stock_minimo', 'stock_maximo', 'punto_reorden')
+
+def leer_ambito(data):
+    """Obtiene (farmacia_id, clave_producto, departamento) del cuerpo de la petición.
+
+    El producto se puede indicar con su clave_producto o con su codigo.
+    """
+    clave = data.get('clave_producto')
+    if not clave and data.get('codigo'):
+        clave = clave_codigo(data['codigo'])
+    return data.get('farmacia_id'), clave or None, data.get('departamento') or None
+
+def validar_politica(farmacia_id, clave, departamento, valores, politica_id=None):
+    """Retorna un mensaje de error o None si la política es válida"""
+    if clave and departamento:
+        return 'Una política aplica a un producto o a un departamento, no a ambos'
+    for campo, valor in valores.items():
+        if valor is not None and valor < 0:
+            return f'{campo} no puede ser negativo'
+    if valores.get('stock_minimo') is not None and valores.get('stock_maximo') is not None \
+            and valores['stock_maximo'] < valores['stock_minimo']:
+        return 'stock_maximo no puede ser menor que stock_minimo'
+
+    # Un solo registro por ámbito; si no, las reglas se duplicarían al unirlas con el inventario
+    query = PoliticaReposicion.query.filter(
+        PoliticaReposicion.farmacia_id == farmacia_id if farmacia_id else PoliticaReposicion.farmacia_id.is_(None),
+        PoliticaReposicion.clave_producto == clave if clave else PoliticaReposicion.clave_producto.is_(None),
+        PoliticaReposicion.departamento == departamento if departamento else PoliticaReposicion.departamento.is_(None)
+    )
+    if politica_id:
+        query = query.filter(PoliticaReposicion.id != politica_id)
+    if query.first():
+        return 'Ya existe una política para ese ámbito'
+    return None
+
+def leer_valores(data, politica=None):
+    """Valores de stock del cuerpo de la petición (los ausentes conservan el valor actual).
+
+    Lanza ValueError si un valor no es un número entero.
+    """
+    valores = {}
+    for campo in CAMPOS_STOCK:
+        if campo in data:
+            try:
+                valores[campo] = int(data[campo]) if data[campo] is not None else None
+            except (TypeError, ValueError):
+                raise ValueError(f'{campo} debe ser un número entero')
+        else:
+            valores[campo] = getattr(politica, campo) if politica else None
+    return valores
+
+@reposicion_bp.route('/politicas-reposicion', methods=['GET'])
+@requiere_permiso('inventarios', 'ver')
+def get_politicas():
+    """Obtener las políticas de reposición y la regla por defecto vigente"""
+    try:
+        query = PoliticaReposicion.query
+        
+        if request.args.get('farmacia_id'):
+            query = query.filter_by(farmacia_id=request.args.get('farmacia_id'))
+        if request.args.get('departamento'):
+            query = query.filter_by(departamento=request.args.get('departamento'))
+        
+        politicas = query.order_by(PoliticaReposicion.id).all()
+        return jsonify({
+            'politicas': [politica.to_dict() for politica in politicas],
+            'por_defecto': regla_por_defecto()
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reposicion_bp.route('/politicas-reposicion', methods=['POST'])
+@requiere_permiso('inventarios', 'editar')
+def create_politica():
+    """Crear una política de reposición para una farmacia, producto, departamento o general"""
+    try:
+        data = request.get_json() or {}
+        
+        farmacia_id, clave, departamento = leer_ambito(data)
+        valores = leer_valores(data)
+        if all(valor is None for valor in valores.values()):
+            return jsonify({'error': 'Se requiere stock_minimo, stock_maximo o punto_reorden'}), 400
+        
+        error = validar_politica(farmacia_id, clave, departamento, valores)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        politica = PoliticaReposicion(
+            farmacia_id=farmacia_id,
+            clave_producto=clave,
+            departamento=departamento,
+            **valores
+        )
+        db.session.add(politica)
+        db.session.commit()
+        
+        return jsonify(politica.to_dict()), 201
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except IntegrityError:
+        # Otra petición creó la política del mismo ámbito entre la validación y el commit
+        db.session.rollback()
+        return jsonify({'error': 'Ya existe una política para ese ámbito'}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@reposicion_bp.route('/politicas-reposicion/<int:politica_id>', methods=['PUT'])
+@requiere_permiso('inventarios', 'editar')
+def update_politica(politica_id):
+    """Actualizar los valores de una política (el ámbito no cambia)"""
+    try:
+        politica = PoliticaReposicion.query.get_or_404(politica_id)
+        data = request.get_json() or {}
+        
+        valores = leer_valores(data, politica)
+        error = validar_politica(politica.farmacia_id, politica.clave_producto, politica.departamento, valores, politica.id)
+        if error:
+            return jsonify({'error': error}), 400
+        
+        for campo, valor in valores.items():
+            setattr(politica, campo, valor)
+        db.session.commit()
+        
+        return jsonify(politica.to_dict())
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@reposicion_bp.route('/politicas-reposicion/<int:politica_id>', methods=['DELETE'])
+@requiere_permiso('inventarios', 'editar')
+def delete_politica(politica_id):
+    try:
+        politica = PoliticaReposicion.query.get_or_404(politica_id)
+        db.session.delete(politica)
+        db.session.commit()
+        
+        return jsonify({'message': 'Política eliminada exitosamente'})
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@reposicion_bp.route('/reposicion/sugerencias', methods=['GET'])
+@requiere_permiso('reportes', 'ver')
+def get_sugerencias_reposicion():
+    """Cantidad sugerida de cada producto y farmacia de la red, con la política aplicada.
+
+    Se calcula en una sola consulta; acepta ?farmacia_id, ?limite_stock (reemplaza
+    el punto de reorden), ?traslados=0 (no descontar los traslados sugeridos)
+    y ?stream=ndjson|json.
+    """
+    try:
+        reposicion = reposicion_solicitada()
+        query = sugerencias_red(reposicion, request.args.get('farmacia_id', type=int))
+        
+        modo = modo_streaming()
+        if modo:
+            filas = query.yield_per(TAMANO_LOTE_STREAMING)
+            return respuesta_lista((fila._asdict() for fila in filas), modo)
+        
+        return jsonify([fila._asdict() for fila in query])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@reposicion_bp.route('/reposicion/traslados', methods=['GET'])
+@requiere_permiso('reportes', 'ver')
+def get_traslados_sugeridos():
+    """Traslados sugeridos entre farmacias: el excedente sobre el stock máximo cubre las faltas de otras.
+
+    La asignación se resuelve para toda la red en una sola consulta y es la
+    misma que descuentan las sugerencias de compra. Acepta ?farmacia_id (solo
+    los traslados desde o hacia esa farmacia), ?limite_stock y ?stream=ndjson|json.
+    """
+    try:
+        reposicion = Reposicion(request.args.get('limite_stock', type=int))
+        traslados = plan_traslados(reposicion, request.args.get('farmacia_id', type=int))
+        
+        modo = modo_streaming()
+        if modo:
+            return respuesta_lista(traslados, modo)
+        
+        traslados = list(traslados)
+        return jsonify({
+            'traslados': traslados,
+            'resumen': {
+                'total_traslados': len(traslados),
+                'total_unidades': sum(traslado['cantidad'] for traslado in traslados),
+                'valor_total': sum(traslado['valor'] for traslado in traslados),
+                'productos': len({traslado['clave_producto'] for traslado in traslados})
+            }
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,10 +1,13 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import generate_password_hash, check_password_hash
 from src.models.user import db, User
+from src.services.autenticacion import requiere_permiso, requiere_sesion, ruta_publica, emitir_token
+from src.services.cache_respuestas import cache_respuesta
+from src.services.contrasenas import generar_hash, verificar, requiere_rehash, espera_intentos, registrar_fallo, registrar_exito
 
 user_bp = Blueprint('user', __name__)
 
 @user_bp.route('/users', methods=['GET'])
+@requiere_permiso('usuarios', 'ver')
 def get_users():
     try:
         users = User.query.all()
@@ -18,6 +21,7 @@ def get_users():
         return jsonify({'error': str(e)}), 500
 
 @user_bp.route('/users', methods=['POST'])
+@requiere_permiso('usuarios', 'crear')
 def create_user():
     try:
         data = request.get_json()
@@ -40,7 +44,7 @@ def create_user():
         new_user = User(
             username=data['username'],
             email=data['email'],
-            password=generate_password_hash(data['password']),
+            password=generar_hash(data['password']),
             rol=data['rol']
         )
         
@@ -64,6 +68,7 @@ def create_user():
         return jsonify({'error': str(e)}), 500
 
 @user_bp.route('/users/<int:user_id>', methods=['PUT'])
+@requiere_permiso('usuarios', 'editar')
 def update_user(user_id):
     try:
         user = User.query.get(user_id)
@@ -88,7 +93,7 @@ def update_user(user_id):
             user.email = data['email']
         
         if 'password' in data and data['password']:
-            user.password = generate_password_hash(data['password'])
+            user.password = generar_hash(data['password'])
         
         if 'rol' in data:
             user.rol = data['rol']
@@ -112,6 +117,7 @@ def update_user(user_id):
         return jsonify({'error': str(e)}), 500
 
 @user_bp.route('/users/<int:user_id>', methods=['DELETE'])
+@requiere_permiso('usuarios', 'eliminar')
 def delete_user(user_id):
     try:
         user = User.query.get(user_id)
@@ -126,6 +132,7 @@ def delete_user(user_id):
         return jsonify({'error': str(e)}), 500
 
 @user_bp.route('/users/<int:user_id>/change-password', methods=['PUT'])
+@requiere_sesion
 def change_user_password(user_id):
     try:
         data = request.get_json()
@@ -139,8 +146,13 @@ def change_user_password(user_id):
         if not user:
             return jsonify({'error': 'Usuario no encontrado'}), 404
         
+        espera = espera_intentos(user.username, request.remote_addr)
+        if espera:
+            return jsonify({'error': 'Demasiados intentos, intente más tarde'}), 429, {'Retry-After': str(espera)}
+        
         # Verificar contraseña actual
-        if not check_password_hash(user.password, data['current_password']):
+        if not verificar(user.password, data['current_password']):
+            registrar_fallo(user.username, request.remote_addr)
             return jsonify({'error': 'Contraseña actual incorrecta'}), 400
         
         # Validar nueva contraseña
@@ -148,7 +160,7 @@ def change_user_password(user_id):
             return jsonify({'error': 'La nueva contraseña debe tener al menos 6 caracteres'}), 400
         
         # Actualizar contraseña
-        user.password = generate_password_hash(data['new_password'])
+        user.password = generar_hash(data['new_password'])
         db.session.commit()
         
         return jsonify({'message': 'Contraseña actualizada exitosamente'})
@@ -156,6 +168,7 @@ def change_user_password(user_id):
         return jsonify({'error': str(e)}), 500
 
 @user_bp.route('/users/<int:user_id>/reset-password', methods=['PUT'])
+@requiere_permiso('usuarios', 'cambiar_password')
 def reset_user_password(user_id):
     try:
         data = request.get_json()
@@ -172,7 +185,7 @@ def reset_user_password(user_id):
             return jsonify({'error': 'La nueva contraseña debe tener al menos 6 caracteres'}), 400
         
         # Resetear contraseña (solo para administradores)
-        user.password = generate_password_hash(data['new_password'])
+        user.password = generar_hash(data['new_password'])
         db.session.commit()
         
         return jsonify({'message': 'Contraseña reseteada exitosamente'})
@@ -180,6 +193,7 @@ def reset_user_password(user_id):
         return jsonify({'error': str(e)}), 500
 
 @user_bp.route('/auth/login', methods=['POST'])
+@ruta_publica
 def login():
     try:
         data = request.get_json()
@@ -187,16 +201,30 @@ def login():
         if 'username' not in data or 'password' not in data:
             return jsonify({'error': 'Usuario y contraseña son requeridos'}), 400
         
+        # Los intentos bloqueados se rechazan antes de calcular ningún hash
+        espera = espera_intentos(data['username'], request.remote_addr)
+        if espera:
+            return jsonify({'error': 'Demasiados intentos, intente más tarde'}), 429, {'Retry-After': str(espera)}
+        
         user = User.query.filter_by(username=data['username']).first()
         
-        if not user or not check_password_hash(user.password, data['password']):
+        if not user or not verificar(user.password, data['password']):
+            registrar_fallo(data['username'], request.remote_addr)
             return jsonify({'error': 'Credenciales inválidas'}), 401
         
+        registrar_exito(data['username'], request.remote_addr)
+        # Hash guardado con un algoritmo o costo anterior: se actualiza con la contraseña ya verificada
+        if requiere_rehash(user.password):
+            user.password = generar_hash(data['password'])
+            db.session.commit()
+        
         return jsonify({
             'id': user.id,
             'username': user.username,
             'email': user.email,
             'rol': user.rol,
+            # Token de sesión para el header Authorization: Bearer <token>
+            'token': emitir_token(user),
             'message': 'Login exitoso'
         })
     except Exception as e:
@@ -204,6 +232,8 @@ def login():
 
 
 @user_bp.route('/permisos/disponibles', methods=['GET'])
+@requiere_permiso('usuarios', 'ver')
+@cache_respuesta()
 def get_permisos_disponibles():
     """Obtiene la lista de todos los permisos disponibles en el sistema"""
     try:
@@ -276,6 +306,7 @@ def get_permisos_disponibles():
         return jsonify({'error': str(e)}), 500
 
 @user_bp.route('/permisos/rol/<rol>', methods=['GET'])
+@requiere_permiso('usuarios', 'ver')
 def get_permisos_por_rol(rol):
     """Obtiene los permisos predefinidos para un rol específico"""
     try:
@@ -0,0 +1,144 @@
+from flask import Blueprint, request, jsonify
+from datetime import datetime
+from src.models.user import db
+from src.models.venta import Venta, VentaDetalle
+from src.services.ventas import leer_venta, registrar_ventas, SobreventaError, MAX_VENTAS_LOTE
+from src.services.resumen_ventas import acumular_ventas
+from src.services.autenticacion import requiere_permiso
+
+venta_bp = Blueprint('venta', __name__)
+
+# Máximo de ventas por página en GET /ventas
+MAX_LIMIT = 1000
+
+def venta_con_detalles(venta):
+    datos = venta.to_dict()
+    datos['detalles'] = [detalle.to_dict() for detalle in venta.detalles]
+    return datos
+
+@venta_bp.route('/ventas', methods=['GET'])
+@requiere_permiso('ventas', 'ver')
+def get_ventas():
+    """Listar ventas (más recientes primero) con paginación por cursor sobre id.
+
+    Acepta ?farmacia_id, ?cliente_id, ?desde y ?hasta (fechas ISO), ?limit y ?after.
+    """
+    try:
+        limit = min(request.args.get('limit', 100, type=int), MAX_LIMIT)
+        after = request.args.get('after', type=int)
+        if limit <= 0:
+            return jsonify({'error': 'limit debe ser mayor que 0'}), 400
+        
+        query = Venta.query.options(db.joinedload(Venta.cliente), db.joinedload(Venta.farmacia))
+        if request.args.get('farmacia_id'):
+            query = query.filter(Venta.farmacia_id == request.args.get('farmacia_id', type=int))
+        if request.args.get('cliente_id'):
+            query = query.filter(Venta.cliente_id == request.args.get('cliente_id', type=int))
+        if request.args.get('desde'):
+            query = query.filter(Venta.fecha >= datetime.fromisoformat(request.args['desde']))
+        if request.args.get('hasta'):
+            query = query.filter(Venta.fecha < datetime.fromisoformat(request.args['hasta']))
+        if after is not None:
+            query = query.filter(Venta.id < after)
+        
+        ventas = [venta.to_dict() for venta in query.order_by(Venta.id.desc()).limit(limit)]
+        
+        response = jsonify(ventas)
+        if len(ventas) == limit:
+            response.headers['X-Next-Cursor'] = str(ventas[-1]['id'])
+        return response
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@venta_bp.route('/ventas/<int:venta_id>', methods=['GET'])
+@requiere_permiso('ventas', 'ver')
+def get_venta(venta_id):
+    try:
+        venta = Venta.query.options(
+            db.selectinload(Venta.detalles).joinedload(VentaDetalle.inventario)
+        ).get_or_404(venta_id)
+        return jsonify(venta_con_detalles(venta))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@venta_bp.route('/ventas', methods=['POST'])
+@requiere_permiso('ventas', 'crear')
+def create_venta():
+    """Registrar una venta con sus detalles y descontar el stock en la misma transacción.
+
+    Cuerpo: {cliente_id, farmacia_id, metodo_pago, fecha?, detalles: [{inventario_id | codigo, cantidad, precio?}]}.
+    Responde 409 si algún producto no tiene stock suficiente (nada se registra).
+    """
+    try:
+        venta, error = leer_venta(request.get_json())
+        if error:
+            return jsonify({'error': error}), 400
+        
+        resultado = registrar_ventas([venta])[0]
+        if 'error' in resultado:
+            db.session.rollback()
+            return jsonify({'error': resultado['error']}), 409 if resultado['sin_stock'] else 400
+        # Los resúmenes diarios se actualizan en la misma transacción que la venta
+        acumular_ventas()
+        db.session.commit()
+        
+        # Se responde con lo registrado, sin volver a leer la venta
+        return jsonify(resultado), 201
+    except SobreventaError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
+
+@venta_bp.route('/ventas/lote', methods=['POST'])
+@requiere_permiso('ventas', 'crear')
+def create_ventas_lote():
+    """Registrar en una sola transacción las ventas acumuladas por un punto de venta.
+
+    Cuerpo: {ventas: [...]} con el mismo formato de POST /ventas. Las ventas
+    inválidas o sin stock suficiente se rechazan individualmente y el resto se
+    registra; `resultados` trae, en el orden recibido, el id y total de cada
+    venta o su error. Responde 409 (sin registrar nada) si el stock cambió por
+    una venta concurrente, en cuyo caso el lote se puede reenviar tal cual.
+    """
+    try:
+        data = request.get_json() or {}
+        ventas = data.get('ventas')
+        if not isinstance(ventas, list) or not ventas:
+            return jsonify({'error': 'Se requiere la lista ventas'}), 400
+        if len(ventas) > MAX_VENTAS_LOTE:
+            return jsonify({'error': f'Máximo {MAX_VENTAS_LOTE} ventas por lote'}), 400
+        
+        resultados = [None] * len(ventas)
+        validas = []
+        for indice, datos in enumerate(ventas):
+            venta, error = leer_venta(datos)
+            if error:
+                resultados[indice] = {'indice': indice, 'error': error}
+            else:
+                validas.append((indice, venta))
+        
+        registradas = registrar_ventas([venta for _, venta in validas])
+        for (indice, _), resultado in zip(validas, registradas):
+            if 'error' in resultado:
+                resultados[indice] = dict(resultado, indice=indice)
+            else:
+                resultados[indice] = {'indice': indice, 'id': resultado['id'], 'total': resultado['total']}
+        acumular_ventas()
+        db.session.commit()
+        
+        rechazadas = sum(1 for resultado in resultados if 'error' in resultado)
+        return jsonify({
+            'registradas': len(resultados) - rechazadas,
+            'rechazadas': rechazadas,
+            'resultados': resultados
+        }), 201
+    except SobreventaError as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 409
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': str(e)}), 500
@@ -0,0 +1,146 @@
+import hashlib
+import hmac
+from flask import current_app, g, request, jsonify
+from itsdangerous import URLSafeTimedSerializer, BadSignature, SignatureExpired
+from sqlalchemy import event, inspect
+from src.models.user import db, User
+from src.services.permisos import efectivos, en_cache, invalidar
+
+# Vigencia del token de sesión (configurable con AUTH_TOKEN_HORAS)
+TOKEN_HORAS_DEFECTO = 12
+
+# Sello de la contraseña vigente de cada usuario leído de la BD: {usuario_id: sello}.
+# Se descarta junto con sus permisos en caché al confirmar un cambio de contraseña.
+_sellos = {}
+
+def _serializador():
+    return URLSafeTimedSerializer(current_app.config['SECRET_KEY'], salt='token-sesion')
+
+def sello_contrasena(hash_guardado):
+    """Huella corta del hash de la contraseña; el token solo vale mientras no cambie"""
+    return hashlib.sha256(hash_guardado.encode()).hexdigest()[:16]
+
+def emitir_token(usuario):
+    """Token firmado con el id del usuario y el sello de su contraseña; se envía como Authorization: Bearer <token>"""
+    return _serializador().dumps({'id': usuario.id, 'sello': sello_contrasena(usuario.password)})
+
+def leer_token(token):
+    """(id del usuario, sello de contraseña) del token, o None si la firma no es válida o el token venció"""
+    horas = current_app.config.get('AUTH_TOKEN_HORAS', TOKEN_HORAS_DEFECTO)
+    try:
+        datos = _serializador().loads(token, max_age=horas * 3600)
+        return datos['id'], datos['sello']
+    except (BadSignature, SignatureExpired, KeyError, TypeError):
+        return None
+
+def permisos_usuario(usuario_id, sello):
+    """PermisosEfectivos del usuario; solo consulta la BD si no están en caché.
+
+    Retorna None si el usuario ya no existe o si su contraseña cambió después
+    de emitir el token (`sello` distinto al de la contraseña vigente). Un sello
+    distinto al guardado se confirma en la BD, ya que lo guardado puede ser de
+    antes de un cambio hecho en otro worker.
+    """
+    sello = str(sello)
+    permisos = en_cache(usuario_id)
+    vigente = _sellos.get(usuario_id)
+    if permisos is None or vigente is None or not hmac.compare_digest(vigente, sello):
+        usuario = db.session.get(User, usuario_id)
+        if usuario is None:
+            _sellos.pop(usuario_id, None)
+            return None
+        permisos = efectivos(usuario)
+        vigente = _sellos[usuario_id] = sello_contrasena(usuario.password)
+    return permisos if hmac.compare_digest(vigente, sello) else None
+
+def requiere_permiso(modulo, accion):
+    """Declara el permiso (modulo, accion) que exige una ruta; lo verifica el autenticador de init_app.
+
+        @farmacia_bp.route('/farmacias', methods=['POST'])
+        @requiere_permiso('farmacias', 'crear')
+        def create_farmacia():
+    """
+    def declarar(vista):
+        vista.permiso_requerido = (modulo, accion)
+        return vista
+    return declarar
+
+def requiere_sesion(vista):
+    """Declara que una ruta solo exige un usuario autenticado, sin un permiso específico"""
+    vista.permiso_requerido = None
+    return vista
+
+def ruta_publica(vista):
+    """Declara que una ruta no exige autenticación (login, archivos del frontend)"""
+    vista.publica = True
+    return vista
+
+def _credenciales():
+    encabezado = request.headers.get('Authorization', '')
+    if encabezado.startswith('Bearer '):
+        return encabezado[len('Bearer '):].strip()
+    return None
+
+def init_app(app):
+    """Autentica cada petición con el token de sesión y aplica el permiso declarado por la ruta.
+
+    Verificar el token es solo comprobar su firma (sin hash de contraseña) y
+    los permisos y el sello de la contraseña salen de la caché por usuario, así
+    que una petición autenticada no consulta la BD salvo la primera vez. Solo
+    las rutas marcadas con ruta_publica no exigen token; una ruta que no
+    declara permiso ni sesión se rechaza (403) para todos. Con AUTH_REQUERIDA
+    desactivado (por defecto, para clientes que aún no envían el token) nada
+    se exige, pero el usuario del token queda igual en g.usuario_id.
+
+    Un cambio de contraseña o la eliminación del usuario invalidan sus tokens
+    en este proceso al confirmarse; los demás workers lo ven cuando vence su
+    caché de permisos (PERMISOS_CACHE_TTL). Actualizar el hash en el login
+    (PASSWORD_METODO) también cambia el sello y cierra las demás sesiones.
+    """
+    app.config.setdefault('AUTH_TOKEN_HORAS', TOKEN_HORAS_DEFECTO)
+
+    @event.listens_for(db.session, 'before_flush')
+    def _registrar_cambios_contrasena(session, contexto, instancias):
+        modificados = session.info.setdefault('contrasenas_modificadas', set())
+        for usuario in session.dirty:
+            if isinstance(usuario, User) and inspect(usuario).attrs.password.history.has_changes():
+                modificados.add(usuario.id)
+        modificados.update(usuario.id for usuario in session.deleted if isinstance(usuario, User))
+
+    @event.listens_for(db.session, 'after_commit')
+    def _descartar_sellos(session):
+        for usuario_id in session.info.pop('contrasenas_modificadas', ()):
+            _sellos.pop(usuario_id, None)
+            invalidar(usuario_id)
+
+    @event.listens_for(db.session, 'after_rollback')
+    def _descartar_cambios(session):
+        session.info.pop('contrasenas_modificadas', None)
+
+    @app.before_request
+    def autenticar():
+        g.usuario_id = None
+        g.permisos = None
+        token = _credenciales()
+        if token:
+            datos = leer_token(token)
+            permisos = permisos_usuario(*datos) if datos is not None else None
+            if permisos is not None:
+                g.usuario_id = datos[0]
+                g.permisos = permisos
+
+        if not app.config.get('AUTH_REQUERIDA') or request.method == 'OPTIONS':
+            return None
+        vista = app.view_functions.get(request.endpoint)
+        # Sin vista responde 404; 'static' son los archivos del frontend
+        if vista is None or request.endpoint == 'static' or getattr(vista, 'publica', False):
+            return None
+
+        if g.permisos is None:
+            mensaje = 'Token inválido o vencido' if token else 'Autenticación requerida'
+            return jsonify({'error': mensaje}), 401
+        if not hasattr(vista, 'permiso_requerido'):
+            return jsonify({'error': 'La ruta no declara su permiso'}), 403
+        if vista.permiso_requerido and not g.permisos.permite(*vista.permiso_requerido):
+            return jsonify({'error': 'No tiene permiso para esta acción'}), 403
+        return None
@@ -0,0 +1,128 @@
+import re
+from sqlalchemy import text, func, literal_column, table, column
+from sqlalchemy.exc import OperationalError
+from src.models.user import db
+from src.models.inventario import Inventario
+
+# Estrategia de búsqueda activa: 'fts5' (SQLite), 'tsvector' (Postgres) o 'like'
+_modo = 'like'
+
+# Peso de cada columna en el ranking bm25 (descripcion, codigo, laboratorio)
+PESOS_FTS = (1.0, 10.0, 2.0)
+
+# Tablas con índice de búsqueda; todas se buscan por descripcion, codigo y laboratorio
+TABLAS_INDEXADAS = ('inventario', 'comparacion_precio')
+
+def sql_fts5(tabla):
+    """Sentencias que crean la tabla FTS5 de `tabla` y los triggers que la sincronizan"""
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {tabla}_fts USING fts5(
+            descripcion, codigo, laboratorio,
+            content='{tabla}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS {tabla}_fts_ai AFTER INSERT ON {tabla} BEGIN
+            INSERT INTO {tabla}_fts(rowid, descripcion, codigo, laboratorio)
+            VALUES (new.id, new.descripcion, new.codigo, new.laboratorio);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {tabla}_fts_ad AFTER DELETE ON {tabla} BEGIN
+            INSERT INTO {tabla}_fts({tabla}_fts, rowid, descripcion, codigo, laboratorio)
+            VALUES ('delete', old.id, old.descripcion, old.codigo, old.laboratorio);
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS {tabla}_fts_au AFTER UPDATE ON {tabla}
+        WHEN old.descripcion IS NOT new.descripcion OR old.codigo IS NOT new.codigo
+            OR old.laboratorio IS NOT new.laboratorio BEGIN
+            INSERT INTO {tabla}_fts({tabla}_fts, rowid, descripcion, codigo, laboratorio)
+            VALUES ('delete', old.id, old.descripcion, old.codigo, old.laboratorio);
+            INSERT INTO {tabla}_fts(rowid, descripcion, codigo, laboratorio)
+            VALUES (new.id, new.descripcion, new.codigo, new.laboratorio);
+        END"""
+    ]
+
+def sql_tsvector(tabla):
+    """Índice GIN equivalente para Postgres.
+
+    Postgres solo lo usa si filtrar_busqueda arma exactamente la misma expresión
+    to_tsvector. Las pruebas corren con SQLite: de este camino solo se verifica
+    el SQL generado (tests/test_busqueda.py), no se ejecuta contra un servidor.
+    """
+    return [
+        f"""CREATE INDEX IF NOT EXISTS ix_{tabla}_busqueda ON {tabla}
+        USING GIN (to_tsvector('simple', descripcion || ' ' || codigo || ' ' || coalesce(laboratorio, '')))"""
+    ]
+
+def init_app(app):
+    """Crea (si no existen) los índices de búsqueda de productos según el motor de BD.
+
+    En SQLite se usa una tabla FTS5 de contenido externo sobre cada tabla indexada,
+    sincronizada con triggers, de modo que las altas, cambios, bajas y cargas
+    masivas la mantienen al día sin código adicional. En Postgres se usa un
+    índice GIN sobre un tsvector. Con otros motores se mantiene ILIKE.
+    """
+    global _modo
+    with app.app_context():
+        dialecto = db.engine.dialect.name
+        try:
+            if dialecto == 'sqlite':
+                for tabla in TABLAS_INDEXADAS:
+                    existia = db.session.execute(text(
+                        "SELECT 1 FROM sqlite_master WHERE name = :nombre"
+                    ), {'nombre': f'{tabla}_fts'}).first()
+                    for sentencia in sql_fts5(tabla):
+                        db.session.execute(text(sentencia))
+                    if not existia:
+                        # Indexar las filas que ya estaban cargadas
+                        db.session.execute(text(f"INSERT INTO {tabla}_fts({tabla}_fts) VALUES ('rebuild')"))
+                db.session.commit()
+                _modo = 'fts5'
+            elif dialecto == 'postgresql':
+                for tabla in TABLAS_INDEXADAS:
+                    for sentencia in sql_tsvector(tabla):
+                        db.session.execute(text(sentencia))
+                db.session.commit()
+                _modo = 'tsvector'
+        except OperationalError:
+            # SQLite compilado sin FTS5: se mantiene la búsqueda con ILIKE
+            db.session.rollback()
+            _modo = 'like'
+
+def terminos_busqueda(texto):
+    """Separa el texto buscado en términos alfanuméricos"""
+    return re.findall(r'\w+', texto.lower())
+
+def filtrar_busqueda(query, texto, modelo=Inventario):
+    """Aplica a una consulta sobre `modelo` el filtro y orden de la búsqueda.
+
+    Todos los términos deben aparecer (como prefijo) en la descripción, el código
+    o el laboratorio, sin distinguir acentos; los resultados quedan ordenados por
+    relevancia.
+    """
+    terminos = terminos_busqueda(texto)
+    if not terminos:
+        return query.filter(db.false())
+
+    tabla = modelo.__tablename__
+    if _modo == 'fts5':
+        expresion = ' '.join(f'"{termino}"*' for termino in terminos)
+        pesos = ', '.join(str(peso) for peso in PESOS_FTS)
+        return query.join(
+            table(f'{tabla}_fts', column('rowid')),
+            literal_column(f'{tabla}_fts.rowid') == modelo.id
+        ).filter(
+            text(f'{tabla}_fts MATCH :expresion').bindparams(expresion=expresion)
+        ).order_by(literal_column(f'bm25({tabla}_fts, {pesos})'))
+
+    if _modo == 'tsvector':
+        documento = func.to_tsvector(
+            'simple', modelo.descripcion + ' ' + modelo.codigo + ' ' + func.coalesce(modelo.laboratorio, '')
+        )
+        consulta = func.to_tsquery('simple', ' & '.join(f'{termino}:*' for termino in terminos))
+        return query.filter(documento.op('@@')(consulta)).order_by(func.ts_rank(documento, consulta).desc())
+
+    return query.filter(
+        db.or_(
+            modelo.descripcion.ilike(f'%{texto}%'),
+            modelo.codigo.ilike(f'%{texto}%'),
+            modelo.laboratorio.ilike(f'%{texto}%')
+        )
+    )
@@ -0,0 +1,219 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.dml import UpdateBase
+
+# Segundos de vigencia de una respuesta y máximo de respuestas en memoria
+# (configurables con CACHE_RESPUESTAS_TTL y CACHE_RESPUESTAS_MAXIMO; TTL 0 desactiva la caché).
+# Sin CACHE_RESPUESTAS_RUTA la invalidación es por proceso: con varios workers, los que no
+# recibieron la escritura siguen sirviendo la respuesta anterior hasta que vence el TTL.
+TTL_DEFECTO = 300
+MAXIMO_DEFECTO = 256
+
+class CacheLocal:
+    """Caché LRU en memoria del proceso con vencimiento por entrada"""
+
+    def __init__(self, maximo):
+        self.maximo = maximo
+        self._entradas = OrderedDict()
+        self._bloqueo = threading.Lock()
+
+    def obtener(self, clave):
+        with self._bloqueo:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            if entrada[0] <= time.time():
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return entrada[1]
+
+    def guardar(self, clave, valor, vence):
+        with self._bloqueo:
+            self._entradas[clave] = (vence, valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.maximo:
+                self._entradas.popitem(last=False)
+
+class AlmacenLocal:
+    """Versión de cada etiqueta en memoria del proceso; las respuestas quedan solo en CacheLocal.
+
+    Solo sirve con un worker: una escritura en otro proceso no llega aquí y su
+    respuesta en caché se sigue sirviendo hasta vencer (ver TTL_DEFECTO).
+    """
+
+    def __init__(self):
+        self._versiones = {}
+        self._bloqueo = threading.Lock()
+
+    def leer(self, etiquetas):
+        return tuple(self._versiones.get(etiqueta, 0) for etiqueta in etiquetas)
+
+    def incrementar(self, etiquetas):
+        with self._bloqueo:
+            for etiqueta in etiquetas:
+                self._versiones[etiqueta] = self._versiones.get(etiqueta, 0) + 1
+
+    def obtener(self, clave):
+        return None
+
+    def guardar(self, clave, valor, vence):
+        pass
+
+class AlmacenCompartido:
+    """Versiones de las etiquetas y respuestas en un archivo SQLite compartido por los workers.
+
+    Una escritura en cualquier worker incrementa la versión de sus etiquetas
+    aquí, y las claves de la caché incluyen esas versiones, así que ningún
+    worker vuelve a servir una respuesta anterior a la escritura.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._local = threading.local()
+        with self._conexion() as conexion:
+            conexion.execute('CREATE TABLE IF NOT EXISTS etiqueta (nombre TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+            conexion.execute(
+                'CREATE TABLE IF NOT EXISTS respuesta '
+                '(clave TEXT PRIMARY KEY, etag TEXT, cuerpo BLOB, mimetype TEXT, vence REAL)'
+            )
+
+    def _conexion(self):
+        conexion = getattr(self._local, 'conexion', None)
+        if conexion is None:
+            conexion = self._local.conexion = sqlite3.connect(self.ruta, timeout=5)
+            conexion.execute('PRAGMA journal_mode=WAL')
+            conexion.execute('PRAGMA synchronous=NORMAL')
+        return conexion
+
+    def leer(self, etiquetas):
+        if not etiquetas:
+            return ()
+        versiones = dict(self._conexion().execute(
+            f'SELECT nombre, version FROM etiqueta WHERE nombre IN ({", ".join("?" * len(etiquetas))})', etiquetas
+        ))
+        return tuple(versiones.get(etiqueta, 0) for etiqueta in etiquetas)
+
+    def incrementar(self, etiquetas):
+        with self._conexion() as conexion:
+            conexion.executemany(
+                'INSERT INTO etiqueta (nombre, version) VALUES (?, 1) '
+                'ON CONFLICT(nombre) DO UPDATE SET version = version + 1',
+                [(etiqueta,) for etiqueta in etiquetas]
+            )
+
+    def obtener(self, clave):
+        fila = self._conexion().execute(
+            'SELECT etag, cuerpo, mimetype FROM respuesta WHERE clave = ? AND vence > ?', (clave, time.time())
+        ).fetchone()
+        return tuple(fila) if fila else None
+
+    def guardar(self, clave, valor, vence):
+        with self._conexion() as conexion:
+            conexion.execute('INSERT OR REPLACE INTO respuesta VALUES (?, ?, ?, ?, ?)', (clave, *valor, vence))
+            # Las respuestas de versiones anteriores ya no se piden: se descartan al vencer
+            conexion.execute('DELETE FROM respuesta WHERE vence <= ?', (time.time(),))
+
+_local = CacheLocal(MAXIMO_DEFECTO)
+_almacen = AlmacenLocal()
+
+def invalidar(*etiquetas):
+    """Descarta las respuestas que dependen de las etiquetas (nombres de tabla)"""
+    if etiquetas:
+        _almacen.incrementar(sorted(etiquetas))
+
+def _respuesta(etag, cuerpo, mimetype):
+    if etag in request.if_none_match:
+        respuesta = current_app.response_class(status=304)
+    else:
+        respuesta = current_app.response_class(cuerpo, mimetype=mimetype)
+    respuesta.set_etag(etag)
+    # El navegador guarda la respuesta pero la revalida con If-None-Match en cada petición
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    return respuesta
+
+def cache_respuesta(*modelos):
+    """Guarda las respuestas 200 de la ruta hasta que se escriba en las tablas de `modelos` o venzan.
+
+    Se responde con ETag; si el cliente ya tiene esa versión (If-None-Match)
+    recibe un 304 sin cuerpo. La clave es la URL con su query string, así que
+    la respuesta no debe depender del usuario.
+
+        @farmacia_bp.route('/farmacias', methods=['GET'])
+        @cache_respuesta(Farmacia)
+        def get_farmacias():
+    """
+    etiquetas = sorted({modelo.__tablename__ for modelo in modelos})
+
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            ttl = current_app.config.get('CACHE_RESPUESTAS_TTL', TTL_DEFECTO)
+            if not ttl:
+                return vista(*args, **kwargs)
+
+            versiones = _almacen.leer(etiquetas)
+            clave = f'{request.full_path}|{",".join(map(str, versiones))}'
+            entrada = _local.obtener(clave)
+            if entrada is None:
+                entrada = _almacen.obtener(clave)
+                if entrada is not None:
+                    _local.guardar(clave, entrada, time.time() + ttl)
+            if entrada is not None:
+                return _respuesta(*entrada)
+
+            respuesta = current_app.make_response(vista(*args, **kwargs))
+            if respuesta.status_code != 200 or respuesta.is_streamed:
+                return respuesta
+            cuerpo = respuesta.get_data()
+            entrada = (hashlib.sha1(cuerpo).hexdigest(), cuerpo, respuesta.mimetype)
+            vence = time.time() + ttl
+            _local.guardar(clave, entrada, vence)
+            _almacen.guardar(clave, entrada, vence)
+            return _respuesta(*entrada)
+        return envoltura
+    return decorador
+
+# Tablas escritas en cada conexión durante la transacción en curso. Se registran a nivel
+# de sentencia porque las cargas masivas (bulk_insert_mappings, insert().from_select)
+# no pasan por los eventos de flush de la sesión.
+@event.listens_for(Engine, 'before_execute')
+def _registrar_escritura(conexion, sentencia, parametros_multiples, parametros, opciones):
+    if isinstance(sentencia, UpdateBase):
+        conexion.info.setdefault('tablas_escritas', set()).add(sentencia.table.name)
+
+def init_app(app):
+    """Configura la caché de respuestas y la invalidación por etiquetas al confirmar escrituras"""
+    global _local, _almacen
+    from src.models.user import db
+
+    app.config.setdefault('CACHE_RESPUESTAS_TTL', int(os.environ.get('CACHE_RESPUESTAS_TTL', TTL_DEFECTO)))
+    _local = CacheLocal(app.config.get('CACHE_RESPUESTAS_MAXIMO', MAXIMO_DEFECTO))
+    # Con varios workers, CACHE_RESPUESTAS_RUTA apunta a un archivo SQLite compartido
+    ruta = app.config.get('CACHE_RESPUESTAS_RUTA', os.environ.get('CACHE_RESPUESTAS_RUTA'))
+    _almacen = AlmacenCompartido(ruta) if ruta else AlmacenLocal()
+
+    @event.listens_for(db.session, 'after_begin')
+    def _recordar_conexion(session, transaccion, conexion):
+        conexion.info.pop('tablas_escritas', None)
+        session.info.setdefault('conexiones_cache', []).append(conexion)
+
+    @event.listens_for(db.session, 'after_commit')
+    def _invalidar_escritas(session):
+        escritas = set()
+        for conexion in session.info.pop('conexiones_cache', []):
+            escritas |= conexion.info.pop('tablas_escritas', set())
+        invalidar(*escritas)
+
+    @event.listens_for(db.session, 'after_rollback')
+    def _descartar_escritas(session):
+        for conexion in session.info.pop('conexiones_cache', []):
+            conexion.info.pop('tablas_escritas', None)
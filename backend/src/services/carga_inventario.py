@@ -0,0 +1,238 @@
+import time
+from datetime import datetime
+from src.models.user import db
+from src.models.inventario import Inventario
+from src.services.lectura_archivos import iterar_filas, en_lotes, a_numero
+from src.services.normalizacion import clave_codigo
+
+# Cantidad de filas que se leen, escriben y confirman por lote
+TAMANO_LOTE = 1000
+
+# Columnas esperadas en el archivo de inventario (CODIGO ... TOTAL)
+TOTAL_COLUMNAS = 13
+
+# Máximo de errores de fila que se reportan en la respuesta
+MAX_ERRORES = 100
+
+def parse_descuento(descuento_str):
+    """Parsea el descuento que puede venir en diferentes formatos"""
+    if not descuento_str:
+        return 0.0
+
+    if isinstance(descuento_str, (int, float)):
+        return float(descuento_str)
+
+    # Si es string, limpiar y convertir
+    descuento_str = str(descuento_str).replace(',', '.').strip()
+
+    # Si contiene %, extraer el número
+    if '%' in descuento_str:
+        descuento_str = descuento_str.replace('%', '').strip()
+        return float(descuento_str) / 100
+
+    try:
+        return float(descuento_str)
+    except:
+        return 0.0
+
+def parse_fila_inventario(row):
+    """Convierte una fila del archivo de inventario en un diccionario de columnas.
+
+    Retorna None si faltan los datos básicos (código, descripción, laboratorio).
+    """
+    # El modo streaming no rellena las celdas vacías al final de la fila
+    if len(row) < TOTAL_COLUMNAS:
+        row = tuple(row) + (None,) * (TOTAL_COLUMNAS - len(row))
+    
+    # Mapear columnas según la estructura del archivo
+    codigo = str(row[0]) if row[0] else None
+    descripcion = str(row[1]).strip() if row[1] else None
+    laboratorio = str(row[2]).strip() if row[2] else None
+    nacional = str(row[3]).strip() if row[3] else None
+    departamento = str(row[4]).strip() if row[4] else None
+    fecha_vencimiento = row[5] if row[5] else None
+    precio = a_numero(row[6]) if row[6] else 0
+    if precio is None:
+        raise ValueError(f'Precio inválido: {row[6]}')
+    precio = float(precio)
+    descuento_raw = row[7] if row[7] else 0
+    # Los textos numéricos (CSV) se convierten; cualquier otro texto usa el valor por defecto
+    precio_neto = float(a_numero(row[10]) or precio)
+    pedido = int(a_numero(row[11]) or 0)  # Columna PEDIDO
+    total = float(a_numero(row[12]) or 0)  # Columna TOTAL
+
+    if not all([codigo, descripcion, laboratorio]):
+        return None
+
+    # Parsear descuento
+    descuento = parse_descuento(descuento_raw)
+
+    # Calcular precio neto si no está disponible
+    if precio_neto == precio and descuento > 0:
+        precio_neto = precio - (precio * descuento)
+
+    # Parsear fecha de vencimiento
+    fecha_venc_date = None
+    if fecha_vencimiento:
+        if isinstance(fecha_vencimiento, datetime):
+            fecha_venc_date = fecha_vencimiento.date()
+        else:
+            for formato_fecha in ('%Y-%m-%d', '%d/%m/%Y'):
+                try:
+                    fecha_venc_date = datetime.strptime(str(fecha_vencimiento)[:10], formato_fecha).date()
+                    break
+                except:
+                    pass
+
+    return {
+        'codigo': codigo,
+        'descripcion': descripcion,
+        'laboratorio': laboratorio,
+        'nacional': nacional,
+        'departamento': departamento,
+        'fecha_vencimiento': fecha_venc_date,
+        'precio': precio,
+        'descuento': descuento,
+        'precio_neto': precio_neto,
+        'pedido': pedido,
+        'total': total,
+        'clave_producto': clave_codigo(codigo)
+    }
+
+def cargar_codigos_existentes(farmacia_id):
+    """Obtiene el mapa codigo -> id del inventario de una farmacia en una sola consulta"""
+    return dict(
+        db.session.query(Inventario.codigo, Inventario.id).filter(
+            Inventario.farmacia_id == farmacia_id
+        )
+    )
+
+def upsert_inventarios(farmacia_id, registros, existentes, tamano_lote=TAMANO_LOTE):
+    """Inserta o actualiza por lotes los registros de inventario de una farmacia.
+
+    `registros` es un diccionario codigo -> columnas y `existentes` el mapa
+    codigo -> id de la farmacia, que se actualiza con los ids de las filas nuevas
+    para que cargas posteriores sobre el mismo mapa actualicen en lugar de duplicar.
+    Retorna la tupla (nuevos, actualizados).
+    """
+    nuevos = []
+    actualizados = []
+    for codigo, registro in registros.items():
+        inventario_id = existentes.get(codigo)
+        if inventario_id:
+            actualizados.append(dict(registro, id=inventario_id))
+        else:
+            nuevos.append(dict(registro, farmacia_id=farmacia_id))
+
+    for inicio in range(0, len(nuevos), tamano_lote):
+        lote = nuevos[inicio:inicio + tamano_lote]
+        db.session.bulk_insert_mappings(Inventario, lote, return_defaults=True)
+        for registro in lote:
+            existentes[registro['codigo']] = registro['id']
+
+    for inicio in range(0, len(actualizados), tamano_lote):
+        db.session.bulk_update_mappings(Inventario, actualizados[inicio:inicio + tamano_lote])
+
+    return len(nuevos), len(actualizados)
+
+def buscar_encabezado_inventario(filas, max_filas=4):
+    """Consume las primeras filas hasta encontrar el header (normalmente fila 2).
+
+    Retorna el número de fila del header o None si no aparece en las primeras
+    `max_filas` filas.
+    """
+    for row_num, row in filas:
+        if any('CODIGO' in str(cell).upper() if cell else False for cell in row):
+            return row_num
+        if row_num >= max_filas:
+            break
+    return None
+
+def procesar_filas_inventario(farmacia_id, filas, tamano_lote=TAMANO_LOTE, progreso=None):
+    """Procesa las filas de datos de un archivo de inventario y las guarda en la BD.
+
+    `filas` es un iterable de tuplas (numero_fila, valores). Se consulta una sola
+    vez el inventario existente de la farmacia y luego las filas se leen, escriben
+    y confirman en lotes de `tamano_lote`, por lo que la memoria no crece con el
+    tamaño del archivo. Si un código aparece varias veces prevalece la última fila.
+    Si se indica `progreso`, se invoca antes de confirmar cada lote con las filas
+    leídas hasta el momento y los errores acumulados.
+    Retorna un diccionario con conteos y tiempos (en segundos) de cada fase.
+    """
+    farmacia_id = int(farmacia_id)
+    tiempos = {'lectura': 0.0, 'consulta_existentes': 0.0, 'escritura': 0.0, 'commit': 0.0}
+    errores = []
+    total_errores = 0
+    filas_leidas = 0
+    nuevos = 0
+    actualizados = 0
+    lotes = 0
+
+    inicio = time.perf_counter()
+    existentes = cargar_codigos_existentes(farmacia_id)
+    tiempos['consulta_existentes'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for lote in en_lotes(filas, tamano_lote):
+        registros = {}
+        for row_num, row in lote:
+            try:
+                if not any(row):  # Saltar filas vacías
+                    continue
+
+                filas_leidas += 1
+                registro = parse_fila_inventario(row)
+                if registro is None:
+                    raise ValueError('Datos básicos incompletos')
+
+                registros[registro['codigo']] = registro
+            except Exception as e:
+                total_errores += 1
+                if len(errores) < MAX_ERRORES:
+                    errores.append(f'Fila {row_num}: {str(e)}')
+        tiempos['lectura'] += time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        nuevos_lote, actualizados_lote = upsert_inventarios(farmacia_id, registros, existentes, tamano_lote)
+        nuevos += nuevos_lote
+        actualizados += actualizados_lote
+        tiempos['escritura'] += time.perf_counter() - inicio
+
+        if progreso:
+            progreso(filas_leidas, errores)
+
+        # Confirmar cada lote para no retener el bloqueo de escritura durante toda la carga
+        inicio = time.perf_counter()
+        db.session.commit()
+        tiempos['commit'] += time.perf_counter() - inicio
+        lotes += 1
+
+        inicio = time.perf_counter()
+    tiempos['lectura'] += time.perf_counter() - inicio
+
+    return {
+        'filas_leidas': filas_leidas,
+        'inventarios_procesados': nuevos + actualizados,
+        'inventarios_nuevos': nuevos,
+        'inventarios_actualizados': actualizados,
+        'lotes': lotes,
+        'errores': errores,
+        'total_errores': total_errores,
+        'tiempos': {fase: round(segundos, 4) for fase, segundos in tiempos.items()}
+    }
+
+def procesar_archivo_inventario(farmacia_id, stream, formato='xlsx', tamano_lote=TAMANO_LOTE, progreso=None):
+    """Carga un archivo de inventario (Excel, CSV o Parquet) leyendo en streaming.
+
+    Retorna None si el archivo no tiene un header válido.
+    """
+    filas = iterar_filas(stream, formato)
+    try:
+        header_row = buscar_encabezado_inventario(filas)
+        if not header_row:
+            return None
+
+        # Procesar datos desde la fila siguiente a los headers
+        return procesar_filas_inventario(farmacia_id, filas, tamano_lote, progreso)
+    finally:
+        filas.close()
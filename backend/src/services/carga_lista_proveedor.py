@@ -0,0 +1,198 @@
+import time
+from datetime import datetime
+from src.models.user import db
+from src.models.lista_proveedor import ListaProveedor
+from src.services.lectura_archivos import iterar_filas, en_lotes, a_numero
+from src.services.comparacion_precios import actualizar_comparacion_proveedor
+from src.services.normalizacion import clave_producto, clave_codigo
+
+# Cantidad de filas que se leen, escriben y confirman por lote
+TAMANO_LOTE = 1000
+
+# Máximo de errores de fila que se reportan en la respuesta
+MAX_ERRORES = 10
+
+def mapear_columnas(headers):
+    """Mapea los nombres de columna del Excel a los campos de ListaProveedor"""
+    col_mapping = {}
+    for i, header in enumerate(headers):
+        # Código de barras opcional; solo se usa para emparejar productos entre proveedores
+        if 'BARRA' in header or 'EAN' in header:
+            col_mapping['ean'] = i
+        elif 'CODIGO' in header or 'COD' in header:
+            col_mapping['codigo'] = i
+        elif 'DESCRIPCION' in header or 'PRODUCTO' in header or 'NOMBRE' in header:
+            col_mapping['descripcion'] = i
+        elif 'LABORATORIO' in header or 'LAB' in header:
+            col_mapping['laboratorio'] = i
+        elif 'PRECIO' in header and 'DESCUENTO' not in header:
+            col_mapping['precio'] = i
+        elif 'DESCUENTO' in header or 'PRECIO_DESCUENTO' in header:
+            col_mapping['precio_descuento'] = i
+    return col_mapping
+
+def buscar_encabezado_lista(filas, max_filas=4):
+    """Consume las primeras filas hasta encontrar el header (la primera fila con una columna de código).
+
+    Retorna el mapeo de columnas del header, o None si no aparece en las
+    primeras `max_filas` filas. Las filas anteriores (títulos) se descartan y
+    los datos comienzan en la fila siguiente al header.
+    """
+    for row_num, row in filas:
+        headers = [str(cell).strip().upper() if cell else '' for cell in row]
+        col_mapping = mapear_columnas(headers)
+        if 'codigo' in col_mapping:
+            return col_mapping
+        if row_num >= max_filas:
+            break
+    return None
+
+def parse_fila_lista(row, col_mapping):
+    """Convierte una fila de la lista de precios en un diccionario de columnas.
+
+    Retorna None si la fila no tiene código o descripción y lanza ValueError
+    si el precio no tiene un formato válido.
+    """
+    def valor(campo, default):
+        indice = col_mapping.get(campo, default)
+        return row[indice] if indice < len(row) else None
+
+    codigo = str(valor('codigo', 0) or '').strip()
+    descripcion = str(valor('descripcion', 1) or '').strip()
+    laboratorio = str(valor('laboratorio', 2) or '').strip()
+
+    if not codigo or not descripcion:
+        return None
+
+    precio = a_numero(valor('precio', 3) or 0)
+    precio_descuento = None
+    if 'precio_descuento' in col_mapping and valor('precio_descuento', None):
+        precio_descuento = a_numero(valor('precio_descuento', None))
+        if precio_descuento is None:
+            raise ValueError('Error en formato de precio')
+    if precio is None:
+        raise ValueError('Error en formato de precio')
+
+    ean = valor('ean', None) if 'ean' in col_mapping else None
+
+    return {
+        'codigo': codigo,
+        'descripcion': descripcion,
+        'laboratorio': laboratorio,
+        'precio': float(precio),
+        'precio_descuento': float(precio_descuento) if precio_descuento is not None else None,
+        'clave_producto': clave_producto(codigo, descripcion, ean),
+        'clave_codigo': clave_codigo(codigo, ean)
+    }
+
+def cargar_codigos_existentes(proveedor_id):
+    """Obtiene el mapa codigo -> id de la lista de un proveedor en una sola consulta"""
+    return dict(
+        db.session.query(ListaProveedor.codigo, ListaProveedor.id).filter(
+            ListaProveedor.proveedor_id == proveedor_id
+        )
+    )
+
+def upsert_productos(proveedor_id, registros, existentes):
+    """Inserta o actualiza en bloque los productos de la lista de un proveedor.
+
+    `existentes` es el mapa codigo -> id del proveedor y se actualiza con los ids
+    de los productos nuevos. Retorna la tupla (nuevos, actualizados).
+    """
+    ahora = datetime.utcnow()
+    nuevos = []
+    actualizados = []
+    for codigo, registro in registros.items():
+        producto_id = existentes.get(codigo)
+        if producto_id:
+            actualizados.append(dict(registro, id=producto_id, fecha_actualizacion=ahora))
+        else:
+            nuevos.append(dict(registro, proveedor_id=proveedor_id))
+
+    if nuevos:
+        db.session.bulk_insert_mappings(ListaProveedor, nuevos, return_defaults=True)
+        for registro in nuevos:
+            existentes[registro['codigo']] = registro['id']
+    if actualizados:
+        db.session.bulk_update_mappings(ListaProveedor, actualizados)
+
+    return len(nuevos), len(actualizados)
+
+def procesar_archivo_lista(proveedor_id, stream, formato='xlsx', tamano_lote=TAMANO_LOTE, progreso=None):
+    """Carga la lista de precios de un proveedor (Excel, CSV o Parquet) en streaming.
+
+    Las filas se leen, escriben y confirman en lotes de `tamano_lote`, por lo que
+    la memoria no crece con el tamaño del archivo. Si se indica `progreso`, se
+    invoca antes de confirmar cada lote con las filas leídas y los errores.
+    Retorna None si el archivo no tiene un header válido.
+    """
+    tiempos = {'lectura': 0.0, 'consulta_existentes': 0.0, 'escritura': 0.0, 'commit': 0.0, 'comparacion': 0.0}
+    productos_nuevos = 0
+    productos_actualizados = 0
+    errores = []
+    total_errores = 0
+    filas_leidas = 0
+
+    inicio = time.perf_counter()
+    existentes = cargar_codigos_existentes(proveedor_id)
+    tiempos['consulta_existentes'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    filas = iterar_filas(stream, formato)
+    try:
+        col_mapping = buscar_encabezado_lista(filas)
+        if col_mapping is None:
+            return None
+
+        # Procesar datos desde la fila siguiente a los headers (las filas vacías se omiten)
+        for lote in en_lotes(filas, tamano_lote):
+            registros = {}
+            for row_num, row in lote:
+                try:
+                    if not any(cell for cell in row if cell):
+                        continue
+
+                    filas_leidas += 1
+                    registro = parse_fila_lista(row, col_mapping)
+                    if registro is None:
+                        continue
+
+                    registros[registro['codigo']] = registro
+                except Exception as e:
+                    total_errores += 1
+                    if len(errores) < MAX_ERRORES:
+                        errores.append(f"Fila {row_num}: {str(e)}")
+            tiempos['lectura'] += time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            nuevos, actualizados = upsert_productos(proveedor_id, registros, existentes)
+            productos_nuevos += nuevos
+            productos_actualizados += actualizados
+            tiempos['escritura'] += time.perf_counter() - inicio
+
+            if progreso:
+                progreso(filas_leidas, errores)
+
+            inicio = time.perf_counter()
+            db.session.commit()
+            tiempos['commit'] += time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+        tiempos['lectura'] += time.perf_counter() - inicio
+    finally:
+        filas.close()
+
+    # Actualizar la tabla de comparación de precios con la nueva lista
+    inicio = time.perf_counter()
+    actualizar_comparacion_proveedor(proveedor_id)
+    db.session.commit()
+    tiempos['comparacion'] = time.perf_counter() - inicio
+
+    return {
+        'filas_leidas': filas_leidas,
+        'productos_nuevos': productos_nuevos,
+        'productos_actualizados': productos_actualizados,
+        'errores': errores,
+        'total_errores': total_errores,
+        'tiempos': {fase: round(segundos, 4) for fase, segundos in tiempos.items()}
+    }
@@ -0,0 +1,84 @@
+from sqlalchemy import func, or_
+from src.models.user import db
+from src.models.proveedor import Proveedor
+from src.models.lista_proveedor import ListaProveedor
+from src.models.comparacion_precio import ComparacionPrecio
+
+# Columnas de comparacion_precio que se llenan desde lista_proveedor + proveedor
+COLUMNAS_OFERTA = (
+    'lista_proveedor_id', 'proveedor_id', 'proveedor_nombre', 'clave_producto', 'clave_codigo', 'codigo',
+    'descripcion', 'laboratorio', 'precio_original', 'descuento_comercial', 'descuento_pronto_pago',
+    'precio_con_descuento_comercial', 'precio_con_descuento_total', 'ahorro_comercial',
+    'ahorro_pronto_pago', 'dias_credito', 'fecha_actualizacion'
+)
+
+def _select_ofertas():
+    """SELECT con los precios de cada producto disponible y los descuentos de su proveedor"""
+    # Precio de lista: el precio con descuento del proveedor si existe
+    precio_original = func.coalesce(func.nullif(ListaProveedor.precio_descuento, 0), ListaProveedor.precio)
+    descuento_comercial = func.coalesce(Proveedor.descuento_comercial, 0)
+    descuento_pronto_pago = func.coalesce(Proveedor.descuento_pronto_pago, 0)
+
+    ahorro_comercial = precio_original * descuento_comercial / 100
+    precio_comercial = precio_original - ahorro_comercial
+    ahorro_pronto_pago = precio_comercial * descuento_pronto_pago / 100
+
+    return db.select(
+        ListaProveedor.id,
+        ListaProveedor.proveedor_id,
+        Proveedor.nombre,
+        ListaProveedor.clave_producto,
+        ListaProveedor.clave_codigo,
+        ListaProveedor.codigo,
+        ListaProveedor.descripcion,
+        ListaProveedor.laboratorio,
+        precio_original,
+        descuento_comercial,
+        descuento_pronto_pago,
+        precio_comercial,
+        precio_comercial - ahorro_pronto_pago,
+        ahorro_comercial,
+        ahorro_pronto_pago,
+        func.coalesce(Proveedor.dias_credito, 0),
+        ListaProveedor.fecha_actualizacion
+    ).join(Proveedor, ListaProveedor.proveedor_id == Proveedor.id).where(
+        ListaProveedor.disponible == True
+    )
+
+def _insertar_ofertas(select):
+    db.session.execute(ComparacionPrecio.__table__.insert().from_select(COLUMNAS_OFERTA, select))
+
+def actualizar_comparacion_proveedor(proveedor_id):
+    """Recalcula las ofertas de un proveedor.
+
+    Se llama al terminar la carga de su lista o al cambiar sus descuentos o días
+    de crédito. El ranking frente a las demás ofertas se calcula al buscar (ver
+    src/routes/lista_comparativa.py). No confirma la transacción.
+    """
+    db.session.query(ComparacionPrecio).filter(
+        ComparacionPrecio.proveedor_id == proveedor_id
+    ).delete(synchronize_session=False)
+    _insertar_ofertas(_select_ofertas().where(ListaProveedor.proveedor_id == proveedor_id))
+
+def reconstruir_comparacion():
+    """Reconstruye desde cero la tabla de comparación. No confirma la transacción."""
+    db.session.query(ComparacionPrecio).delete(synchronize_session=False)
+    _insertar_ofertas(_select_ofertas())
+
+def _claves_desactualizadas():
+    """True si alguna oferta tiene una clave distinta a la de su producto (p. ej. tras cambiar la normalización)"""
+    return db.session.query(ComparacionPrecio.id).join(
+        ListaProveedor, ComparacionPrecio.lista_proveedor_id == ListaProveedor.id
+    ).filter(or_(
+        ComparacionPrecio.clave_producto != ListaProveedor.clave_producto,
+        ComparacionPrecio.clave_codigo.is_distinct_from(ListaProveedor.clave_codigo)
+    )).first() is not None
+
+def init_app(app):
+    """Llena la tabla de comparación si está vacía o si sus claves de producto quedaron desactualizadas"""
+    with app.app_context():
+        if db.session.query(ListaProveedor.id).first() is None:
+            return
+        if db.session.query(ComparacionPrecio.id).first() is None or _claves_desactualizadas():
+            reconstruir_comparacion()
+            db.session.commit()
@@ -0,0 +1,51 @@
+from contextlib import contextmanager
+import threading
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+_local = threading.local()
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _contar(conn, cursor, statement, parameters, context, executemany):
+    contadores = getattr(_local, 'contadores', None)
+    if contadores:
+        for contador in contadores:
+            contador['total'] += 1
+    if has_app_context() and 'consultas_sql' in g:
+        g.consultas_sql += 1
+
+@contextmanager
+def contar_consultas():
+    """Cuenta las sentencias SQL ejecutadas por el hilo actual dentro del bloque.
+
+    Pensado para pruebas y diagnóstico, por ejemplo para verificar que un
+    endpoint ejecuta un número constante de consultas sin importar cuántas
+    filas retorna:
+
+        with contar_consultas() as contador:
+            client.get('/api/inventarios')
+        assert contador['total'] <= 2
+    """
+    contador = {'total': 0}
+    if not hasattr(_local, 'contadores'):
+        _local.contadores = []
+    _local.contadores.append(contador)
+    try:
+        yield contador
+    finally:
+        _local.contadores.remove(contador)
+
+def init_app(app):
+    """Con CONTAR_CONSULTAS activo, agrega el header X-Consultas-SQL a cada respuesta"""
+    if not app.config.get('CONTAR_CONSULTAS'):
+        return
+
+    @app.before_request
+    def iniciar_contador():
+        g.consultas_sql = 0
+
+    @app.after_request
+    def reportar_consultas(response):
+        response.headers['X-Consultas-SQL'] = str(g.get('consultas_sql', 0))
+        return response
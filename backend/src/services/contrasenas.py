@@ -0,0 +1,124 @@
+import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Algoritmo y costo de los hashes nuevos, en el formato de werkzeug (configurable con
+# PASSWORD_METODO, p. ej. 'pbkdf2:sha256:600000' o 'scrypt:32768:8:1')
+METODO_DEFECTO = 'scrypt'
+
+# Intentos fallidos de login admitidos dentro de la ventana, por usuario desde una misma IP
+# y por IP (con cualquier usuario). No se limita por usuario solo: cualquiera podría bloquear
+# una cuenta conocida fallando a propósito desde otra dirección.
+INTENTOS_USUARIO_DEFECTO = 5
+INTENTOS_IP_DEFECTO = 20
+VENTANA_DEFECTO = 300
+
+_executor = None
+_prefijos = {}
+
+def _metodo():
+    if has_app_context():
+        return current_app.config.get('PASSWORD_METODO', METODO_DEFECTO)
+    return os.environ.get('PASSWORD_METODO', METODO_DEFECTO)
+
+def _prefijo(metodo):
+    """Parámetros con los que werkzeug guarda los hashes del método (completa los costos por defecto)"""
+    if metodo not in _prefijos:
+        _prefijos[metodo] = generate_password_hash('', method=metodo).split('$', 1)[0]
+    return _prefijos[metodo]
+
+def _ejecutar(funcion, *args):
+    # El pool solo acota cuántos hashes usan CPU a la vez (PASSWORD_WORKERS): la petición
+    # espera el resultado igual, así que un login sigue ocupando su worker mientras tanto
+    if _executor is None:
+        return funcion(*args)
+    return _executor.submit(funcion, *args).result()
+
+def generar_hash(clave):
+    """Hash de la contraseña con el método configurado"""
+    return _ejecutar(generate_password_hash, clave, _metodo())
+
+def verificar(hash_guardado, clave):
+    """Verifica la contraseña contra el hash guardado"""
+    return _ejecutar(check_password_hash, hash_guardado, clave)
+
+def requiere_rehash(hash_guardado):
+    """True si el hash se generó con otro algoritmo o costo que los configurados"""
+    return hash_guardado.split('$', 1)[0] != _prefijo(_metodo())
+
+class LimitadorIntentos:
+    """Ventana deslizante de intentos fallidos por clave ((usuario, IP) o IP), en memoria del proceso"""
+
+    def __init__(self, maximo, ventana):
+        self.maximo = maximo
+        self.ventana = ventana
+        self._intentos = {}
+        self._bloqueo = threading.Lock()
+
+    def _vigentes(self, clave, ahora):
+        intentos = self._intentos.get(clave)
+        if intentos is None:
+            return None
+        while intentos and intentos[0] <= ahora - self.ventana:
+            intentos.popleft()
+        if not intentos:
+            del self._intentos[clave]
+            return None
+        return intentos
+
+    def espera(self, clave):
+        """Segundos hasta que la clave pueda volver a intentar (0 si puede ahora)"""
+        ahora = time.monotonic()
+        with self._bloqueo:
+            intentos = self._vigentes(clave, ahora)
+            if intentos is None or len(intentos) < self.maximo:
+                return 0
+            return max(1, int(intentos[0] + self.ventana - ahora) + 1)
+
+    def registrar(self, clave):
+        """Registra un intento fallido"""
+        ahora = time.monotonic()
+        with self._bloqueo:
+            intentos = self._vigentes(clave, ahora)
+            if intentos is None:
+                intentos = self._intentos[clave] = deque()
+            intentos.append(ahora)
+            # Las claves sin intentos recientes se descartan de a poco para acotar la memoria
+            for antigua in list(islice(self._intentos, 2)):
+                self._vigentes(antigua, ahora)
+
+    def limpiar(self, clave):
+        with self._bloqueo:
+            self._intentos.pop(clave, None)
+
+_por_usuario_ip = LimitadorIntentos(INTENTOS_USUARIO_DEFECTO, VENTANA_DEFECTO)
+_por_ip = LimitadorIntentos(INTENTOS_IP_DEFECTO, VENTANA_DEFECTO)
+
+def espera_intentos(usuario, ip):
+    """Segundos que deben esperar el usuario desde la IP y la IP antes de otro intento (0 si pueden intentar)"""
+    return max(_por_usuario_ip.espera((usuario, ip)), _por_ip.espera(ip))
+
+def registrar_fallo(usuario, ip):
+    _por_usuario_ip.registrar((usuario, ip))
+    _por_ip.registrar(ip)
+
+def registrar_exito(usuario, ip):
+    _por_usuario_ip.limpiar((usuario, ip))
+
+def init_app(app):
+    """Crea el pool de verificación de contraseñas y configura los límites de intentos"""
+    global _executor, _por_usuario_ip, _por_ip
+    app.config.setdefault('PASSWORD_METODO', os.environ.get('PASSWORD_METODO', METODO_DEFECTO))
+    _prefijo(app.config['PASSWORD_METODO'])
+    _executor = ThreadPoolExecutor(
+        max_workers=int(os.environ.get('PASSWORD_WORKERS', os.cpu_count() or 2)),
+        thread_name_prefix='contrasenas'
+    )
+    ventana = app.config.get('LOGIN_VENTANA_SEGUNDOS', VENTANA_DEFECTO)
+    _por_usuario_ip = LimitadorIntentos(app.config.get('LOGIN_INTENTOS_USUARIO', INTENTOS_USUARIO_DEFECTO), ventana)
+    _por_ip = LimitadorIntentos(app.config.get('LOGIN_INTENTOS_IP', INTENTOS_IP_DEFECTO), ventana)
@@ -0,0 +1,198 @@
+from datetime import date, timedelta
+import click
+from sqlalchemy import inspect, text, select, func
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.models.migracion import MigracionEsquema
+from src.models.inventario import Inventario
+from src.models.lista_proveedor import ListaProveedor
+from src.models.comparacion_precio import ComparacionPrecio
+from src.models.venta import Venta, VentaDetalle
+from src.models.venta_diaria import VentaDiaria
+from src.services.normalizacion import LARGO_CLAVE
+
+def _agregar_columna(tabla, columna, tipo):
+    """Migración que agrega una columna si la tabla es anterior a ella"""
+    def aplicar():
+        columnas = {existente['name'] for existente in inspect(db.session.connection()).get_columns(tabla)}
+        if columna not in columnas:
+            # "user" es una palabra reservada en Postgres
+            nombre = db.engine.dialect.identifier_preparer.quote(tabla)
+            db.session.execute(text(f'ALTER TABLE {nombre} ADD COLUMN {columna} {tipo}'))
+    return aplicar
+
+def _crear_indices(*nombres):
+    """Migración que crea índices declarados en los modelos (los que ya existen se omiten)"""
+    def aplicar():
+        indices = {indice.name: indice for tabla in db.metadata.tables.values() for indice in tabla.indexes}
+        for nombre in nombres:
+            indices[nombre].create(db.session.connection(), checkfirst=True)
+    return aplicar
+
+class MigracionFallida(RuntimeError):
+    """Una versión no se pudo aplicar; la aplicación no arranca hasta corregir los datos"""
+
+def _sin_duplicados(tabla, *columnas):
+    """Paso previo a un índice único: falla indicando las filas repetidas en vez de un error genérico de integridad"""
+    def aplicar():
+        lista = ', '.join(columnas)
+        repetidos = db.session.execute(text(
+            f'SELECT {lista}, COUNT(*) FROM {tabla} GROUP BY {lista} HAVING COUNT(*) > 1 LIMIT 5'
+        )).all()
+        if repetidos:
+            ejemplos = '; '.join(', '.join(str(valor) for valor in fila[:-1]) + f' ({fila[-1]} filas)' for fila in repetidos)
+            raise MigracionFallida(f'{tabla} tiene filas repetidas por ({lista}); elimine los duplicados y vuelva a iniciar. Ejemplos: {ejemplos}')
+    return aplicar
+
+def _en_orden(*pasos):
+    def aplicar():
+        for paso in pasos:
+            paso()
+    return aplicar
+
+# Cambios de esquema que db.create_all() no aplica a una base existente, en orden de
+# aplicación. Cada versión se aplica una sola vez y queda registrada en migracion_esquema;
+# los pasos toleran una base nueva en la que create_all() ya creó todo. No se editan
+# versiones publicadas: un cambio nuevo es una versión nueva al final.
+#
+# Es un registro propio en lugar de Alembic (que no está entre las dependencias): los
+# cambios solo agregan columnas e índices, no hay migraciones hacia atrás y create_all()
+# sigue creando las tablas nuevas. Si hicieran falta cambios que reescriban tablas
+# (renombrar o quitar columnas, cambiar tipos), conviene pasar a Alembic partiendo de la
+# última versión de esta lista.
+MIGRACIONES = (
+    ('0001_clave_producto', _en_orden(
+        _agregar_columna('inventario', 'clave_producto', f'VARCHAR({LARGO_CLAVE})'),
+        _agregar_columna('lista_proveedor', 'clave_producto', f'VARCHAR({LARGO_CLAVE})'),
+        _crear_indices('ix_inventario_clave_producto', 'ix_lista_proveedor_clave_producto')
+    )),
+    ('0002_inventario_farmacia_codigo', _en_orden(
+        _sin_duplicados('inventario', 'farmacia_id', 'codigo'),
+        _crear_indices('ix_inventario_farmacia_codigo')
+    )),
+    ('0003_inventario_vencimiento', _crear_indices('ix_inventario_vencimiento_farmacia')),
+    ('0004_proveedor_pedido_minimo', _agregar_columna('proveedor', 'pedido_minimo', 'FLOAT DEFAULT 0')),
+    ('0005_indices_consultas_frecuentes', _crear_indices(
+        'ix_inventario_codigo',
+        'ix_inventario_pedido_farmacia',
+        'ix_lista_proveedor_proveedor_codigo',
+        'ix_lista_proveedor_codigo',
+        'ix_venta_farmacia_id',
+        'ix_venta_cliente_id',
+        'ix_venta_detalle_venta_id'
+    )),
+    ('0006_venta_acumulada', _en_orden(
+        _agregar_columna('venta', 'acumulada', 'BOOLEAN NOT NULL DEFAULT FALSE'),
+        _crear_indices('ix_venta_sin_acumular')
+    )),
+    ('0007_usuario_permisos_version', _agregar_columna('user', 'permisos_version', 'INTEGER NOT NULL DEFAULT 0')),
+    ('0008_lista_proveedor_clave_codigo', _en_orden(
+        _agregar_columna('lista_proveedor', 'clave_codigo', f'VARCHAR({LARGO_CLAVE})'),
+        _crear_indices('ix_lista_proveedor_clave_codigo')
+    )),
+)
+
+def migrar():
+    """Aplica las migraciones pendientes, cada una en su transacción junto con su registro.
+
+    Si otro proceso registró la misma versión a la vez (los pasos son
+    idempotentes) se continúa con la siguiente. Cualquier otra falla deshace la
+    versión y lanza MigracionFallida: las versiones siguientes y el código que
+    depende de ellas (p. ej. el upsert de inventario sobre el índice único por
+    farmacia y código) no pueden funcionar sin ella. Retorna las versiones
+    aplicadas.
+    """
+    aplicadas = {version for (version,) in db.session.query(MigracionEsquema.version)}
+    nuevas = []
+    for version, aplicar in MIGRACIONES:
+        if version in aplicadas:
+            continue
+        try:
+            aplicar()
+            db.session.add(MigracionEsquema(version=version))
+            db.session.commit()
+            nuevas.append(version)
+        except MigracionFallida:
+            db.session.rollback()
+            raise
+        except IntegrityError as e:
+            db.session.rollback()
+            if db.session.get(MigracionEsquema, version) is None:
+                raise MigracionFallida(f'La migración {version} no se pudo aplicar: {e.orig}') from e
+    return nuevas
+
+def _consultas_frecuentes():
+    """(nombre, consulta) de las lecturas de las rutas que deben resolverse con un índice"""
+    hoy = date.today()
+    return (
+        ('inventario por farmacia y código', select(Inventario.id).where(
+            Inventario.farmacia_id == 1, Inventario.codigo == 'X')),
+        ('inventario por código en la red', select(Inventario.id, Inventario.descripcion).where(
+            Inventario.codigo.in_(['X', 'Y']))),
+        ('inventario por clave de producto', select(Inventario.id).where(Inventario.clave_producto == 'x')),
+        ('inventario sin stock', select(func.count()).select_from(Inventario).where(Inventario.pedido == 0)),
+        ('inventario por vencer', select(Inventario.id).where(
+            Inventario.fecha_vencimiento >= hoy, Inventario.fecha_vencimiento <= hoy + timedelta(days=60))),
+        ('lista de un proveedor', select(ListaProveedor.codigo, ListaProveedor.id).where(ListaProveedor.proveedor_id == 1)),
+        ('ofertas de un producto', select(ComparacionPrecio.id).where(
+            ComparacionPrecio.clave_producto == 'x').order_by(ComparacionPrecio.precio_con_descuento_comercial)),
+        ('ofertas por código de producto', select(ComparacionPrecio.id).where(
+            ComparacionPrecio.clave_codigo == 'x', ComparacionPrecio.proveedor_id.in_([1, 2]))),
+        ('ofertas de un proveedor', select(ComparacionPrecio.clave_producto).where(ComparacionPrecio.proveedor_id == 1)),
+        ('ventas de una farmacia', select(Venta.id).where(Venta.farmacia_id == 1).order_by(Venta.id.desc()).limit(100)),
+        ('ventas de un cliente', select(Venta.id).where(Venta.cliente_id == 1).order_by(Venta.id.desc()).limit(100)),
+        ('detalle de una venta', select(VentaDetalle.id).where(VentaDetalle.venta_id == 1)),
+        ('ventas sin acumular', select(Venta.id).where(Venta.acumulada == False).order_by(Venta.id).limit(100)),
+        ('ventas diarias de un rango', select(VentaDiaria.codigo).where(
+            VentaDiaria.fecha >= hoy - timedelta(days=30), VentaDiaria.fecha <= hoy)),
+    )
+
+def verificar_indices():
+    """Plan de ejecución de las consultas frecuentes; retorna [(nombre, plan)] de las que recorren una tabla completa.
+
+    En SQLite se revisa EXPLAIN QUERY PLAN (un SCAN sin índice); en Postgres se
+    desactiva el recorrido secuencial para la transacción, de modo que un Seq
+    Scan en el plan significa que no hay índice aplicable.
+    """
+    postgres = db.engine.dialect.name == 'postgresql'
+    if postgres:
+        db.session.execute(text('SET LOCAL enable_seqscan = off'))
+    fallidas = []
+    for nombre, consulta in _consultas_frecuentes():
+        sql = str(consulta.compile(db.engine, compile_kwargs={'literal_binds': True}))
+        if postgres:
+            plan = [fila[0] for fila in db.session.execute(text(f'EXPLAIN {sql}'))]
+            recorridos = [paso for paso in plan if 'Seq Scan' in paso]
+        else:
+            plan = [fila[-1] for fila in db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}'))]
+            recorridos = [paso for paso in plan if paso.startswith('SCAN') and 'INDEX' not in paso]
+        if recorridos:
+            fallidas.append((nombre, plan))
+    db.session.rollback()
+    return fallidas
+
+def pendientes():
+    """Versiones aún no aplicadas"""
+    aplicadas = {version for (version,) in db.session.query(MigracionEsquema.version)}
+    return [version for version, _ in MIGRACIONES if version not in aplicadas]
+
+def init_app(app):
+    """Aplica las migraciones pendientes y registra los comandos de esquema"""
+    with app.app_context():
+        migrar()
+
+    @app.cli.command('migrar-esquema')
+    def migrar_esquema_command():
+        """Aplica las migraciones de esquema pendientes."""
+        for version in migrar():
+            click.echo(f'Aplicada: {version}')
+
+    @app.cli.command('verificar-indices')
+    def verificar_indices_command():
+        """Falla (código 1) si alguna consulta frecuente recorre una tabla completa."""
+        fallidas = verificar_indices()
+        for nombre, plan in fallidas:
+            click.echo(f'{nombre}: ' + ' | '.join(plan), err=True)
+        if fallidas:
+            raise SystemExit(1)
+        click.echo('Todas las consultas frecuentes usan índices')
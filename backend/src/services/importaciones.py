@@ -0,0 +1,148 @@
+import json
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import func
+from werkzeug.utils import secure_filename
+from src.models.user import db
+from src.models.importacion import TrabajoImportacion
+from src.services.carga_inventario import procesar_archivo_inventario
+from src.services.carga_lista_proveedor import procesar_archivo_lista
+from src.services.lectura_archivos import formato_archivo
+
+# Carpeta de los archivos encolados hasta procesarlos (configurable con IMPORT_FOLDER)
+IMPORT_FOLDER = os.environ.get('IMPORT_FOLDER') or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'database', 'importaciones')
+
+# Procesador de cada tipo de trabajo: recibe (referencia_id, stream, formato, progreso=...)
+PROCESADORES = {
+    'inventario': procesar_archivo_inventario,
+    'lista_proveedor': procesar_archivo_lista
+}
+
+# Segundos sin latido tras los cuales un trabajo en "procesando" se da por abandonado
+# (configurable con IMPORT_TIMEOUT_SEGUNDOS); el latido se renueva con cada lote
+TIMEOUT_LATIDO = 600
+
+_app = None
+_executor = None
+
+def _registrar_fallo(futuro):
+    # El pool descarta las excepciones de las tareas: las que escapan de ejecutar_trabajo se registran aquí
+    error = futuro.exception()
+    if error is not None:
+        _app.logger.error('Error al ejecutar un trabajo de importación', exc_info=error)
+
+def _enviar(trabajo_id):
+    _executor.submit(ejecutar_trabajo, trabajo_id).add_done_callback(_registrar_fallo)
+
+def recuperar_abandonados(timeout=None):
+    """Devuelve a "pendiente" los trabajos en "procesando" sin latido reciente; retorna cuántos.
+
+    Un trabajo que otro proceso vivo está ejecutando renueva su latido con cada
+    lote, así que no se toca. La carga es un upsert: volver a procesar desde el
+    inicio un trabajo interrumpido es seguro.
+    """
+    if timeout is None:
+        timeout = int(os.environ.get('IMPORT_TIMEOUT_SEGUNDOS', TIMEOUT_LATIDO))
+    limite = datetime.utcnow() - timedelta(seconds=timeout)
+    recuperados = db.session.query(TrabajoImportacion).filter(
+        TrabajoImportacion.estado == 'procesando',
+        func.coalesce(TrabajoImportacion.latido, TrabajoImportacion.fecha_inicio) < limite
+    ).update({'estado': 'pendiente'}, synchronize_session=False)
+    db.session.commit()
+    return recuperados
+
+def init_app(app):
+    """Crea el pool de trabajadores y reanuda los trabajos que quedaron sin terminar.
+
+    Las cargas se guardan en disco y se registran en `trabajo_importacion`, por lo
+    que la cola sobrevive a un reinicio sin necesidad de un broker externo.
+    """
+    global _app, _executor
+    _app = app
+    _executor = ThreadPoolExecutor(
+        max_workers=int(os.environ.get('IMPORT_WORKERS', 2)),
+        thread_name_prefix='importacion'
+    )
+    os.makedirs(IMPORT_FOLDER, exist_ok=True)
+
+    with app.app_context():
+        # Solo se recuperan los trabajos abandonados: con varios workers (o el reloader
+        # de debug) otro proceso vivo puede estar ejecutando los demás. Si varios procesos
+        # envían el mismo pendiente, solo uno lo reclama (ver ejecutar_trabajo).
+        recuperar_abandonados()
+        pendientes = [t.id for t in TrabajoImportacion.query.filter_by(estado='pendiente').all()]
+
+    for trabajo_id in pendientes:
+        _enviar(trabajo_id)
+
+def encolar_importacion(tipo, referencia_id, file):
+    """Guarda el archivo recibido, registra el trabajo y lo envía al pool"""
+    trabajo_id = uuid.uuid4().hex
+    # Se conserva la extensión original para saber con qué lector procesarlo
+    archivo = os.path.join(IMPORT_FOLDER, f'{trabajo_id}.{formato_archivo(file.filename) or "xlsx"}')
+    file.save(archivo)
+
+    trabajo = TrabajoImportacion(
+        id=trabajo_id,
+        tipo=tipo,
+        referencia_id=referencia_id,
+        nombre_archivo=secure_filename(file.filename),
+        archivo=archivo
+    )
+    db.session.add(trabajo)
+    db.session.commit()
+
+    _enviar(trabajo_id)
+    return trabajo
+
+def ejecutar_trabajo(trabajo_id):
+    """Procesa un trabajo encolado dentro de su propio contexto de aplicación"""
+    with _app.app_context():
+        # Reclamar el trabajo de forma atómica para que ningún otro proceso lo tome
+        reclamado = db.session.query(TrabajoImportacion).filter_by(
+            id=trabajo_id, estado='pendiente'
+        ).update(
+            {'estado': 'procesando', 'fecha_inicio': datetime.utcnow(), 'latido': datetime.utcnow(), 'filas_procesadas': 0},
+            synchronize_session=False
+        )
+        db.session.commit()
+        if not reclamado:
+            return
+
+        trabajo = db.session.get(TrabajoImportacion, trabajo_id)
+
+        def progreso(filas_procesadas, errores):
+            # Se guarda en la misma transacción que el lote de datos
+            db.session.query(TrabajoImportacion).filter_by(id=trabajo_id).update(
+                {'filas_procesadas': filas_procesadas, 'errores': json.dumps(errores), 'latido': datetime.utcnow()},
+                synchronize_session=False
+            )
+
+        try:
+            with open(trabajo.archivo, 'rb') as stream:
+                resultado = PROCESADORES[trabajo.tipo](
+                    trabajo.referencia_id, stream, formato_archivo(trabajo.archivo), progreso=progreso
+                )
+
+            trabajo = db.session.get(TrabajoImportacion, trabajo_id)
+            if resultado is None:
+                trabajo.estado = 'error'
+                trabajo.mensaje_error = 'No se encontraron headers válidos en el archivo'
+            else:
+                trabajo.estado = 'completado'
+                trabajo.filas_procesadas = resultado['filas_leidas']
+                trabajo.errores = json.dumps(resultado['errores'])
+                trabajo.resultado = json.dumps(resultado)
+        except Exception as e:
+            db.session.rollback()
+            trabajo = db.session.get(TrabajoImportacion, trabajo_id)
+            trabajo.estado = 'error'
+            trabajo.mensaje_error = str(e)
+
+        trabajo.fecha_fin = datetime.utcnow()
+        db.session.commit()
+
+        if os.path.exists(trabajo.archivo):
+            os.remove(trabajo.archivo)
@@ -0,0 +1,134 @@
+import codecs
+import csv
+from itertools import chain, islice
+import openpyxl
+
+# pyarrow es opcional: si está instalado se aceptan también archivos Parquet
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+# Filas que se piden al lector Parquet por cada lote columnar
+TAMANO_LOTE_PARQUET = 5000
+
+# Separadores aceptados en CSV y líneas usadas para detectarlo
+SEPARADORES_CSV = (',', ';', '\t')
+LINEAS_MUESTRA_CSV = 5
+
+# openpyxl solo lee el formato .xlsx; los .xls (Excel 97-2003) se rechazan al subirlos
+EXTENSIONES_PERMITIDAS = {'xlsx', 'csv'}
+if pq is not None:
+    EXTENSIONES_PERMITIDAS.add('parquet')
+
+def formato_archivo(filename):
+    """Retorna la extensión del archivo en minúsculas, o None si no tiene"""
+    if not filename or '.' not in filename:
+        return None
+    return filename.rsplit('.', 1)[1].lower()
+
+def allowed_file(filename):
+    return formato_archivo(filename) in EXTENSIONES_PERMITIDAS
+
+def error_formato(filename):
+    """Mensaje para un archivo que allowed_file rechaza, con los formatos aceptados"""
+    if formato_archivo(filename) == 'xls':
+        return 'Los archivos .xls (Excel 97-2003) no se pueden leer; guárdelo como .xlsx o .csv'
+    permitidos = ', '.join(f'.{extension}' for extension in sorted(EXTENSIONES_PERMITIDAS))
+    return f'Tipo de archivo no permitido (se aceptan {permitidos})'
+
+def iterar_filas(stream, formato):
+    """Recorre las filas de un archivo tabular según su formato.
+
+    Todos los lectores generan tuplas (numero_fila, valores) con las columnas en
+    el mismo orden del archivo, de modo que el mapeo de columnas es el mismo sin
+    importar el formato. En Parquet la fila 1 son los nombres de las columnas.
+    """
+    if formato == 'csv':
+        return iterar_filas_csv(stream)
+    if formato == 'parquet':
+        return iterar_filas_parquet(stream)
+    return iterar_filas_excel(stream)
+
+def iterar_filas_excel(stream):
+    """Recorre la hoja activa de un Excel en modo streaming.
+
+    Usa el modo de solo lectura de openpyxl, que no construye los objetos de
+    celda en memoria, de modo que el consumo se mantiene estable sin importar el
+    tamaño del archivo. `stream` puede ser cualquier objeto tipo archivo con
+    seek (por ejemplo `request.files['file'].stream`).
+    """
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        for row_num, row in enumerate(sheet.iter_rows(values_only=True), start=1):
+            yield row_num, row
+    finally:
+        workbook.close()
+
+def iterar_filas_csv(stream):
+    """Recorre un CSV exportado por los POS de las sucursales.
+
+    Detecta el separador (coma, punto y coma o tabulador) a partir de las primeras
+    líneas y convierte las celdas vacías en None, igual que las celdas vacías del
+    Excel.
+    """
+    lector_texto = codecs.getreader('utf-8-sig')(stream, errors='replace')
+    muestra = list(islice(lector_texto, LINEAS_MUESTRA_CSV))
+    separador = max(SEPARADORES_CSV, key=lambda sep: sum(linea.count(sep) for linea in muestra))
+
+    lineas = chain(muestra, lector_texto)
+    for row_num, row in enumerate(csv.reader(lineas, delimiter=separador), start=1):
+        yield row_num, tuple(celda.strip() or None for celda in row)
+
+def iterar_filas_parquet(stream):
+    """Recorre un archivo Parquet por lotes columnares (requiere pyarrow)"""
+    if pq is None:
+        raise ValueError('El formato Parquet requiere tener pyarrow instalado')
+
+    archivo = pq.ParquetFile(stream)
+    yield 1, tuple(archivo.schema_arrow.names)
+
+    row_num = 1
+    for lote in archivo.iter_batches(batch_size=TAMANO_LOTE_PARQUET):
+        # Arrow ya entrega los valores tipados; solo se transponen las columnas
+        columnas = [columna.to_pylist() for columna in lote.columns]
+        for row in zip(*columnas):
+            row_num += 1
+            yield row_num, row
+
+def en_lotes(iterable, tamano):
+    """Agrupa un iterable en listas de hasta `tamano` elementos"""
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+def a_numero(valor):
+    """Convierte un valor de celda en número.
+
+    Los números se retornan tal cual; los textos se aceptan con coma o punto
+    decimal. Si aparecen ambos separadores, el último es el decimal ("1.234,50"
+    y "1,234.50" son 1234.5); un separador repetido es de miles ("1.234.567").
+    Una sola coma es decimal ("12,50"). Retorna None si no es numérico.
+    """
+    if isinstance(valor, bool) or valor is None:
+        return None
+    if isinstance(valor, (int, float)):
+        return valor
+
+    texto = str(valor).strip().replace(' ', '')
+    if ',' in texto and '.' in texto:
+        miles = ',' if texto.rfind('.') > texto.rfind(',') else '.'
+        texto = texto.replace(miles, '')
+    else:
+        for separador in (',', '.'):
+            if texto.count(separador) > 1:
+                texto = texto.replace(separador, '')
+    texto = texto.replace(',', '.')
+    try:
+        return float(texto)
+    except ValueError:
+        return None
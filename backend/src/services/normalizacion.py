@@ -0,0 +1,164 @@
+import re
+import unicodedata
+
+# Filas cuya clave se calcula y guarda por lote al completar datos existentes
+TAMANO_LOTE_CLAVES = 1000
+
+# Longitud máxima de la columna clave_producto
+LARGO_CLAVE = 300
+
+# Unidades de concentración/contenido y su forma canónica
+UNIDADES = {
+    'mg': 'mg', 'mgs': 'mg', 'miligramos': 'mg',
+    'g': 'g', 'gr': 'g', 'grs': 'g', 'gramos': 'g',
+    'kg': 'kg',
+    'mcg': 'mcg', 'ug': 'mcg', 'µg': 'mcg', 'microgramos': 'mcg',
+    'ml': 'ml', 'mls': 'ml', 'cc': 'ml', 'mililitros': 'ml',
+    'l': 'l', 'lt': 'l', 'lts': 'l', 'litro': 'l', 'litros': 'l',
+    'ui': 'ui', 'u': 'ui',
+    '%': '%'
+}
+
+# Formas farmacéuticas que los proveedores escriben de distintas maneras
+FORMAS = {
+    'tableta': 'tab', 'tabletas': 'tab', 'tab': 'tab', 'tabs': 'tab', 'tb': 'tab',
+    'comprimido': 'tab', 'comprimidos': 'tab', 'comp': 'tab', 'cpr': 'tab', 'cp': 'tab',
+    'capsula': 'cap', 'capsulas': 'cap', 'cap': 'cap', 'caps': 'cap', 'cps': 'cap',
+    'gragea': 'grag', 'grageas': 'grag', 'grag': 'grag',
+    'ampolla': 'amp', 'ampollas': 'amp', 'amp': 'amp', 'amps': 'amp',
+    'jarabe': 'jbe', 'jbe': 'jbe',
+    'suspension': 'susp', 'susp': 'susp',
+    'solucion': 'sol', 'sol': 'sol',
+    'sobre': 'sob', 'sobres': 'sob', 'sob': 'sob'
+}
+
+# Palabras que solo acompañan el tamaño del empaque ("caja x 30", "frasco c/ 100")
+PALABRAS_EMPAQUE = {'caja', 'cja', 'cj', 'frasco', 'fco', 'blister', 'paquete', 'pack', 'empaque', 'unidades', 'und', 'unds', 'uds'}
+
+_patron_unidades = '|'.join(sorted((re.escape(u) for u in UNIDADES), key=len, reverse=True))
+_re_decimal = re.compile(r'(\d),(\d)')
+_re_cantidad_unidad = re.compile(rf'(\d+(?:\.\d+)?)\s*({_patron_unidades})(?![a-z])')
+_re_empaque = re.compile(r'(?:\bx|\bc/|\bpor\b)\s*(\d+)')
+_re_separadores = re.compile(r'[^a-z0-9%.]+')
+
+def quitar_acentos(texto):
+    """Elimina tildes y diéresis (á -> a, ñ -> n)"""
+    return ''.join(c for c in unicodedata.normalize('NFKD', texto) if not unicodedata.combining(c))
+
+def _unir_cantidad_unidad(coincidencia):
+    cantidad, unidad = coincidencia.groups()
+    if '.' in cantidad:
+        cantidad = cantidad.rstrip('0').rstrip('.')  # 0.50 -> 0.5, 1.0 -> 1
+    return f' {cantidad}{UNIDADES[unidad]} '
+
+def normalizar_descripcion(descripcion):
+    """Forma canónica de una descripción de producto.
+
+    Quita acentos y signos, pasa a minúsculas, une cantidad y unidad ("500 MG" ->
+    "500mg"), unifica unidades, formas farmacéuticas y tamaños de empaque
+    ("caja x 30", "X30", "c/30" -> "x30") y colapsa los espacios.
+    """
+    if not descripcion:
+        return ''
+    texto = quitar_acentos(str(descripcion)).lower().replace('µ', 'u')
+    texto = _re_decimal.sub(r'\1.\2', texto)
+    texto = _re_cantidad_unidad.sub(_unir_cantidad_unidad, texto)
+    texto = _re_empaque.sub(r' x\1 ', texto)
+    texto = _re_separadores.sub(' ', texto)
+
+    palabras = []
+    for palabra in texto.split():
+        palabra = palabra.strip('.')
+        if not palabra or palabra in PALABRAS_EMPAQUE:
+            continue
+        palabras.append(FORMAS.get(palabra, palabra))
+    return ' '.join(palabras)
+
+def normalizar_codigo(codigo):
+    """Código sin espacios, guiones ni puntos, en mayúsculas.
+
+    Los códigos numéricos que Excel entrega como decimales ("7501.0") pierden
+    la parte decimal.
+    """
+    if codigo is None:
+        return ''
+    codigo = str(codigo).strip()
+    if re.fullmatch(r'\d+\.0+', codigo):
+        codigo = codigo.split('.')[0]
+    return re.sub(r'[\s\-.]+', '', codigo).upper()
+
+def normalizar_ean(valor):
+    """Retorna el código de barras como EAN-13 si `valor` es un GTIN válido (8, 12, 13 o 14 dígitos); si no, None"""
+    codigo = normalizar_codigo(valor)
+    if not codigo.isdigit() or len(codigo) not in (8, 12, 13, 14):
+        return None
+
+    # Dígito verificador GS1: pesos 3 y 1 alternados desde la derecha
+    cuerpo, verificador = codigo[:-1], int(codigo[-1])
+    suma = sum(int(d) * (3 if i % 2 == 0 else 1) for i, d in enumerate(reversed(cuerpo)))
+    if (10 - suma % 10) % 10 != verificador:
+        return None
+
+    if len(codigo) == 14:
+        if codigo[0] != '0':
+            return codigo  # GTIN-14 de empaque logístico, se conserva tal cual
+        codigo = codigo[1:]
+    return codigo.zfill(13)
+
+def clave_codigo(codigo, ean=None):
+    """Clave de un producto por su código, sin la descripción.
+
+    Es el código de barras si hay uno válido (en `ean` o en el propio código)
+    y si no el código normalizado. Agrupa las filas de inventario de las
+    farmacias, que escriben la descripción de un mismo código de distintas
+    maneras, y las une con las ofertas de los proveedores.
+    """
+    barras = normalizar_ean(ean) or normalizar_ean(codigo)
+    if barras:
+        return f'ean:{barras}'
+    return normalizar_codigo(codigo)[:LARGO_CLAVE]
+
+def clave_producto(codigo, descripcion, ean=None):
+    """Clave canónica con la que se agrupa un mismo producto entre proveedores.
+
+    Si hay un código de barras válido (en `ean` o en el propio código) la clave
+    es ese EAN; si no, el código y la descripción normalizados, ya que cada
+    proveedor puede usar el mismo código para productos distintos.
+    """
+    barras = normalizar_ean(ean) or normalizar_ean(codigo)
+    if barras:
+        return f'ean:{barras}'
+    return f'{normalizar_codigo(codigo)}_{normalizar_descripcion(descripcion)}'[:LARGO_CLAVE]
+
+def _completar_claves(modelo, columna, calcular):
+    """Calcula las claves faltantes de `columna` (filas cargadas antes de existir la columna, ver src/services/esquema.py).
+
+    `calcular` recibe el código y la descripción de la fila. Retorna la cantidad de filas actualizadas.
+    """
+    from src.models.user import db
+
+    actualizadas = 0
+    ultimo_id = 0
+    while True:
+        filas = db.session.query(modelo.id, modelo.codigo, modelo.descripcion).filter(
+            getattr(modelo, columna).is_(None), modelo.id > ultimo_id
+        ).order_by(modelo.id).limit(TAMANO_LOTE_CLAVES).all()
+        if not filas:
+            break
+        db.session.bulk_update_mappings(modelo, [
+            {'id': fila.id, columna: calcular(fila.codigo, fila.descripcion)} for fila in filas
+        ])
+        db.session.commit()
+        actualizadas += len(filas)
+        ultimo_id = filas[-1].id
+    return actualizadas
+
+def init_app(app):
+    """Completa las claves de producto de inventarios y listas cargados antes de existir las columnas"""
+    from src.models.inventario import Inventario
+    from src.models.lista_proveedor import ListaProveedor
+
+    with app.app_context():
+        _completar_claves(Inventario, 'clave_producto', lambda codigo, descripcion: clave_codigo(codigo))
+        _completar_claves(ListaProveedor, 'clave_producto', clave_producto)
+        _completar_claves(ListaProveedor, 'clave_codigo', lambda codigo, descripcion: clave_codigo(codigo))
@@ -0,0 +1,204 @@
+from flask import current_app
+from sqlalchemy import select, case, and_, literal
+from src.models.user import db
+from src.models.proveedor import Proveedor
+from src.models.comparacion_precio import ComparacionPrecio
+
+# Costo anual del dinero con el que se valoran los días de crédito (configurable con COMPRAS_TASA_ANUAL)
+TASA_ANUAL_DEFECTO = 0.12
+
+def condiciones_pago(tasa_anual):
+    """Condición de pago más conveniente de cada proveedor activo y su factor sobre el precio con descuento comercial.
+
+    De contado se aplica el descuento por pronto pago; a crédito se paga el
+    precio completo, pero al final del plazo, por lo que su costo es el valor
+    presente del precio a `tasa_anual`. Como ambos factores son iguales para
+    todos los productos del proveedor, la condición se elige por pedido.
+    """
+    condiciones = {}
+    for proveedor in Proveedor.query.filter_by(activo=True):
+        contado = 1 - (proveedor.descuento_pronto_pago or 0) / 100
+        credito = 1 / (1 + tasa_anual * (proveedor.dias_credito or 0) / 365)
+        condiciones[proveedor.id] = {
+            'proveedor': proveedor,
+            'condicion_pago': 'contado' if contado < credito else 'credito',
+            # Monto a pagar y costo por unidad de precio con descuento comercial
+            'factor_pago': contado if contado < credito else 1,
+            'factor_costo': min(contado, credito)
+        }
+    return condiciones
+
+def leer_opciones(productos, condiciones):
+    """Lista de líneas (una por producto con cantidad) con sus ofertas ordenadas por costo efectivo.
+
+    La matriz de costos (dispersa: líneas × ofertas disponibles) se arma en
+    una sola consulta: el costo y el precio a pagar de cada oferta se
+    calculan en la BD con el factor de su proveedor y vienen ordenados por
+    producto y costo, de modo que aquí solo se agrupan. Cada línea queda con
+    `opciones` = [(costo_unitario, proveedor_id, precio_unitario, codigo_proveedor)].
+    """
+    if condiciones:
+        precio = ComparacionPrecio.precio_con_descuento_comercial
+        factores_costo = {proveedor_id: condicion['factor_costo'] for proveedor_id, condicion in condiciones.items()}
+        factores_pago = {proveedor_id: condicion['factor_pago'] for proveedor_id, condicion in condiciones.items()}
+        costo = precio * case(factores_costo, value=ComparacionPrecio.proveedor_id)
+        pago = precio * case(factores_pago, value=ComparacionPrecio.proveedor_id)
+    else:
+        costo = pago = literal(None)
+
+    filas = db.session.execute(select(
+        productos.c.clave_producto,
+        productos.c.codigo,
+        productos.c.descripcion,
+        productos.c.laboratorio,
+        productos.c.cantidad_total,
+        costo,
+        ComparacionPrecio.proveedor_id,
+        pago,
+        ComparacionPrecio.codigo
+    ).outerjoin(ComparacionPrecio, and_(
+        ComparacionPrecio.clave_codigo == productos.c.clave_producto,
+        ComparacionPrecio.proveedor_id.in_(list(condiciones))
+    )).where(productos.c.cantidad_total > 0).order_by(
+        productos.c.clave_producto, costo, ComparacionPrecio.proveedor_id
+    ))
+
+    lineas = []
+    linea = None
+    for clave, codigo, descripcion, laboratorio, cantidad, *opcion in filas:
+        if linea is None or linea['clave_producto'] != clave:
+            linea = {
+                'clave_producto': clave,
+                'codigo': codigo,
+                'descripcion': descripcion,
+                'laboratorio': laboratorio,
+                'cantidad': cantidad,
+                'opciones': []
+            }
+            lineas.append(linea)
+        if opcion[1] is not None:
+            linea['opciones'].append(tuple(opcion))
+    return lineas
+
+def _mejor_opcion(linea, abiertos):
+    return next((opcion for opcion in linea['opciones'] if opcion[1] in abiertos), None)
+
+def asignar_proveedores(lineas, minimos):
+    """Asigna cada línea a un proveedor minimizando el costo total con los pedidos mínimos.
+
+    Cada línea parte en su oferta más barata. Mientras haya pedidos bajo su
+    mínimo, se cierra el proveedor cuyo cierre encarece menos el total (sus
+    líneas pasan a su siguiente mejor oferta entre los proveedores que siguen
+    abiertos); un proveedor con líneas que nadie más ofrece no se puede
+    cerrar. Cerrar un pedido solo suma montos a los demás, así que ninguno
+    que cumple su mínimo deja de cumplirlo. Retorna {indice_linea: opcion}.
+    """
+    abiertos = {opcion[1] for linea in lineas for opcion in linea['opciones']}
+    asignacion = {}
+    montos = dict.fromkeys(abiertos, 0.0)
+    lineas_por_proveedor = {proveedor_id: [] for proveedor_id in abiertos}
+    for indice, linea in enumerate(lineas):
+        if linea['opciones']:
+            opcion = asignacion[indice] = linea['opciones'][0]
+            montos[opcion[1]] += opcion[2] * linea['cantidad']
+            lineas_por_proveedor[opcion[1]].append(indice)
+
+    while True:
+        mejor_cierre = None
+        for proveedor_id in abiertos:
+            if not lineas_por_proveedor[proveedor_id] or montos[proveedor_id] >= minimos.get(proveedor_id, 0):
+                continue
+            restantes = abiertos - {proveedor_id}
+            alternativas, recargo = {}, 0.0
+            for indice in lineas_por_proveedor[proveedor_id]:
+                alternativa = _mejor_opcion(lineas[indice], restantes)
+                if alternativa is None:
+                    break
+                alternativas[indice] = alternativa
+                recargo += (alternativa[0] - asignacion[indice][0]) * lineas[indice]['cantidad']
+            else:
+                if mejor_cierre is None or recargo < mejor_cierre[1]:
+                    mejor_cierre = (proveedor_id, recargo, alternativas)
+        if mejor_cierre is None:
+            return asignacion
+
+        proveedor_id, _, alternativas = mejor_cierre
+        abiertos.discard(proveedor_id)
+        lineas_por_proveedor[proveedor_id] = []
+        montos[proveedor_id] = 0.0
+        for indice, alternativa in alternativas.items():
+            asignacion[indice] = alternativa
+            montos[alternativa[1]] += alternativa[2] * lineas[indice]['cantidad']
+            lineas_por_proveedor[alternativa[1]].append(indice)
+
+def optimizar_ordenes(productos, tasa_anual=None):
+    """Arma una orden de compra por proveedor para los productos faltantes.
+
+    `productos` es la subconsulta del consolidado de compras (clave_producto,
+    codigo, descripcion, laboratorio, cantidad_total). Solo se consideran las
+    ofertas disponibles de proveedores activos. Retorna (ordenes, sin_oferta,
+    resumen).
+    """
+    if tasa_anual is None:
+        tasa_anual = current_app.config.get('COMPRAS_TASA_ANUAL', TASA_ANUAL_DEFECTO)
+    condiciones = condiciones_pago(tasa_anual)
+    lineas = leer_opciones(productos, condiciones)
+    asignacion = asignar_proveedores(lineas, {
+        proveedor_id: condicion['proveedor'].pedido_minimo or 0 for proveedor_id, condicion in condiciones.items()
+    })
+
+    ordenes, sin_oferta = {}, []
+    for indice, linea in enumerate(lineas):
+        opcion = asignacion.get(indice)
+        if opcion is None:
+            sin_oferta.append({campo: linea[campo] for campo in ('clave_producto', 'codigo', 'descripcion', 'cantidad')})
+            continue
+
+        costo, proveedor_id, precio, codigo_proveedor = opcion
+        orden = ordenes.get(proveedor_id)
+        if orden is None:
+            condicion = condiciones[proveedor_id]
+            proveedor = condicion['proveedor']
+            orden = ordenes[proveedor_id] = {
+                'proveedor_id': proveedor_id,
+                'proveedor_nombre': proveedor.nombre,
+                'condicion_pago': condicion['condicion_pago'],
+                'dias_credito': (proveedor.dias_credito or 0) if condicion['condicion_pago'] == 'credito' else 0,
+                'descuento_pronto_pago': (proveedor.descuento_pronto_pago or 0) if condicion['condicion_pago'] == 'contado' else 0,
+                'pedido_minimo': proveedor.pedido_minimo or 0,
+                'monto': 0.0,
+                'costo_efectivo': 0.0,
+                'lineas': []
+            }
+        subtotal = precio * linea['cantidad']
+        orden['monto'] += subtotal
+        orden['costo_efectivo'] += costo * linea['cantidad']
+        orden['lineas'].append({
+            'clave_producto': linea['clave_producto'],
+            'codigo': linea['codigo'],
+            'codigo_proveedor': codigo_proveedor,
+            'descripcion': linea['descripcion'],
+            'laboratorio': linea['laboratorio'],
+            'cantidad': linea['cantidad'],
+            'precio_unitario': precio,
+            'subtotal': subtotal,
+            # Diferencia con la oferta más barata del producto, por los pedidos mínimos
+            'recargo_pedido_minimo': (costo - linea['opciones'][0][0]) * linea['cantidad']
+        })
+
+    ordenes = sorted(ordenes.values(), key=lambda orden: -orden['monto'])
+    for orden in ordenes:
+        orden['total_lineas'] = len(orden['lineas'])
+        orden['cumple_minimo'] = orden['monto'] >= orden['pedido_minimo']
+
+    resumen = {
+        'tasa_anual': tasa_anual,
+        'total_lineas': len(lineas),
+        'lineas_asignadas': len(asignacion),
+        'lineas_sin_oferta': len(sin_oferta),
+        'total_ordenes': len(ordenes),
+        'monto_total': sum(orden['monto'] for orden in ordenes),
+        'costo_efectivo_total': sum(orden['costo_efectivo'] for orden in ordenes),
+        'ordenes_bajo_minimo': sum(1 for orden in ordenes if not orden['cumple_minimo'])
+    }
+    return ordenes, sin_oferta, resumen
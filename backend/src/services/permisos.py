@@ -0,0 +1,160 @@
+import threading
+import time
+from types import MappingProxyType
+from sqlalchemy import event, inspect
+
+# Rol cuyos permisos recibe un usuario con un rol desconocido
+ROL_DEFECTO = 'vendedor'
+
+def _congelar(matriz):
+    return MappingProxyType({modulo: MappingProxyType(dict(acciones)) for modulo, acciones in matriz.items()})
+
+# Permisos predefinidos de cada rol, inmutables: se arman una sola vez al importar
+PERMISOS_ROLES = MappingProxyType({rol: _congelar(matriz) for rol, matriz in {
+    'admin': {
+        'farmacias': {'ver': True, 'crear': True, 'editar': True, 'eliminar': True},
+        'inventarios': {'ver': True, 'crear': True, 'editar': True, 'eliminar': True},
+        'busqueda': {'ver': True, 'usar': True},
+        'usuarios': {'ver': True, 'crear': True, 'editar': True, 'eliminar': True, 'cambiar_password': True},
+        'ventas': {'ver': True, 'crear': True, 'editar': True, 'eliminar': True},
+        'proveedores': {'ver': True, 'crear': True, 'editar': True, 'eliminar': True},
+        'reportes': {'ver': True, 'generar': True, 'exportar': True}
+    },
+    'gerente': {
+        'farmacias': {'ver': True, 'crear': True, 'editar': True, 'eliminar': False},
+        'inventarios': {'ver': True, 'crear': True, 'editar': True, 'eliminar': False},
+        'busqueda': {'ver': True, 'usar': True},
+        'usuarios': {'ver': True, 'crear': True, 'editar': True, 'eliminar': False, 'cambiar_password': False},
+        'ventas': {'ver': True, 'crear': True, 'editar': True, 'eliminar': False},
+        'proveedores': {'ver': True, 'crear': True, 'editar': True, 'eliminar': False},
+        'reportes': {'ver': True, 'generar': True, 'exportar': True}
+    },
+    'farmaceutico': {
+        'farmacias': {'ver': True, 'crear': False, 'editar': False, 'eliminar': False},
+        'inventarios': {'ver': True, 'crear': True, 'editar': True, 'eliminar': False},
+        'busqueda': {'ver': True, 'usar': True},
+        'usuarios': {'ver': False, 'crear': False, 'editar': False, 'eliminar': False, 'cambiar_password': False},
+        'ventas': {'ver': True, 'crear': True, 'editar': True, 'eliminar': False},
+        'proveedores': {'ver': True, 'crear': False, 'editar': False, 'eliminar': False},
+        'reportes': {'ver': True, 'generar': False, 'exportar': False}
+    },
+    'vendedor': {
+        'farmacias': {'ver': True, 'crear': False, 'editar': False, 'eliminar': False},
+        'inventarios': {'ver': True, 'crear': False, 'editar': False, 'eliminar': False},
+        'busqueda': {'ver': True, 'usar': True},
+        'usuarios': {'ver': False, 'crear': False, 'editar': False, 'eliminar': False, 'cambiar_password': False},
+        'ventas': {'ver': True, 'crear': True, 'editar': False, 'eliminar': False},
+        'proveedores': {'ver': False, 'crear': False, 'editar': False, 'eliminar': False},
+        'reportes': {'ver': False, 'generar': False, 'exportar': False}
+    }
+}.items()})
+
+class PermisosEfectivos:
+    """Permisos de un usuario (rol + personalizados) compilados para consultar en O(1); inmutable"""
+
+    __slots__ = ('matriz', 'concedidos')
+
+    def __init__(self, matriz):
+        self.matriz = _congelar(matriz)
+        self.concedidos = frozenset(
+            (modulo, accion) for modulo, acciones in matriz.items() for accion, valor in acciones.items() if valor
+        )
+
+    def permite(self, modulo, accion):
+        return (modulo, accion) in self.concedidos
+
+    def to_dict(self):
+        return {modulo: dict(acciones) for modulo, acciones in self.matriz.items()}
+
+# Matrices de los roles ya compiladas (sin permisos personalizados)
+_EFECTIVOS_ROLES = {rol: PermisosEfectivos(matriz) for rol, matriz in PERMISOS_ROLES.items()}
+
+def matriz_rol(rol):
+    """Matriz predefinida del rol (inmutable)"""
+    return PERMISOS_ROLES.get(rol, PERMISOS_ROLES[ROL_DEFECTO])
+
+def compilar(rol, personalizados):
+    """Permisos del rol con los personalizados encima (una acción personalizada reemplaza la del rol)"""
+    if not personalizados:
+        return _EFECTIVOS_ROLES.get(rol, _EFECTIVOS_ROLES[ROL_DEFECTO])
+    matriz = {modulo: dict(acciones) for modulo, acciones in matriz_rol(rol).items()}
+    for modulo, acciones in personalizados.items():
+        matriz.setdefault(modulo, {}).update(acciones)
+    return PermisosEfectivos(matriz)
+
+# Segundos que una entrada de la caché se usa sin volver a la BD (configurable con PERMISOS_CACHE_TTL).
+# Acota cuánto tarda otro worker en ver un cambio confirmado en este.
+TTL_DEFECTO = 60
+
+# Caché de permisos efectivos por usuario: {usuario_id: (permisos_version, vence, PermisosEfectivos)}.
+# permisos_version es la columna del usuario, que cada cambio de rol o de permisos incrementa
+# en la misma transacción; al confirmar el cambio se descarta además la entrada local.
+_cache = {}
+_generaciones = {}
+_bloqueo = threading.Lock()
+_ttl = TTL_DEFECTO
+
+def invalidar(usuario_id):
+    """Descarta los permisos en caché del usuario (después de confirmar un cambio o su eliminación)"""
+    if usuario_id is None:
+        return
+    with _bloqueo:
+        _generaciones[usuario_id] = _generaciones.get(usuario_id, 0) + 1
+        _cache.pop(usuario_id, None)
+
+def en_cache(usuario_id):
+    """PermisosEfectivos del usuario si están en caché y no vencieron, o None"""
+    entrada = _cache.get(usuario_id)
+    if entrada and entrada[1] > time.monotonic():
+        return entrada[2]
+    return None
+
+def _cambios_sin_confirmar(usuario):
+    estado = inspect(usuario)
+    return estado.attrs.rol.history.has_changes() or estado.attrs.permisos.history.has_changes()
+
+def efectivos(usuario):
+    """PermisosEfectivos del usuario, compilados una vez por versión de sus permisos"""
+    if usuario.id is None or _cambios_sin_confirmar(usuario):
+        return compilar(usuario.rol, usuario.get_permisos())
+
+    generacion = _generaciones.get(usuario.id, 0)
+    version = usuario.permisos_version or 0
+    entrada = _cache.get(usuario.id)
+    if entrada and entrada[0] == version:
+        permisos = entrada[2]
+    else:
+        permisos = compilar(usuario.rol, usuario.get_permisos())
+    with _bloqueo:
+        # Si se invalidó mientras se leía el usuario, lo leído puede ser anterior al cambio
+        if _generaciones.get(usuario.id, 0) == generacion:
+            _cache[usuario.id] = (version, time.monotonic() + _ttl, permisos)
+    return permisos
+
+def init_app(app):
+    """Versiona los cambios de permisos al guardarlos y descarta la caché al confirmarlos"""
+    global _ttl
+    from src.models.user import db, User
+
+    _ttl = app.config.get('PERMISOS_CACHE_TTL', TTL_DEFECTO)
+
+    @event.listens_for(db.session, 'before_flush')
+    def _versionar_cambios(session, contexto, instancias):
+        modificados = session.info.setdefault('permisos_modificados', set())
+        for usuario in session.dirty:
+            if isinstance(usuario, User) and _cambios_sin_confirmar(usuario):
+                # Incremento en SQL: dos cambios concurrentes no quedan con la misma versión
+                usuario.permisos_version = User.permisos_version + 1
+                modificados.add(usuario.id)
+        modificados.update(usuario.id for usuario in session.deleted if isinstance(usuario, User))
+
+    @event.listens_for(db.session, 'after_commit')
+    def _invalidar_confirmados(session):
+        for usuario_id in session.info.pop('permisos_modificados', ()):
+            invalidar(usuario_id)
+
+    @event.listens_for(db.session, 'after_rollback')
+    def _descartar_cambios(session):
+        # Lo compilado dentro de la transacción pudo ver los cambios deshechos
+        for usuario_id in session.info.pop('permisos_modificados', ()):
+            invalidar(usuario_id)
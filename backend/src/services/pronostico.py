@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, and_, literal
+from src.models.user import db
+from src.models.inventario import Inventario
+from src.models.venta_diaria import VentaDiaria
+
+# Días de historia con los que se calcula la venta diaria (configurable con PRONOSTICO_DIAS_VENTA)
+DIAS_VENTA_DEFECTO = 30
+
+class Pronostico:
+    """Venta diaria promedio de cada fila de inventario (farmacia + código), como expresión SQL.
+
+    Se calcula sobre los acumulados de los últimos `dias` días (solo esa
+    ventana, sin importar cuánta historia haya) y se une con LEFT JOIN; si en la
+    ventana no hay ventas no se une nada y la venta diaria es 0.
+
+        pronostico = Pronostico()
+        query = pronostico.unir(db.session.query(Inventario.id, pronostico.venta_diaria))
+    """
+
+    def __init__(self, dias=None):
+        self.dias = dias or current_app.config.get('PRONOSTICO_DIAS_VENTA', DIAS_VENTA_DEFECTO)
+        # Las ventas se registran con fecha UTC
+        self.hoy = datetime.utcnow().date()
+        desde = self.hoy - timedelta(days=self.dias - 1)
+
+        self._ventas = None
+        self.venta_diaria = literal(0.0)
+        if db.session.query(VentaDiaria.id).filter(VentaDiaria.fecha >= desde).first() is not None:
+            self._ventas = db.session.query(
+                VentaDiaria.farmacia_id,
+                VentaDiaria.codigo,
+                func.sum(VentaDiaria.cantidad).label('cantidad')
+            ).filter(VentaDiaria.fecha >= desde).group_by(VentaDiaria.farmacia_id, VentaDiaria.codigo).subquery()
+            self.venta_diaria = func.coalesce(self._ventas.c.cantidad, 0) * 1.0 / self.dias
+
+    def unir(self, query):
+        """Agrega a una consulta que incluye Inventario la unión con las ventas de la ventana"""
+        if self._ventas is None:
+            return query
+        return query.outerjoin(self._ventas, and_(
+            self._ventas.c.farmacia_id == Inventario.farmacia_id,
+            self._ventas.c.codigo == Inventario.codigo
+        ))
+
+    def proyeccion(self, stock, venta_diaria):
+        """Venta diaria, días de cobertura del stock y fecha estimada de quiebre (None si no se vende)"""
+        venta_diaria = float(venta_diaria or 0)
+        if venta_diaria <= 0:
+            return {'venta_diaria': 0.0, 'dias_cobertura': None, 'fecha_quiebre': None}
+        dias_cobertura = (stock or 0) / venta_diaria
+        return {
+            'venta_diaria': round(venta_diaria, 3),
+            'dias_cobertura': round(dias_cobertura, 1),
+            'fecha_quiebre': (self.hoy + timedelta(days=int(dias_cobertura))).isoformat()
+        }
+
+def pronostico_vigente(dias=None):
+    """Pronostico sobre los resúmenes de ventas (se actualizan al registrar cada venta)"""
+    return Pronostico(dias)
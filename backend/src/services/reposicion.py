@@ -0,0 +1,148 @@
+from flask import current_app, request
+from sqlalchemy import func, case, and_, literal
+from sqlalchemy.orm import aliased
+from src.models.user import db
+from src.models.inventario import Inventario
+from src.models.politica_reposicion import PoliticaReposicion
+
+# Valores si no hay ninguna política aplicable (configurables con REPOSICION_STOCK_MINIMO/MAXIMO)
+STOCK_MINIMO_DEFECTO = 5
+STOCK_MAXIMO_DEFECTO = 15
+
+# Ámbitos de las reglas, del más específico al más general: (de la farmacia, tipo de regla)
+NIVELES = (
+    (True, 'producto'),
+    (False, 'producto'),
+    (True, 'departamento'),
+    (False, 'departamento'),
+    (True, None)
+)
+
+def _niveles_con_reglas():
+    """Ámbitos que tienen al menos una regla, para no unir tablas que no aportan nada"""
+    presentes = set()
+    for propia, producto, departamento in db.session.query(
+        PoliticaReposicion.farmacia_id.isnot(None),
+        PoliticaReposicion.clave_producto.isnot(None),
+        PoliticaReposicion.departamento.isnot(None)
+    ).distinct():
+        presentes.add((bool(propia), 'producto' if producto else 'departamento' if departamento else None))
+    return [nivel for nivel in NIVELES if nivel in presentes]
+
+def regla_por_defecto():
+    """Regla general: la política sin farmacia, producto ni departamento, completada con la configuración"""
+    regla = PoliticaReposicion.query.filter(
+        PoliticaReposicion.farmacia_id.is_(None),
+        PoliticaReposicion.clave_producto.is_(None),
+        PoliticaReposicion.departamento.is_(None)
+    ).first()
+
+    stock_minimo = current_app.config.get('REPOSICION_STOCK_MINIMO', STOCK_MINIMO_DEFECTO)
+    stock_maximo = current_app.config.get('REPOSICION_STOCK_MAXIMO', STOCK_MAXIMO_DEFECTO)
+    punto_reorden = None
+    if regla:
+        stock_minimo = regla.stock_minimo if regla.stock_minimo is not None else stock_minimo
+        stock_maximo = regla.stock_maximo if regla.stock_maximo is not None else stock_maximo
+        punto_reorden = regla.punto_reorden
+    return {
+        'stock_minimo': stock_minimo,
+        'stock_maximo': stock_maximo,
+        'punto_reorden': punto_reorden if punto_reorden is not None else stock_minimo
+    }
+
+def _primero(valores):
+    return func.coalesce(*valores) if len(valores) > 1 else valores[0]
+
+class Reposicion:
+    """Política de reposición vigente y cantidad sugerida de cada fila de inventario, como expresiones SQL.
+
+    Toda la red se calcula en una sola consulta: las reglas de cada ámbito se
+    unen con LEFT JOIN (solo los ámbitos que tienen reglas) y cada campo toma el
+    valor de la regla más específica que lo define. Si se indica `limite_stock`,
+    reemplaza el punto de reorden de las políticas. Con `traslados` la
+    sugerencia descuenta lo que la fila recibiría como traslado desde otras
+    farmacias con excedente (ver src/services/traslados.py), de modo que solo
+    se compra lo que la red no puede cubrir.
+
+        reposicion = Reposicion()
+        query = reposicion.unir(db.session.query(Inventario.id, reposicion.sugerencia))
+    """
+
+    def __init__(self, limite_stock=None, traslados=False):
+        self._uniones = []
+        minimos, maximos, puntos = [], [], []
+        for propia, tipo in _niveles_con_reglas():
+            regla = aliased(PoliticaReposicion)
+            condiciones = [regla.farmacia_id == Inventario.farmacia_id if propia else regla.farmacia_id.is_(None)]
+            if tipo == 'producto':
+                condiciones.append(regla.clave_producto == Inventario.clave_producto)
+            else:
+                condiciones.append(regla.clave_producto.is_(None))
+                if tipo == 'departamento':
+                    condiciones.append(regla.departamento == Inventario.departamento)
+                else:
+                    condiciones.append(regla.departamento.is_(None))
+            self._uniones.append((regla, and_(*condiciones)))
+
+            minimos.append(regla.stock_minimo)
+            maximos.append(regla.stock_maximo)
+            # El mínimo de una regla es también su punto de reorden si no indica otro
+            puntos.append(func.coalesce(regla.punto_reorden, regla.stock_minimo))
+
+        defecto = regla_por_defecto()
+        minimos.append(literal(defecto['stock_minimo']))
+        maximos.append(literal(defecto['stock_maximo']))
+        puntos.append(literal(defecto['punto_reorden']))
+
+        self.stock = func.coalesce(Inventario.pedido, 0)
+        self.stock_minimo = _primero(minimos)
+        self.stock_maximo = _primero(maximos)
+        self.punto_reorden = literal(limite_stock) if limite_stock is not None else _primero(puntos)
+
+        # Con stock en o bajo el punto de reorden se repone hasta el máximo
+        self.sugerencia = case(
+            (and_(self.stock <= self.punto_reorden, self.stock_maximo > self.stock), self.stock_maximo - self.stock),
+            else_=0
+        )
+
+        self.traslado_entrante = literal(0)
+        if traslados:
+            # La asignación usa las sugerencias sin descontar de toda la red, con sus propios alias
+            from src.services.traslados import traslados_recibidos
+            recibidos = traslados_recibidos(Reposicion(limite_stock))
+            self._uniones.append((recibidos, recibidos.c.id == Inventario.id))
+            self.traslado_entrante = func.coalesce(recibidos.c.recibido, 0)
+            self.sugerencia = self.sugerencia - self.traslado_entrante
+
+    def unir(self, query):
+        """Agrega a una consulta que incluye Inventario las uniones con las reglas"""
+        for regla, condicion in self._uniones:
+            query = query.outerjoin(regla, condicion)
+        return query
+
+    def en_reorden(self):
+        """Filtro de las filas en o bajo su punto de reorden (productos en falla)"""
+        return self.stock <= self.punto_reorden
+
+def reposicion_solicitada():
+    """Reposicion según ?limite_stock y ?traslados (por defecto descuenta los traslados sugeridos; ?traslados=0 no)"""
+    return Reposicion(request.args.get('limite_stock', type=int), request.args.get('traslados', '1') != '0')
+
+def sugerencias_red(reposicion, farmacia_id=None):
+    """Consulta con la política y la cantidad sugerida de cada fila de inventario a reponer en la red"""
+    query = reposicion.unir(db.session.query(
+        Inventario.id.label('inventario_id'),
+        Inventario.farmacia_id,
+        Inventario.codigo,
+        Inventario.descripcion,
+        Inventario.clave_producto,
+        reposicion.stock.label('stock_actual'),
+        reposicion.stock_minimo.label('stock_minimo'),
+        reposicion.stock_maximo.label('stock_maximo'),
+        reposicion.punto_reorden.label('punto_reorden'),
+        reposicion.sugerencia.label('sugerencia'),
+        reposicion.traslado_entrante.label('traslado_entrante')
+    )).filter(reposicion.sugerencia > 0)
+    if farmacia_id:
+        query = query.filter(Inventario.farmacia_id == farmacia_id)
+    return query.order_by(Inventario.id)
@@ -0,0 +1,152 @@
+from datetime import date
+import click
+from sqlalchemy import select, func, bindparam, update
+from sqlalchemy.dialects import postgresql, sqlite
+from src.models.user import db
+from src.models.inventario import Inventario
+from src.models.venta import Venta, VentaDetalle
+from src.models.venta_diaria import VentaDiaria, VentaDiariaLaboratorio, VentaDiariaPago
+
+# Ventas que se marcan y acumulan por consulta
+TAMANO_LOTE_VENTAS = 1000
+
+# INSERT con ON CONFLICT de cada dialecto soportado
+_INSERTS = {'sqlite': sqlite.insert, 'postgresql': postgresql.insert}
+
+def _como_fecha(valor):
+    # SQLite devuelve date() como texto, Postgres como fecha
+    return valor if isinstance(valor, date) else date.fromisoformat(str(valor))
+
+class Resumen:
+    """Tabla de resumen diario por farmacia y una dimensión, con sus sentencias ya armadas.
+
+    Las sentencias se construyen una sola vez (con parámetros) para que
+    acumular las ventas de cada ticket no pague la construcción de las consultas.
+    `origen` es la consulta agrupada de (farmacia_id, dimension, fecha, cantidad,
+    monto) de las ventas con id en :ventas.
+    """
+
+    def __init__(self, modelo, dimension, origen):
+        self.modelo = modelo
+        self.dimension = dimension
+        self.origen = origen
+        self._sumar = {}
+
+    def sql_sumar(self):
+        """INSERT que suma sobre la fila existente del mismo día; dos ventas concurrentes no chocan al crearla"""
+        dialecto = db.engine.dialect.name
+        if dialecto not in self._sumar:
+            sentencia = _INSERTS[dialecto](self.modelo.__table__)
+            self._sumar[dialecto] = sentencia.on_conflict_do_update(
+                index_elements=['farmacia_id', self.dimension, 'fecha'],
+                set_={
+                    'cantidad': self.modelo.cantidad + sentencia.excluded.cantidad,
+                    'monto': self.modelo.monto + sentencia.excluded.monto
+                }
+            )
+        return self._sumar[dialecto]
+
+    def acumular_lote(self, ventas):
+        """Suma las ventas con id en `ventas`. Retorna las filas de resumen tocadas."""
+        acumulados = [{
+            'farmacia_id': farmacia_id,
+            self.dimension: valor,
+            'fecha': _como_fecha(fecha),
+            'cantidad': cantidad,
+            'monto': monto or 0
+        } for farmacia_id, valor, fecha, cantidad, monto in db.session.execute(
+            self.origen, {'ventas': ventas}
+        ) if valor is not None]
+        if acumulados:
+            db.session.execute(self.sql_sumar(), acumulados)
+        return len(acumulados)
+
+def _por_detalle(dimension):
+    """Acumulado por farmacia, `dimension` del inventario y día desde venta_detalle"""
+    dia = func.date(Venta.fecha)
+    return select(
+        Venta.farmacia_id,
+        dimension,
+        dia,
+        func.sum(VentaDetalle.cantidad),
+        func.sum(VentaDetalle.cantidad * VentaDetalle.precio)
+    ).join(Venta, VentaDetalle.venta_id == Venta.id).join(
+        Inventario, VentaDetalle.inventario_id == Inventario.id
+    ).where(
+        VentaDetalle.venta_id.in_(bindparam('ventas', expanding=True)), Venta.fecha.isnot(None)
+    ).group_by(Venta.farmacia_id, dimension, dia)
+
+def _por_metodo_pago():
+    """Acumulado por farmacia, método de pago y día desde venta"""
+    dia = func.date(Venta.fecha)
+    return select(
+        Venta.farmacia_id,
+        Venta.metodo_pago,
+        dia,
+        func.count(Venta.id),
+        func.sum(Venta.total)
+    ).where(
+        Venta.id.in_(bindparam('ventas', expanding=True)), Venta.fecha.isnot(None)
+    ).group_by(Venta.farmacia_id, Venta.metodo_pago, dia)
+
+RESUMENES = (
+    Resumen(VentaDiaria, 'codigo', _por_detalle(Inventario.codigo)),
+    Resumen(VentaDiariaLaboratorio, 'laboratorio', _por_detalle(Inventario.laboratorio)),
+    Resumen(VentaDiariaPago, 'metodo_pago', _por_metodo_pago())
+)
+
+_sql_pendientes = select(Venta.id).where(Venta.acumulada == False).order_by(Venta.id).limit(TAMANO_LOTE_VENTAS)
+
+# Marca las ventas antes de sumarlas. En Postgres, si otra transacción ya marcó alguna,
+# el UPDATE espera a que confirme y la excluye; si se deshace, la marca esta.
+_sql_marcar = update(Venta.__table__).where(
+    Venta.id.in_(bindparam('ventas', expanding=True)), Venta.acumulada == False
+).values(acumulada=True).returning(Venta.id)
+
+def acumular_ventas():
+    """Acumula en las tablas de resumen las ventas aún no acumuladas y las marca.
+
+    Cada venta se suma una sola vez aunque las ventas se confirmen en otro orden
+    que el de sus ids. Trabaja en la transacción actual sin confirmarla: al
+    llamarse antes de confirmar una venta, la venta y sus resúmenes se guardan
+    juntos. Retorna las filas de resumen tocadas.
+    """
+    tocadas = 0
+    while True:
+        pendientes = db.session.scalars(_sql_pendientes).all()
+        if not pendientes:
+            return tocadas
+        marcadas = db.session.scalars(_sql_marcar, {'ventas': pendientes}).all()
+        if marcadas:
+            for resumen in RESUMENES:
+                tocadas += resumen.acumular_lote(marcadas)
+
+def actualizar_resumenes():
+    """Acumula las ventas pendientes y confirma"""
+    tocadas = acumular_ventas()
+    db.session.commit()
+    return tocadas
+
+def vaciar_resumenes():
+    """Vacía los resúmenes y deja todas las ventas pendientes de acumular (sin confirmar)"""
+    for resumen in RESUMENES:
+        db.session.query(resumen.modelo).delete(synchronize_session=False)
+    db.session.execute(update(Venta.__table__).where(Venta.acumulada == True).values(acumulada=False))
+
+def reconstruir_resumenes():
+    """Vacía los resúmenes y los vuelve a calcular desde toda la historia de ventas (confirma)"""
+    vaciar_resumenes()
+    tocadas = acumular_ventas()
+    db.session.commit()
+    return tocadas
+
+def init_app(app):
+    """Acumula las ventas que quedaron pendientes y registra el comando de reconstrucción"""
+    with app.app_context():
+        actualizar_resumenes()
+
+    @app.cli.command('reconstruir-resumenes-ventas')
+    def reconstruir_resumenes_command():
+        """Recalcula desde cero los resúmenes diarios de ventas (p. ej. tras corregir ventas antiguas)."""
+        tocadas = reconstruir_resumenes()
+        click.echo(f'Resúmenes de ventas reconstruidos: {tocadas} filas')
@@ -0,0 +1,54 @@
+import json
+from flask import Response, request, stream_with_context
+
+# Filas que SQLAlchemy trae del cursor en cada viaje al usar yield_per
+TAMANO_LOTE_STREAMING = 1000
+
+def modo_streaming():
+    """Modo pedido con ?stream=: 'ndjson' (un objeto por línea), 'json' (arreglo por partes) o None"""
+    modo = request.args.get('stream')
+    return modo if modo in ('ndjson', 'json') else None
+
+def _json(valor):
+    return json.dumps(valor, ensure_ascii=False, separators=(',', ':'))
+
+def respuesta_lista(items, modo):
+    """Envía un iterable de diccionarios a medida que se genera.
+
+    En modo 'ndjson' cada elemento va en su propia línea; en modo 'json' se
+    escribe un arreglo JSON normal, pero por partes, sin construir la lista
+    completa en memoria.
+    """
+    if modo == 'ndjson':
+        def generar():
+            for item in items:
+                yield _json(item) + '\n'
+        return Response(stream_with_context(generar()), mimetype='application/x-ndjson')
+
+    def generar():
+        yield '['
+        for i, item in enumerate(items):
+            yield (',' if i else '') + _json(item)
+        yield ']'
+    return Response(stream_with_context(generar()), mimetype='application/json')
+
+def respuesta_lista_con_resumen(clave, items, resumen, modo):
+    """Como respuesta_lista, pero agrega un resumen calculado al terminar la lista.
+
+    `resumen` es una función sin argumentos que se llama después de consumir
+    `items`. En modo 'json' la respuesta es {clave: [...], 'resumen_general': {...}};
+    en modo 'ndjson' el resumen va en la última línea como {'resumen_general': {...}}.
+    """
+    if modo == 'ndjson':
+        def generar():
+            for item in items:
+                yield _json(item) + '\n'
+            yield _json({'resumen_general': resumen()}) + '\n'
+        return Response(stream_with_context(generar()), mimetype='application/x-ndjson')
+
+    def generar():
+        yield '{' + _json(clave) + ':['
+        for i, item in enumerate(items):
+            yield (',' if i else '') + _json(item)
+        yield '],"resumen_general":' + _json(resumen()) + '}'
+    return Response(stream_with_context(generar()), mimetype='application/json')
@@ -0,0 +1,122 @@
+from itertools import groupby
+from sqlalchemy import select, func, case, or_
+from src.models.user import db
+from src.models.inventario import Inventario
+from src.models.farmacia import Farmacia
+
+def _tramo(acumulado, propio, total):
+    """Parte de [acumulado - propio, acumulado) que cae dentro de [0, total): lo que se cubre de una fila"""
+    tope = case((acumulado < total, acumulado), else_=total)
+    return case((tope > acumulado - propio, tope - (acumulado - propio)), else_=0)
+
+def asignacion_traslados(reposicion):
+    """Subconsulta con lo que cada fila de inventario recibe o envía en traslados entre farmacias.
+
+    Necesidad es la sugerencia de reposición de la fila; excedente, el stock
+    sobre su máximo. Dentro de cada clave de producto las necesidades se
+    cubren con el excedente total en orden (primero las farmacias con menos
+    stock) y los excedentes se entregan en orden (primero los mayores). Las
+    sumas acumuladas con funciones de ventana resuelven esta asignación
+    voraz para toda la red en una sola consulta: `recibido` y `enviado` son
+    las unidades de cada fila.
+    """
+    excedente = case(
+        (reposicion.stock > reposicion.stock_maximo, reposicion.stock - reposicion.stock_maximo), else_=0
+    )
+    base = reposicion.unir(db.session.query(
+        Inventario.id.label('id'),
+        Inventario.farmacia_id.label('farmacia_id'),
+        Inventario.clave_producto.label('clave_producto'),
+        reposicion.stock.label('stock'),
+        reposicion.sugerencia.label('necesidad'),
+        excedente.label('excedente')
+    )).filter(
+        Inventario.clave_producto.isnot(None),
+        or_(reposicion.sugerencia > 0, reposicion.stock > reposicion.stock_maximo)
+    ).subquery()
+
+    # Una fila tiene necesidad o excedente, nunca ambos: con un solo orden (necesidades
+    # de menor a mayor stock, excedentes de mayor a menor) las dos sumas acumuladas
+    # comparten el ordenamiento y las filas del otro tipo suman 0
+    clave = base.c.clave_producto
+    orden = (
+        case((base.c.necesidad > 0, base.c.stock), else_=-base.c.excedente),
+        base.c.necesidad.desc(),
+        base.c.id
+    )
+    ventanas = select(
+        base,
+        func.sum(base.c.necesidad).over(partition_by=clave, order_by=orden, rows=(None, 0)).label('necesidad_acumulada'),
+        func.sum(base.c.excedente).over(partition_by=clave, order_by=orden, rows=(None, 0)).label('excedente_acumulado'),
+        func.sum(base.c.necesidad).over(partition_by=clave).label('necesidad_total'),
+        func.sum(base.c.excedente).over(partition_by=clave).label('excedente_total')
+    ).subquery()
+
+    return select(
+        ventanas.c.id,
+        ventanas.c.farmacia_id,
+        ventanas.c.clave_producto,
+        ventanas.c.stock,
+        ventanas.c.necesidad,
+        ventanas.c.excedente,
+        _tramo(ventanas.c.necesidad_acumulada, ventanas.c.necesidad, ventanas.c.excedente_total).label('recibido'),
+        _tramo(ventanas.c.excedente_acumulado, ventanas.c.excedente, ventanas.c.necesidad_total).label('enviado')
+    ).where(ventanas.c.necesidad_total > 0, ventanas.c.excedente_total > 0).subquery()
+
+def traslados_recibidos(reposicion):
+    """Subconsulta (id, recibido) de las filas que reciben algún traslado, para descontarlo de la compra"""
+    asignacion = asignacion_traslados(reposicion)
+    return select(asignacion.c.id, asignacion.c.recibido).where(asignacion.c.recibido > 0).subquery()
+
+def plan_traslados(reposicion, farmacia_id=None):
+    """Genera los traslados sugeridos (origen, destino, cantidad) de toda la red, por clave de producto.
+
+    Las filas que envían o reciben se leen ordenadas por clave y cada clave se
+    empareja en el mismo orden de asignacion_traslados, de modo que lo que
+    aparece aquí es exactamente lo que se descuenta de las sugerencias de
+    compra. Con `farmacia_id` solo se generan los traslados que la involucran.
+    """
+    asignacion = asignacion_traslados(reposicion)
+    filas = db.session.query(
+        asignacion,
+        Inventario.codigo,
+        Inventario.descripcion,
+        Inventario.precio_neto,
+        Farmacia.nombre.label('farmacia_nombre')
+    ).join(Inventario, Inventario.id == asignacion.c.id).join(
+        Farmacia, Farmacia.id == asignacion.c.farmacia_id
+    ).filter(or_(asignacion.c.recibido > 0, asignacion.c.enviado > 0)).order_by(
+        asignacion.c.clave_producto
+    ).yield_per(1000)
+
+    for clave, grupo in groupby(filas, key=lambda fila: fila.clave_producto):
+        grupo = list(grupo)
+        destinos = sorted((fila for fila in grupo if fila.recibido > 0), key=lambda fila: (fila.stock, -fila.necesidad, fila.id))
+        origenes = sorted((fila for fila in grupo if fila.enviado > 0), key=lambda fila: (-fila.excedente, fila.id))
+
+        pendiente_origen = [origen.enviado for origen in origenes]
+        indice = 0
+        for destino in destinos:
+            pendiente = destino.recibido
+            while pendiente > 0 and indice < len(origenes):
+                cantidad = min(pendiente, pendiente_origen[indice])
+                origen = origenes[indice]
+                pendiente -= cantidad
+                pendiente_origen[indice] -= cantidad
+                if pendiente_origen[indice] == 0:
+                    indice += 1
+                if farmacia_id and farmacia_id not in (origen.farmacia_id, destino.farmacia_id):
+                    continue
+                yield {
+                    'clave_producto': clave,
+                    'codigo': destino.codigo,
+                    'descripcion': destino.descripcion,
+                    'farmacia_origen_id': origen.farmacia_id,
+                    'farmacia_origen': origen.farmacia_nombre,
+                    'stock_origen': origen.stock,
+                    'farmacia_destino_id': destino.farmacia_id,
+                    'farmacia_destino': destino.farmacia_nombre,
+                    'stock_destino': destino.stock,
+                    'cantidad': cantidad,
+                    'valor': cantidad * float(origen.precio_neto or 0)
+                }
@@ -0,0 +1,133 @@
+from datetime import timedelta
+from src.models.user import db
+from src.models.inventario import Inventario
+from src.models.farmacia import Farmacia
+
+# Días hacia adelante que cubre el reporte si no se indica otro valor
+DIAS_VENCIMIENTO_DEFECTO = 60
+
+# Claves de producto por consulta al buscar farmacias destino
+TAMANO_LOTE_CLAVES = 500
+
+def productos_por_vencer(pronostico, dias, farmacia_id=None):
+    """Filas con stock que vencen entre hoy y hoy + `dias`, con su venta diaria.
+
+    El filtro es un rango sobre ix_inventario_vencimiento_farmacia, de modo que
+    solo se leen las filas que vencen en la ventana aunque la red sea grande.
+    Ordenadas de la más próxima a vencer a la más lejana.
+    """
+    query = pronostico.unir(db.session.query(
+        Inventario.id,
+        Inventario.farmacia_id,
+        Farmacia.nombre.label('farmacia_nombre'),
+        Inventario.codigo,
+        Inventario.descripcion,
+        Inventario.laboratorio,
+        Inventario.clave_producto,
+        Inventario.fecha_vencimiento,
+        Inventario.pedido,
+        Inventario.precio_neto,
+        pronostico.venta_diaria.label('venta_diaria')
+    ).join(Farmacia, Inventario.farmacia_id == Farmacia.id)).filter(
+        Inventario.fecha_vencimiento >= pronostico.hoy,
+        Inventario.fecha_vencimiento <= pronostico.hoy + timedelta(days=dias),
+        Inventario.pedido > 0
+    )
+    if farmacia_id:
+        query = query.filter(Inventario.farmacia_id == farmacia_id)
+    return query.order_by(Inventario.fecha_vencimiento, Inventario.farmacia_id, Inventario.id)
+
+def _destinos(pronostico, claves):
+    """Filas con ventas de las claves indicadas (posibles destinos), de mayor a menor venta diaria"""
+    destinos = {}
+    claves = list(claves)
+    for inicio in range(0, len(claves), TAMANO_LOTE_CLAVES):
+        filas = pronostico.unir(db.session.query(
+            Inventario.id,
+            Inventario.farmacia_id,
+            Farmacia.nombre.label('farmacia_nombre'),
+            Inventario.clave_producto,
+            Inventario.pedido,
+            pronostico.venta_diaria.label('venta_diaria')
+        ).join(Farmacia, Inventario.farmacia_id == Farmacia.id)).filter(
+            Inventario.clave_producto.in_(claves[inicio:inicio + TAMANO_LOTE_CLAVES]),
+            pronostico.venta_diaria > 0
+        ).order_by(pronostico.venta_diaria.desc(), Inventario.id)
+        for fila in filas:
+            destinos.setdefault(fila.clave_producto, []).append(fila)
+    return destinos
+
+def reporte_vencimientos(pronostico, dias, farmacia_id=None):
+    """Productos por vencer con el valor en riesgo y traslados sugeridos.
+
+    Para cada fila se estima cuánto venderá su farmacia antes del vencimiento
+    (venta diaria × días restantes); el resto queda en riesgo y se reparte
+    entre las farmacias que venden el mismo producto más rápido, hasta lo que
+    cada una alcanzaría a vender antes de esa fecha además de su propio stock.
+    Las filas que vencen antes se asignan primero y la capacidad de cada
+    destino se descuenta entre productos. Retorna (productos, resumen).
+    """
+    filas = productos_por_vencer(pronostico, dias, farmacia_id).all()
+    destinos = _destinos(pronostico, {fila.clave_producto for fila in filas if fila.clave_producto})
+    asignado = {}  # Unidades ya sugeridas hacia cada fila destino
+
+    productos = []
+    resumen = {'productos': 0, 'unidades': 0, 'valor_en_riesgo': 0.0, 'unidades_sin_vender_estimadas': 0, 'por_farmacia': {}}
+    for fila in filas:
+        dias_restantes = (fila.fecha_vencimiento - pronostico.hoy).days
+        venta_diaria = float(fila.venta_diaria or 0)
+        sin_vender = max(fila.pedido - int(venta_diaria * dias_restantes), 0)
+        valor = fila.pedido * float(fila.precio_neto or 0)
+
+        traslados = []
+        pendiente = sin_vender
+        for destino in destinos.get(fila.clave_producto, []):
+            if pendiente <= 0 or destino.venta_diaria <= venta_diaria:
+                break
+            if destino.id == fila.id:
+                continue
+            capacidad = int(destino.venta_diaria * dias_restantes) - (destino.pedido or 0) - asignado.get(destino.id, 0)
+            cantidad = min(pendiente, capacidad)
+            if cantidad <= 0:
+                continue
+            asignado[destino.id] = asignado.get(destino.id, 0) + cantidad
+            pendiente -= cantidad
+            traslados.append({
+                'farmacia_id': destino.farmacia_id,
+                'farmacia_nombre': destino.farmacia_nombre,
+                'cantidad': cantidad,
+                'venta_diaria': round(float(destino.venta_diaria), 3)
+            })
+
+        productos.append({
+            'inventario_id': fila.id,
+            'farmacia_id': fila.farmacia_id,
+            'farmacia_nombre': fila.farmacia_nombre,
+            'codigo': fila.codigo,
+            'descripcion': fila.descripcion,
+            'laboratorio': fila.laboratorio,
+            'fecha_vencimiento': fila.fecha_vencimiento.isoformat(),
+            'dias_restantes': dias_restantes,
+            'stock_actual': fila.pedido,
+            'precio_neto': fila.precio_neto,
+            'valor_en_riesgo': valor,
+            'venta_diaria': round(venta_diaria, 3),
+            'unidades_sin_vender_estimadas': sin_vender,
+            'traslados_sugeridos': traslados
+        })
+
+        resumen['productos'] += 1
+        resumen['unidades'] += fila.pedido
+        resumen['valor_en_riesgo'] += valor
+        resumen['unidades_sin_vender_estimadas'] += sin_vender
+        por_farmacia = resumen['por_farmacia'].setdefault(fila.farmacia_id, {
+            'farmacia_id': fila.farmacia_id,
+            'farmacia_nombre': fila.farmacia_nombre,
+            'productos': 0,
+            'valor_en_riesgo': 0.0
+        })
+        por_farmacia['productos'] += 1
+        por_farmacia['valor_en_riesgo'] += valor
+
+    resumen['por_farmacia'] = sorted(resumen['por_farmacia'].values(), key=lambda item: -item['valor_en_riesgo'])
+    return productos, resumen
@@ -0,0 +1,198 @@
+from datetime import datetime, timezone
+from sqlalchemy import func, case, tuple_, insert
+from src.models.user import db
+from src.models.inventario import Inventario
+from src.models.cliente import Cliente
+from src.models.venta import Venta, VentaDetalle
+
+# Máximo de ids por IN / CASE en las consultas y en la actualización de stock
+TAMANO_LOTE_VENTAS = 500
+
+# Máximo de ventas por petición a POST /ventas/lote
+MAX_VENTAS_LOTE = 2000
+
+class SobreventaError(ValueError):
+    """El stock cambió entre la validación y el descuento (otra venta concurrente); se reintenta el lote"""
+
+def _lotes(valores, tamano=TAMANO_LOTE_VENTAS):
+    valores = list(valores)
+    for inicio in range(0, len(valores), tamano):
+        yield valores[inicio:inicio + tamano]
+
+def leer_venta(data):
+    """Valida el cuerpo de una venta. Retorna (venta, None) o (None, mensaje de error).
+
+    Cada detalle indica el producto con `inventario_id` o con `codigo` (de la
+    farmacia de la venta); si no trae `precio` se usa el precio neto del inventario.
+    """
+    if not isinstance(data, dict):
+        return None, 'Venta inválida'
+    for campo in ('cliente_id', 'farmacia_id', 'metodo_pago'):
+        if not data.get(campo):
+            return None, f'{campo} es requerido'
+    try:
+        cliente_id, farmacia_id = int(data['cliente_id']), int(data['farmacia_id'])
+    except (TypeError, ValueError):
+        return None, 'cliente_id y farmacia_id deben ser números'
+    detalles = data.get('detalles')
+    if not isinstance(detalles, list) or not detalles:
+        return None, 'La venta debe tener al menos un detalle'
+
+    fecha = None
+    if data.get('fecha'):
+        try:
+            fecha = datetime.fromisoformat(str(data['fecha']))
+        except ValueError:
+            return None, f'Fecha inválida: {data["fecha"]}'
+        # Las ventas se guardan en UTC sin zona horaria
+        if fecha.tzinfo:
+            fecha = fecha.astimezone(timezone.utc).replace(tzinfo=None)
+
+    lineas = []
+    for detalle in detalles:
+        if not isinstance(detalle, dict) or not (detalle.get('inventario_id') or detalle.get('codigo')):
+            return None, 'Cada detalle requiere inventario_id o codigo'
+        try:
+            inventario_id = int(detalle['inventario_id']) if detalle.get('inventario_id') else None
+            cantidad = int(detalle.get('cantidad', 0))
+            precio = float(detalle['precio']) if detalle.get('precio') is not None else None
+        except (TypeError, ValueError):
+            return None, 'inventario_id, cantidad o precio inválido'
+        if cantidad <= 0:
+            return None, 'La cantidad debe ser mayor que 0'
+        if precio is not None and precio < 0:
+            return None, 'El precio no puede ser negativo'
+        lineas.append({
+            'inventario_id': inventario_id,
+            'codigo': str(detalle['codigo']).strip() if detalle.get('codigo') else None,
+            'cantidad': cantidad,
+            'precio': precio
+        })
+
+    return {
+        'cliente_id': cliente_id,
+        'farmacia_id': farmacia_id,
+        'metodo_pago': str(data['metodo_pago']),
+        'fecha': fecha,
+        'lineas': lineas
+    }, None
+
+def _cargar_inventario(ventas):
+    """Filas de inventario referidas por las ventas: (por id, por (farmacia_id, codigo))"""
+    ids = {linea['inventario_id'] for venta in ventas for linea in venta['lineas'] if linea['inventario_id']}
+    codigos = {
+        (venta['farmacia_id'], linea['codigo'])
+        for venta in ventas for linea in venta['lineas'] if not linea['inventario_id']
+    }
+    columnas = (Inventario.id, Inventario.farmacia_id, Inventario.codigo, Inventario.pedido,
+                Inventario.precio_neto, Inventario.precio)
+
+    por_id = {}
+    for lote in _lotes(ids):
+        por_id.update((fila.id, fila) for fila in db.session.query(*columnas).filter(Inventario.id.in_(lote)))
+    for lote in _lotes(codigos):
+        por_id.update((fila.id, fila) for fila in db.session.query(*columnas).filter(
+            tuple_(Inventario.farmacia_id, Inventario.codigo).in_(lote)
+        ))
+    return por_id, {(fila.farmacia_id, fila.codigo): fila for fila in por_id.values()}
+
+def descontar_stock(cantidades):
+    """Descuenta {inventario_id: cantidad} con un UPDATE por lote de ids.
+
+    El propio UPDATE exige stock suficiente en cada fila; si alguna ya no lo
+    tiene (venta concurrente) lanza SobreventaError y el llamador debe deshacer
+    la transacción.
+    """
+    stock = func.coalesce(Inventario.pedido, 0)
+    for lote in _lotes(cantidades):
+        descuento = case({inventario_id: cantidades[inventario_id] for inventario_id in lote}, value=Inventario.id)
+        actualizadas = db.session.query(Inventario).filter(
+            Inventario.id.in_(lote), stock >= descuento
+        ).update({Inventario.pedido: stock - descuento}, synchronize_session=False)
+        if actualizadas != len(lote):
+            raise SobreventaError('El stock cambió durante la venta; intente nuevamente')
+
+def registrar_ventas(ventas):
+    """Registra ventas ya validadas con leer_venta en la transacción actual (no la confirma).
+
+    El stock se asigna en el orden recibido: una venta cuyo detalle supera el
+    disponible (o refiere productos o clientes inexistentes) se rechaza sin
+    afectar a las demás. Todo el stock vendido se descuenta con descontar_stock
+    y las ventas y detalles se insertan en bloque. Retorna una lista paralela a
+    `ventas` con la venta registrada (id, total, fecha, detalles...) o {'error', 'sin_stock'}.
+    """
+    por_id, por_codigo = _cargar_inventario(ventas)
+    clientes = set()
+    for lote in _lotes({venta['cliente_id'] for venta in ventas}):
+        clientes.update(cliente_id for (cliente_id,) in db.session.query(Cliente.id).filter(Cliente.id.in_(lote)))
+
+    disponible = {inventario_id: fila.pedido or 0 for inventario_id, fila in por_id.items()}
+    resultados = []
+    aceptadas = []
+    for venta in ventas:
+        error = None if venta['cliente_id'] in clientes else f'Cliente {venta["cliente_id"]} no existe'
+        sin_stock = False
+        cantidades = {}
+        detalles = []
+        for linea in venta['lineas']:
+            if error:
+                break
+            if linea['inventario_id']:
+                fila = por_id.get(linea['inventario_id'])
+                if fila is not None and fila.farmacia_id != venta['farmacia_id']:
+                    fila = None
+            else:
+                fila = por_codigo.get((venta['farmacia_id'], linea['codigo']))
+            if fila is None:
+                error = f'Producto {linea["inventario_id"] or linea["codigo"]} no existe en la farmacia {venta["farmacia_id"]}'
+                break
+            cantidades[fila.id] = cantidades.get(fila.id, 0) + linea['cantidad']
+            precio = linea['precio'] if linea['precio'] is not None else (fila.precio_neto or fila.precio or 0)
+            detalles.append({'inventario_id': fila.id, 'cantidad': linea['cantidad'], 'precio': precio})
+
+        if not error:
+            for inventario_id, cantidad in cantidades.items():
+                if cantidad > disponible[inventario_id]:
+                    fila = por_id[inventario_id]
+                    error = f'Stock insuficiente para {fila.codigo}: disponible {disponible[inventario_id]}, solicitado {cantidad}'
+                    sin_stock = True
+                    break
+
+        if error:
+            resultados.append({'error': error, 'sin_stock': sin_stock})
+            continue
+
+        for inventario_id, cantidad in cantidades.items():
+            disponible[inventario_id] -= cantidad
+        registro = {
+            'cliente_id': venta['cliente_id'],
+            'farmacia_id': venta['farmacia_id'],
+            'metodo_pago': venta['metodo_pago'],
+            'total': sum(detalle['cantidad'] * detalle['precio'] for detalle in detalles),
+            'fecha': venta['fecha'] or datetime.utcnow()
+        }
+        resultado = {}
+        resultados.append(resultado)
+        aceptadas.append((registro, detalles, resultado))
+
+    if not aceptadas:
+        return resultados
+
+    # Stock total vendido por fila de inventario en todas las ventas aceptadas
+    vendido = {}
+    for _, detalles, _ in aceptadas:
+        for detalle in detalles:
+            vendido[detalle['inventario_id']] = vendido.get(detalle['inventario_id'], 0) + detalle['cantidad']
+    descontar_stock(vendido)
+
+    # INSERT con RETURNING en bloque: los ids vuelven en el orden de los registros
+    ids = db.session.scalars(
+        insert(Venta).returning(Venta.id, sort_by_parameter_order=True),
+        [registro for registro, _, _ in aceptadas]
+    ).all()
+    filas_detalle = []
+    for (registro, detalles, resultado), venta_id in zip(aceptadas, ids):
+        resultado.update(registro, id=venta_id, fecha=registro['fecha'].isoformat(), detalles=detalles)
+        filas_detalle.extend(dict(detalle, venta_id=venta_id) for detalle in detalles)
+    db.session.execute(insert(VentaDetalle), filas_detalle)
+    return resultados
@@ -0,0 +1,34 @@
+import os
+import sys
+import tempfile
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# La aplicación lee DATABASE_URL al importarse: las pruebas usan una base SQLite temporal
+# (y una carpeta temporal para los archivos encolados)
+_temporal = tempfile.mkdtemp(prefix='pruebas_farmacias_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(_temporal, 'app.db')}"
+os.environ['IMPORT_FOLDER'] = os.path.join(_temporal, 'importaciones')
+
+@pytest.fixture(scope='session')
+def app():
+    from src.main import app
+    app.config['TESTING'] = True
+    return app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def bd(app):
+    """Sesión dentro del contexto de la aplicación; al terminar se vacían las tablas"""
+    from src.models.user import db
+    with app.app_context():
+        yield db
+        db.session.rollback()
+        for tabla in reversed(db.metadata.sorted_tables):
+            if tabla.name != 'migracion_esquema':
+                db.session.execute(tabla.delete())
+        db.session.commit()
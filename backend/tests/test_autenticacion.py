@@ -0,0 +1,73 @@
+"""Con AUTH_REQUERIDA cada ruta exige un token vigente y el permiso que declara"""
+import pytest
+from sqlalchemy import update
+from src.models.user import User
+from src.services import permisos
+from src.services.contrasenas import generar_hash
+
+@pytest.fixture
+def auth_requerida(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'AUTH_REQUERIDA', True)
+
+def crear_usuario(bd, rol='vendedor'):
+    usuario = User(username='ana', email='ana@farmacia.test', password=generar_hash('clave'), rol=rol)
+    bd.session.add(usuario)
+    bd.session.commit()
+    return usuario
+
+def iniciar_sesion(client):
+    respuesta = client.post('/api/auth/login', json={'username': 'ana', 'password': 'clave'})
+    assert respuesta.status_code == 200
+    return {'Authorization': f'Bearer {respuesta.json["token"]}'}
+
+def test_todas_las_rutas_declaran_su_acceso(app):
+    sin_declarar = [
+        nombre for nombre, vista in app.view_functions.items()
+        if nombre != 'static' and not hasattr(vista, 'permiso_requerido') and not getattr(vista, 'publica', False)
+    ]
+    assert sin_declarar == []
+
+def test_sin_token_responde_401(client, bd, auth_requerida):
+    assert client.get('/api/farmacias').status_code == 401
+    assert client.get('/api/farmacias', headers={'Authorization': 'Bearer no-es-un-token'}).status_code == 401
+
+def test_login_es_publico(client, bd, auth_requerida):
+    crear_usuario(bd)
+    headers = iniciar_sesion(client)
+    assert client.get('/api/farmacias', headers=headers).status_code == 200
+
+def test_sin_permiso_responde_403(client, bd, auth_requerida):
+    crear_usuario(bd, rol='vendedor')
+    headers = iniciar_sesion(client)
+    assert client.get('/api/lista-comparativa/proveedores', headers=headers).status_code == 403
+
+def test_cambio_de_contrasena_invalida_el_token(client, bd, auth_requerida):
+    usuario = crear_usuario(bd)
+    headers = iniciar_sesion(client)
+    assert client.get('/api/farmacias', headers=headers).status_code == 200
+
+    usuario.password = generar_hash('otra')
+    bd.session.commit()
+
+    assert client.get('/api/farmacias', headers=headers).status_code == 401
+
+def test_cambio_de_contrasena_en_otro_worker(client, bd, auth_requerida):
+    usuario = crear_usuario(bd)
+    headers = iniciar_sesion(client)
+    assert client.get('/api/farmacias', headers=headers).status_code == 200
+
+    # Otro proceso confirma el cambio: aquí no hay after_commit y la caché vence por TTL
+    bd.session.execute(update(User).where(User.id == usuario.id).values(password=generar_hash('otra')))
+    bd.session.commit()
+    permisos.invalidar(usuario.id)
+
+    assert client.get('/api/farmacias', headers=headers).status_code == 401
+
+def test_usuario_eliminado_invalida_el_token(client, bd, auth_requerida):
+    usuario = crear_usuario(bd)
+    headers = iniciar_sesion(client)
+
+    bd.session.delete(usuario)
+    bd.session.commit()
+
+    assert client.get('/api/farmacias', headers=headers).status_code == 401
@@ -0,0 +1,30 @@
+"""La búsqueda en Postgres (tsvector) usa la misma expresión que su índice GIN.
+
+Las pruebas corren con SQLite, así que aquí solo se compila el SQL para Postgres.
+"""
+import re
+import pytest
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from src.models.comparacion_precio import ComparacionPrecio
+from src.models.inventario import Inventario
+from src.services import busqueda
+
+def sql_postgres(consulta, tabla):
+    compilado = consulta.compile(dialect=postgresql.dialect())
+    sql = compilado.string
+    for nombre, valor in compilado.params.items():
+        sql = sql.replace(f'%({nombre})s', f"'{valor}'")
+    return re.sub(r'\s+', ' ', sql.replace(f'{tabla}.', ''))
+
+@pytest.mark.parametrize('modelo', [Inventario, ComparacionPrecio])
+def test_consulta_tsvector_coincide_con_el_indice(app, monkeypatch, modelo):
+    monkeypatch.setattr(busqueda, '_modo', 'tsvector')
+    tabla = modelo.__tablename__
+
+    sql = sql_postgres(busqueda.filtrar_busqueda(select(modelo.id), 'acetaminofen 500', modelo), tabla)
+
+    indice = re.sub(r'\s+', ' ', busqueda.sql_tsvector(tabla)[0])
+    expresion = re.search(r'USING GIN \((to_tsvector\(.*\))\)$', indice).group(1)
+    assert f"WHERE {expresion} @@ to_tsquery('simple', 'acetaminofen:* & 500:*')" in sql
+    assert f'ORDER BY ts_rank({expresion}' in sql
@@ -0,0 +1,59 @@
+"""Las respuestas en caché se revalidan con ETag y se descartan al confirmar una escritura en sus tablas"""
+from src.models.farmacia import Farmacia
+from src.services.cache_respuestas import AlmacenCompartido
+
+def nombres(respuesta):
+    return [farmacia['nombre'] for farmacia in respuesta.json]
+
+def test_etag_responde_304(client, bd):
+    bd.session.add(Farmacia(nombre='Centro'))
+    bd.session.commit()
+
+    primera = client.get('/api/farmacias')
+    assert primera.status_code == 200
+    etag = primera.headers['ETag']
+
+    revalidada = client.get('/api/farmacias', headers={'If-None-Match': etag})
+    assert revalidada.status_code == 304
+    assert revalidada.data == b''
+    assert revalidada.headers['ETag'] == etag
+
+def test_escritura_descarta_la_respuesta(client, bd):
+    bd.session.add(Farmacia(nombre='Centro'))
+    bd.session.commit()
+    primera = client.get('/api/farmacias')
+    assert nombres(primera) == ['Centro']
+
+    bd.session.add(Farmacia(nombre='Norte'))
+    bd.session.commit()
+
+    segunda = client.get('/api/farmacias', headers={'If-None-Match': primera.headers['ETag']})
+    assert segunda.status_code == 200
+    assert sorted(nombres(segunda)) == ['Centro', 'Norte']
+
+def test_escritura_masiva_descarta_la_respuesta(client, bd):
+    assert nombres(client.get('/api/farmacias')) == []
+
+    # Sin objetos en la sesión (como las cargas masivas): se detecta por la sentencia
+    bd.session.execute(Farmacia.__table__.insert(), [{'nombre': 'Centro'}, {'nombre': 'Norte'}])
+    bd.session.commit()
+
+    assert sorted(nombres(client.get('/api/farmacias'))) == ['Centro', 'Norte']
+
+def test_escritura_deshecha_conserva_la_respuesta(client, bd):
+    primera = client.get('/api/farmacias')
+
+    bd.session.add(Farmacia(nombre='Centro'))
+    bd.session.flush()
+    bd.session.rollback()
+
+    assert client.get('/api/farmacias', headers={'If-None-Match': primera.headers['ETag']}).status_code == 304
+
+def test_almacen_compartido_entre_workers(tmp_path):
+    ruta = str(tmp_path / 'cache.db')
+    worker_a, worker_b = AlmacenCompartido(ruta), AlmacenCompartido(ruta)
+    antes = worker_b.leer(['farmacia'])
+
+    worker_a.incrementar(['farmacia'])
+
+    assert worker_b.leer(['farmacia']) != antes
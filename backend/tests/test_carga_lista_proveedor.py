@@ -0,0 +1,41 @@
+import io
+import openpyxl
+import pytest
+from src.models.lista_proveedor import ListaProveedor
+from src.models.proveedor import Proveedor
+from src.services.carga_lista_proveedor import procesar_archivo_lista
+
+@pytest.fixture
+def proveedor(bd):
+    proveedor = Proveedor(nombre='Droguería Central')
+    bd.session.add(proveedor)
+    bd.session.commit()
+    return proveedor
+
+def test_csv_con_header_en_la_fila_1(bd, proveedor):
+    archivo = io.BytesIO('CODIGO;DESCRIPCION;LABORATORIO;PRECIO\nA1;Ibuprofeno 400;LAB;10,50\nA2;Loratadina 10;LAB;8\n'.encode())
+
+    resultado = procesar_archivo_lista(proveedor.id, archivo, 'csv')
+
+    assert resultado['filas_leidas'] == 2
+    assert resultado['productos_nuevos'] == 2
+    assert {p.codigo for p in ListaProveedor.query.filter_by(proveedor_id=proveedor.id)} == {'A1', 'A2'}
+
+def test_excel_con_titulo_antes_del_header(bd, proveedor):
+    libro = openpyxl.Workbook()
+    hoja = libro.active
+    hoja.append(['LISTA DE PRECIOS'])
+    hoja.append(['CODIGO', 'DESCRIPCION', 'LABORATORIO', 'PRECIO'])
+    hoja.append(['A1', 'Ibuprofeno 400', 'LAB', 10.5])
+    archivo = io.BytesIO()
+    libro.save(archivo)
+    archivo.seek(0)
+
+    resultado = procesar_archivo_lista(proveedor.id, archivo, 'xlsx')
+
+    assert resultado['filas_leidas'] == 1
+    assert ListaProveedor.query.filter_by(proveedor_id=proveedor.id).one().precio == 10.5
+
+def test_archivo_sin_header(bd, proveedor):
+    archivo = io.BytesIO(b'A1;Ibuprofeno;10\n')
+    assert procesar_archivo_lista(proveedor.id, archivo, 'csv') is None
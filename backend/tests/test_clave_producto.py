@@ -0,0 +1,58 @@
+"""Un mismo código con descripciones distintas entre farmacias es un solo producto"""
+from src.models.farmacia import Farmacia
+from src.models.inventario import Inventario
+from src.models.lista_proveedor import ListaProveedor
+from src.models.proveedor import Proveedor
+from src.services.comparacion_precios import actualizar_comparacion_proveedor
+from src.services.normalizacion import clave_codigo, clave_producto
+
+DESCRIPCIONES = ('ACETAMINOFEN 500MG X 10 TAB', 'Acetaminofén 500 mg caja x10 comprimidos recubiertos')
+
+def cargar_inventario(bd):
+    farmacias = [Farmacia(nombre=f'Farmacia {i}') for i in range(2)]
+    bd.session.add_all(farmacias)
+    bd.session.flush()
+    for farmacia, descripcion in zip(farmacias, DESCRIPCIONES):
+        bd.session.add(Inventario(
+            farmacia_id=farmacia.id, codigo='ACE500', descripcion=descripcion,
+            laboratorio='LAB', precio=10.0, precio_neto=9.0, pedido=0
+        ))
+    bd.session.commit()
+
+def test_clave_de_inventario_no_depende_de_la_descripcion():
+    assert clave_codigo('ace500') == clave_codigo(' ACE500 ')
+    assert clave_producto('ACE500', DESCRIPCIONES[0]) != clave_producto('ACE500', DESCRIPCIONES[1])
+
+def test_busqueda_agrupa_el_codigo(client, bd):
+    cargar_inventario(bd)
+
+    respuesta = client.get('/api/inventarios/search?q=acetaminofen')
+    assert respuesta.status_code == 200
+    assert len(respuesta.json) == 1
+    assert len(respuesta.json[0]['farmacias']) == 2
+
+def test_consolidado_agrupa_el_codigo(client, bd):
+    cargar_inventario(bd)
+
+    respuesta = client.get('/api/reportes/consolidado-compras')
+    assert respuesta.status_code == 200
+    productos = respuesta.json['productos']
+    assert [producto['codigo'] for producto in productos] == ['ACE500']
+    assert len(productos[0]['detalle_farmacias']) == 2
+
+def test_orden_de_compra_une_la_oferta_por_codigo(client, bd):
+    cargar_inventario(bd)
+    proveedor = Proveedor(nombre='Proveedor')
+    bd.session.add(proveedor)
+    bd.session.flush()
+    bd.session.add(ListaProveedor(
+        proveedor_id=proveedor.id, codigo='ACE500', descripcion='ACETAMINOFEN 500 MG TABLETAS', precio=8.0
+    ))
+    bd.session.flush()
+    actualizar_comparacion_proveedor(proveedor.id)
+    bd.session.commit()
+
+    respuesta = client.get('/api/reportes/ordenes-compra')
+    assert respuesta.status_code == 200
+    assert respuesta.json['sin_oferta'] == []
+    assert [linea['codigo'] for linea in respuesta.json['ordenes'][0]['lineas']] == ['ACE500']
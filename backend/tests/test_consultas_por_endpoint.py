@@ -0,0 +1,51 @@
+"""Los listados ejecutan un número fijo de consultas sin importar cuántas filas retornan"""
+import pytest
+from src.models.farmacia import Farmacia
+from src.models.inventario import Inventario
+from src.models.lista_proveedor import ListaProveedor
+from src.models.proveedor import Proveedor
+from src.services.comparacion_precios import actualizar_comparacion_proveedor
+from src.services.contador_consultas import contar_consultas
+
+def cargar_datos(bd, productos):
+    farmacias = [Farmacia(nombre=f'Farmacia {i}') for i in range(2)]
+    proveedores = [Proveedor(nombre=f'Proveedor {i}', descuento_comercial=5 * i) for i in range(2)]
+    bd.session.add_all(farmacias + proveedores)
+    bd.session.flush()
+    for i in range(productos):
+        for farmacia in farmacias:
+            bd.session.add(Inventario(
+                farmacia_id=farmacia.id, codigo=f'C{i}', descripcion=f'Acetaminofen {i} mg',
+                laboratorio='LAB', precio=10.0, precio_neto=9.0, pedido=i % 7
+            ))
+        for proveedor in proveedores:
+            bd.session.add(ListaProveedor(
+                proveedor_id=proveedor.id, codigo=f'C{i}', descripcion=f'Acetaminofen {i} mg',
+                laboratorio='LAB', precio=10.0 + i % 3
+            ))
+    bd.session.flush()
+    for proveedor in proveedores:
+        actualizar_comparacion_proveedor(proveedor.id)
+    bd.session.commit()
+
+def consultas(client, url):
+    with contar_consultas() as contador:
+        respuesta = client.get(url)
+    assert respuesta.status_code == 200
+    return contador['total'], len(respuesta.json)
+
+@pytest.mark.parametrize('url', [
+    '/api/inventarios',
+    '/api/inventarios?limit=1000',
+    '/api/inventarios/search?q=acetaminofen',
+    '/api/lista-comparativa/buscar?q=acetaminofen',
+])
+def test_consultas_constantes(bd, client, url):
+    cargar_datos(bd, 5)
+    pocas, filas_pocas = consultas(client, url)
+
+    cargar_datos(bd, 50)
+    muchas, filas_muchas = consultas(client, url)
+
+    assert filas_muchas > filas_pocas
+    assert muchas == pocas
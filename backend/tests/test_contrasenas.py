@@ -0,0 +1,67 @@
+"""Límite de intentos de login y actualización de hashes anteriores"""
+import pytest
+from werkzeug.security import generate_password_hash
+from src.models.user import User
+from src.services import contrasenas
+from src.services.contrasenas import LimitadorIntentos
+
+@pytest.fixture
+def limitadores(monkeypatch):
+    monkeypatch.setattr(contrasenas, '_por_usuario_ip', LimitadorIntentos(3, 300))
+    monkeypatch.setattr(contrasenas, '_por_ip', LimitadorIntentos(5, 300))
+
+def crear_usuario(bd, password):
+    bd.session.add(User(username='ana', email='ana@farmacia.test', password=password))
+    bd.session.commit()
+
+def login(client, clave, ip, usuario='ana'):
+    return client.post('/api/auth/login', json={'username': usuario, 'password': clave},
+                       environ_base={'REMOTE_ADDR': ip})
+
+def test_limitador_ventana_deslizante(monkeypatch):
+    ahora = [1000.0]
+    monkeypatch.setattr(contrasenas.time, 'monotonic', lambda: ahora[0])
+    limitador = LimitadorIntentos(2, 60)
+
+    limitador.registrar('x')
+    ahora[0] += 30
+    limitador.registrar('x')
+    assert limitador.espera('x') == 31
+    assert limitador.espera('y') == 0
+
+    # Vence el primer intento: vuelve a quedar uno libre
+    ahora[0] += 31
+    assert limitador.espera('x') == 0
+
+    limitador.registrar('x')
+    limitador.limpiar('x')
+    assert limitador.espera('x') == 0
+
+def test_bloqueo_por_usuario_solo_desde_la_ip(client, bd, limitadores):
+    crear_usuario(bd, contrasenas.generar_hash('clave'))
+    for _ in range(3):
+        assert login(client, 'mala', '10.0.0.1').status_code == 401
+
+    assert login(client, 'clave', '10.0.0.1').status_code == 429
+    # Los fallos de otra dirección no bloquean al usuario desde la suya
+    assert login(client, 'clave', '10.0.0.2').status_code == 200
+
+def test_bloqueo_por_ip_con_cualquier_usuario(client, bd, limitadores):
+    crear_usuario(bd, contrasenas.generar_hash('clave'))
+    for numero in range(5):
+        assert login(client, 'mala', '10.0.0.3', usuario=f'usuario{numero}').status_code == 401
+
+    assert login(client, 'clave', '10.0.0.3').status_code == 429
+    assert login(client, 'clave', '10.0.0.4').status_code == 200
+
+def test_login_actualiza_hash_anterior(client, bd, app, limitadores):
+    crear_usuario(bd, generate_password_hash('clave', method='pbkdf2:sha256:1000'))
+    assert contrasenas.requiere_rehash(bd.session.query(User).one().password)
+
+    assert login(client, 'clave', '10.0.0.5').status_code == 200
+
+    bd.session.expire_all()
+    guardado = bd.session.query(User).one().password
+    assert guardado.startswith(app.config['PASSWORD_METODO'])
+    assert not contrasenas.requiere_rehash(guardado)
+    assert login(client, 'clave', '10.0.0.5').status_code == 200
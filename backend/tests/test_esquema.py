@@ -0,0 +1,36 @@
+import pytest
+from sqlalchemy import inspect, text
+from src.models.farmacia import Farmacia
+from src.models.inventario import Inventario
+from src.models.migracion import MigracionEsquema
+from src.services.esquema import MIGRACIONES, MigracionFallida, migrar, pendientes, verificar_indices
+
+def test_consultas_frecuentes_usan_indices(bd):
+    fallidas = verificar_indices()
+    assert fallidas == [], '\n'.join(f'{nombre}: {" | ".join(plan)}' for nombre, plan in fallidas)
+
+def test_migraciones_aplicadas(bd):
+    assert pendientes() == []
+    assert len({version for version, _ in MIGRACIONES}) == len(MIGRACIONES)
+
+def test_migracion_con_duplicados_falla(bd):
+    bd.session.execute(text('DROP INDEX ix_inventario_farmacia_codigo'))
+    bd.session.query(MigracionEsquema).filter_by(version='0002_inventario_farmacia_codigo').delete()
+    farmacia = Farmacia(nombre='Farmacia')
+    bd.session.add(farmacia)
+    bd.session.flush()
+    for descripcion in ('Acetaminofen', 'Acetaminofen 500mg'):
+        bd.session.execute(Inventario.__table__.insert().values(
+            farmacia_id=farmacia.id, codigo='ACE500', descripcion=descripcion,
+            laboratorio='LAB', precio=10.0, precio_neto=9.0
+        ))
+    bd.session.commit()
+
+    with pytest.raises(MigracionFallida, match='ACE500'):
+        migrar()
+    assert pendientes() == ['0002_inventario_farmacia_codigo']
+
+    bd.session.query(Inventario).filter_by(descripcion='Acetaminofen').delete()
+    bd.session.commit()
+    assert migrar() == ['0002_inventario_farmacia_codigo']
+    assert 'ix_inventario_farmacia_codigo' in {indice['name'] for indice in inspect(bd.engine).get_indexes('inventario')}
@@ -0,0 +1,32 @@
+import logging
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from src.models.importacion import TrabajoImportacion
+from src.services import importaciones
+
+def trabajo(bd, trabajo_id, estado, latido):
+    bd.session.add(TrabajoImportacion(
+        id=trabajo_id, tipo='inventario', referencia_id=1, archivo=f'/tmp/{trabajo_id}.csv',
+        estado=estado, fecha_inicio=latido, latido=latido
+    ))
+
+def test_solo_se_recuperan_los_trabajos_sin_latido(bd):
+    ahora = datetime.utcnow()
+    trabajo(bd, 'activo', 'procesando', ahora)
+    trabajo(bd, 'abandonado', 'procesando', ahora - timedelta(hours=1))
+    trabajo(bd, 'terminado', 'completado', ahora - timedelta(hours=1))
+    bd.session.commit()
+
+    assert importaciones.recuperar_abandonados(timeout=600) == 1
+
+    estados = {t.id: t.estado for t in TrabajoImportacion.query}
+    assert estados == {'activo': 'procesando', 'abandonado': 'pendiente', 'terminado': 'completado'}
+
+def test_se_registran_los_errores_fuera_del_trabajo(app, caplog):
+    futuro = Future()
+    futuro.set_exception(RuntimeError('sin conexión'))
+
+    with caplog.at_level(logging.ERROR):
+        importaciones._registrar_fallo(futuro)
+
+    assert 'sin conexión' in caplog.text
@@ -0,0 +1,52 @@
+"""Altas, cambios y cargas de inventario"""
+import io
+from src.models.farmacia import Farmacia
+from src.models.importacion import TrabajoImportacion
+from src.models.inventario import Inventario
+
+def producto(farmacia, codigo='C1'):
+    return {'farmacia_id': farmacia.id, 'codigo': codigo, 'descripcion': 'Producto', 'laboratorio': 'LAB',
+            'precio': 10.0, 'precio_neto': 9.0}
+
+def crear_farmacia(bd):
+    farmacia = Farmacia(nombre='Farmacia')
+    bd.session.add(farmacia)
+    bd.session.commit()
+    return farmacia
+
+def test_alta_duplicada_responde_409(client, bd):
+    farmacia = crear_farmacia(bd)
+    assert client.post('/api/inventarios', json=producto(farmacia)).status_code == 201
+
+    respuesta = client.post('/api/inventarios', json=producto(farmacia))
+    assert respuesta.status_code == 409
+    assert 'C1' in respuesta.json['error']
+    assert bd.session.query(Inventario).count() == 1
+
+def test_cambio_a_codigo_existente_responde_409(client, bd):
+    farmacia = crear_farmacia(bd)
+    client.post('/api/inventarios', json=producto(farmacia, 'C1'))
+    otro = client.post('/api/inventarios', json=producto(farmacia, 'C2')).json
+
+    respuesta = client.put(f'/api/inventarios/{otro["id"]}', json={'codigo': 'C1'})
+    assert respuesta.status_code == 409
+    assert bd.session.get(Inventario, otro['id']).codigo == 'C2'
+
+def test_carga_valida_la_farmacia_antes_de_encolar(client, bd):
+    def subir(farmacia_id):
+        return client.post('/api/inventarios/upload', data={
+            'farmacia_id': farmacia_id, 'file': (io.BytesIO(b'codigo;descripcion\n'), 'inventario.csv')
+        })
+
+    assert subir('abc').status_code == 400
+    assert subir('999').status_code == 404
+    assert bd.session.query(TrabajoImportacion).count() == 0
+
+def test_carga_xls_responde_400(client, bd):
+    farmacia = crear_farmacia(bd)
+    respuesta = client.post('/api/inventarios/upload', data={
+        'farmacia_id': farmacia.id, 'file': (io.BytesIO(b'\xd0\xcf\x11\xe0'), 'inventario.xls')
+    })
+    assert respuesta.status_code == 400
+    assert '.xlsx' in respuesta.json['error']
+    assert bd.session.query(TrabajoImportacion).count() == 0
@@ -0,0 +1,24 @@
+import pytest
+from src.services.lectura_archivos import a_numero
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('1234.50', 1234.5),
+    ('12,50', 12.5),
+    # Con ambos separadores, el último es el decimal
+    ('1.234,50', 1234.5),
+    ('1,234.50', 1234.5),
+    # Un separador repetido es de miles
+    ('1.234.567', 1234567),
+    ('1,234,567', 1234567),
+    (' 9 ', 9),
+])
+def test_a_numero_separadores(texto, esperado):
+    assert a_numero(texto) == pytest.approx(esperado)
+
+@pytest.mark.parametrize('valor', [None, True, '', 'abc'])
+def test_a_numero_no_numerico(valor):
+    assert a_numero(valor) is None
+
+def test_a_numero_conserva_numeros():
+    assert a_numero(7) == 7
+    assert a_numero(2.5) == 2.5
@@ -0,0 +1,36 @@
+"""El ranking de la búsqueda se calcula entre las ofertas de la respuesta"""
+from src.models.lista_proveedor import ListaProveedor
+from src.models.proveedor import Proveedor
+from src.services.comparacion_precios import actualizar_comparacion_proveedor
+
+def cargar_ofertas(bd):
+    proveedores = {}
+    for nombre, precio in (('Barato', 8.0), ('Medio', 10.0), ('Caro', 12.0)):
+        proveedor = proveedores[nombre] = Proveedor(nombre=nombre)
+        bd.session.add(proveedor)
+        bd.session.flush()
+        bd.session.add(ListaProveedor(
+            proveedor_id=proveedor.id, codigo='A1', descripcion='Acetaminofen 500 mg', laboratorio='LAB', precio=precio
+        ))
+        bd.session.flush()
+        actualizar_comparacion_proveedor(proveedor.id)
+    bd.session.commit()
+    return proveedores
+
+def test_busqueda_en_toda_la_red(bd, client):
+    cargar_ofertas(bd)
+
+    producto, = client.get('/api/lista-comparativa/buscar?q=acetaminofen').json
+    ofertas = producto['proveedores']
+    assert [oferta['proveedor_nombre'] for oferta in ofertas] == ['Barato', 'Medio', 'Caro']
+    assert ofertas[0]['es_mejor_precio']
+    assert ofertas[2]['diferencia_con_mejor'] == 4.0
+
+def test_busqueda_filtrada_por_proveedor(bd, client):
+    proveedores = cargar_ofertas(bd)
+
+    producto, = client.get(f'/api/lista-comparativa/buscar?q=acetaminofen&proveedor_id={proveedores["Caro"].id}').json
+    oferta, = producto['proveedores']
+    assert producto['mejor_precio'] == 12.0
+    assert oferta['es_mejor_precio']
+    assert 'diferencia_con_mejor' not in oferta
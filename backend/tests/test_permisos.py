@@ -0,0 +1,57 @@
+from sqlalchemy import update
+from src.models.user import User
+from src.services import permisos
+
+def crear_usuario(bd, rol='vendedor'):
+    usuario = User(username='ana', email='ana@farmacia.test', password='x', rol=rol)
+    bd.session.add(usuario)
+    bd.session.commit()
+    return usuario
+
+def test_cambio_de_rol_se_ve_al_confirmar(bd):
+    usuario = crear_usuario(bd)
+    assert not usuario.tiene_permiso('proveedores', 'ver')
+    assert permisos.en_cache(usuario.id) is not None
+
+    usuario.rol = 'admin'
+    bd.session.commit()
+
+    assert permisos.en_cache(usuario.id) is None
+    assert usuario.permisos_version == 1
+    assert usuario.tiene_permiso('proveedores', 'ver')
+
+def test_cambio_deshecho_no_queda_en_cache(bd):
+    usuario = crear_usuario(bd)
+    usuario.set_permisos({'proveedores': {'ver': True}})
+    bd.session.flush()
+    assert usuario.tiene_permiso('proveedores', 'ver')
+
+    bd.session.rollback()
+
+    assert permisos.en_cache(usuario.id) is None
+    assert not bd.session.get(User, usuario.id).tiene_permiso('proveedores', 'ver')
+
+def test_cambio_de_otro_worker_por_version(bd, app, monkeypatch):
+    usuario = crear_usuario(bd)
+    assert not usuario.tiene_permiso('reportes', 'ver')
+
+    # Otro proceso confirma el cambio: aquí no hay after_commit, solo cambia la versión en la BD
+    bd.session.execute(update(User).where(User.id == usuario.id).values(
+        rol='gerente', permisos_version=User.permisos_version + 1
+    ))
+    bd.session.commit()
+    # Vencida la entrada, la autenticación vuelve a leer al usuario y detecta la versión nueva
+    monkeypatch.setattr(permisos, '_ttl', 0)
+    usuario.tiene_permiso('reportes', 'ver')
+    assert permisos.en_cache(usuario.id) is None
+    bd.session.expire_all()
+
+    assert bd.session.get(User, usuario.id).tiene_permiso('reportes', 'ver')
+
+def test_matrices_de_roles_no_se_modifican(bd):
+    usuario = crear_usuario(bd)
+    usuario.set_permisos({'proveedores': {'ver': True}})
+    bd.session.commit()
+
+    assert usuario.get_permisos_efectivos()['proveedores']['ver'] is True
+    assert permisos.PERMISOS_ROLES['vendedor']['proveedores']['ver'] is False
@@ -0,0 +1,46 @@
+"""Validación de las políticas de reposición"""
+import pytest
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from src.models.farmacia import Farmacia
+from src.models.inventario import Inventario
+from src.models.politica_reposicion import PoliticaReposicion
+
+@pytest.mark.parametrize('valor', ['diez', [5], {'a': 1}])
+def test_valor_no_numerico_responde_400(client, bd, valor):
+    respuesta = client.post('/api/politicas-reposicion', json={'departamento': 'ANALGESICOS', 'stock_minimo': valor})
+    assert respuesta.status_code == 400
+    assert 'stock_minimo' in respuesta.json['error']
+
+def test_valor_no_numerico_al_actualizar_responde_400(client, bd):
+    creada = client.post('/api/politicas-reposicion', json={'stock_minimo': 2})
+    assert creada.status_code == 201
+
+    respuesta = client.put(f'/api/politicas-reposicion/{creada.json["id"]}', json={'stock_maximo': 'mucho'})
+    assert respuesta.status_code == 400
+
+def test_ambito_duplicado(client, bd):
+    assert client.post('/api/politicas-reposicion', json={'departamento': 'ANALGESICOS', 'stock_minimo': 2}).status_code == 201
+    assert client.post('/api/politicas-reposicion', json={'departamento': 'ANALGESICOS', 'stock_minimo': 3}).status_code == 400
+
+def test_indice_unico_con_ambitos_nulos(bd):
+    # Aunque las validaciones de la ruta se salteen (p. ej. dos peticiones a la vez), la BD rechaza el duplicado
+    bd.session.add_all([PoliticaReposicion(stock_minimo=1), PoliticaReposicion(stock_minimo=2)])
+    with pytest.raises(IntegrityError):
+        bd.session.commit()
+
+def test_stock_nulo_cuenta_como_cero(client, bd):
+    farmacia = Farmacia(nombre='Farmacia')
+    bd.session.add(farmacia)
+    bd.session.flush()
+    bd.session.add(Inventario(farmacia_id=farmacia.id, codigo='C1', descripcion='Producto', laboratorio='LAB',
+                              precio=10.0, precio_neto=9.0))
+    bd.session.flush()
+    # Filas cargadas sin stock (la columna admite NULL aunque el modelo ponga 0 por defecto)
+    bd.session.execute(update(Inventario).values(pedido=None))
+    bd.session.commit()
+
+    respuesta = client.get('/api/reportes/productos-falla')
+    assert respuesta.status_code == 200
+    assert [producto['codigo'] for producto in respuesta.json] == ['C1']
+    assert respuesta.json[0]['farmacias_afectadas'][0]['stock_actual'] == 0
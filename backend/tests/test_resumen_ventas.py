@@ -0,0 +1,71 @@
+"""Los resúmenes diarios suman cada venta una sola vez, sin importar el orden en que se confirman"""
+from datetime import datetime
+from sqlalchemy import event, func
+from sqlalchemy.sql.dml import UpdateBase
+from src.models.cliente import Cliente
+from src.models.farmacia import Farmacia
+from src.models.inventario import Inventario
+from src.models.venta import Venta, VentaDetalle
+from src.models.venta_diaria import VentaDiaria, VentaDiariaPago
+from src.services.resumen_ventas import acumular_ventas, reconstruir_resumenes
+
+def cargar_datos(bd):
+    farmacia = Farmacia(nombre='Farmacia')
+    cliente = Cliente(nombre='Cliente')
+    bd.session.add_all([farmacia, cliente])
+    bd.session.flush()
+    producto = Inventario(farmacia_id=farmacia.id, codigo='C1', descripcion='Producto', laboratorio='LAB', precio=10.0, precio_neto=10.0, pedido=100)
+    bd.session.add(producto)
+    bd.session.commit()
+    return farmacia, cliente, producto
+
+def vender(bd, farmacia, cliente, producto, cantidad, venta_id=None):
+    venta = Venta(id=venta_id, cliente_id=cliente.id, farmacia_id=farmacia.id, total=10.0 * cantidad,
+                  metodo_pago='efectivo', fecha=datetime(2024, 5, 1, 12))
+    bd.session.add(venta)
+    bd.session.flush()
+    bd.session.add(VentaDetalle(venta_id=venta.id, inventario_id=producto.id, cantidad=cantidad, precio=10.0))
+    acumular_ventas()
+    bd.session.commit()
+
+def totales(bd):
+    unidades = bd.session.query(func.sum(VentaDiaria.cantidad)).scalar()
+    ventas = bd.session.query(func.sum(VentaDiariaPago.cantidad)).scalar()
+    return unidades, ventas
+
+def test_venta_confirmada_con_id_menor_se_acumula(bd):
+    farmacia, cliente, producto = cargar_datos(bd)
+    vender(bd, farmacia, cliente, producto, 2, venta_id=20)
+    # Una venta con un id menor que se confirma después (p. ej. una transacción más lenta)
+    vender(bd, farmacia, cliente, producto, 3, venta_id=10)
+
+    assert totales(bd) == (5, 2)
+    assert bd.session.query(Venta).filter(Venta.acumulada == False).count() == 0
+    assert acumular_ventas() == 0
+
+def test_reconstruir_da_los_mismos_totales(bd):
+    farmacia, cliente, producto = cargar_datos(bd)
+    for cantidad in (1, 2, 3):
+        vender(bd, farmacia, cliente, producto, cantidad)
+
+    assert totales(bd) == (6, 3)
+    reconstruir_resumenes()
+    assert totales(bd) == (6, 3)
+
+def test_analitica_no_escribe(bd, client):
+    farmacia, cliente, producto = cargar_datos(bd)
+    vender(bd, farmacia, cliente, producto, 4)
+
+    escrituras = []
+    def registrar(conexion, sentencia, *args):
+        if isinstance(sentencia, UpdateBase):
+            escrituras.append(sentencia)
+    event.listen(bd.engine, 'before_execute', registrar)
+    try:
+        respuesta = client.get('/api/analitica/mas-vendidos?desde=2024-05-01&hasta=2024-05-01')
+    finally:
+        event.remove(bd.engine, 'before_execute', registrar)
+
+    assert respuesta.status_code == 200
+    assert respuesta.json['productos'][0]['cantidad'] == 4
+    assert escrituras == []
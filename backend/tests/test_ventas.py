@@ -0,0 +1,91 @@
+"""El stock nunca queda negativo: las ventas sin stock se rechazan sin afectar a las demás"""
+import pytest
+from sqlalchemy import update
+from src.models.cliente import Cliente
+from src.models.farmacia import Farmacia
+from src.models.inventario import Inventario
+from src.models.venta import Venta
+from src.services import ventas as servicio_ventas
+from src.services.ventas import MAX_VENTAS_LOTE, SobreventaError, descontar_stock
+
+def cargar_datos(bd, stock=5):
+    farmacia = Farmacia(nombre='Farmacia')
+    cliente = Cliente(nombre='Cliente')
+    bd.session.add_all([farmacia, cliente])
+    bd.session.flush()
+    producto = Inventario(farmacia_id=farmacia.id, codigo='C1', descripcion='Producto', laboratorio='LAB',
+                          precio=10.0, precio_neto=10.0, pedido=stock)
+    bd.session.add(producto)
+    bd.session.commit()
+    return farmacia, cliente, producto
+
+def venta(farmacia, cliente, cantidad, codigo='C1'):
+    return {'cliente_id': cliente.id, 'farmacia_id': farmacia.id, 'metodo_pago': 'efectivo',
+            'detalles': [{'codigo': codigo, 'cantidad': cantidad}]}
+
+def stock(bd, producto):
+    bd.session.expire_all()
+    return bd.session.get(Inventario, producto.id).pedido
+
+def test_descontar_stock_exige_stock_suficiente(bd):
+    _, _, producto = cargar_datos(bd, stock=2)
+
+    with pytest.raises(SobreventaError):
+        descontar_stock({producto.id: 3})
+    bd.session.rollback()
+    assert stock(bd, producto) == 2
+
+    descontar_stock({producto.id: 2})
+    bd.session.commit()
+    assert stock(bd, producto) == 0
+
+def test_venta_sin_stock_responde_409(client, bd):
+    farmacia, cliente, producto = cargar_datos(bd)
+
+    respuesta = client.post('/api/ventas', json=venta(farmacia, cliente, 6))
+    assert respuesta.status_code == 409
+    assert stock(bd, producto) == 5
+    assert bd.session.query(Venta).count() == 0
+
+def test_venta_concurrente_responde_409(client, bd, monkeypatch):
+    farmacia, cliente, producto = cargar_datos(bd)
+    cargar_inventario = servicio_ventas._cargar_inventario
+
+    def cargar_y_vender_en_paralelo(ventas):
+        # Otra venta se lleva el stock después de la validación y antes del descuento
+        filas = cargar_inventario(ventas)
+        bd.session.execute(update(Inventario).where(Inventario.id == producto.id).values(pedido=1))
+        return filas
+
+    monkeypatch.setattr(servicio_ventas, '_cargar_inventario', cargar_y_vender_en_paralelo)
+    respuesta = client.post('/api/ventas', json=venta(farmacia, cliente, 3))
+    assert respuesta.status_code == 409
+    assert 'cambió' in respuesta.json['error']
+    assert bd.session.query(Venta).count() == 0
+
+def test_lote_rechaza_solo_las_ventas_invalidas(client, bd):
+    farmacia, cliente, producto = cargar_datos(bd)
+
+    respuesta = client.post('/api/ventas/lote', json={'ventas': [
+        venta(farmacia, cliente, 3),
+        venta(farmacia, cliente, 3),  # Solo quedan 2 unidades
+        venta(farmacia, cliente, 1, codigo='NO-EXISTE'),
+        {'farmacia_id': farmacia.id},
+        venta(farmacia, cliente, 2)
+    ]})
+    assert respuesta.status_code == 201
+    assert respuesta.json['registradas'] == 2
+    assert respuesta.json['rechazadas'] == 3
+    resultados = respuesta.json['resultados']
+    assert [resultado['indice'] for resultado in resultados] == [0, 1, 2, 3, 4]
+    assert resultados[1]['sin_stock'] and not resultados[2]['sin_stock']
+    assert 'error' in resultados[3] and 'id' in resultados[4]
+    assert stock(bd, producto) == 0
+    assert bd.session.query(Venta).count() == 2
+
+def test_lote_con_demasiadas_ventas_responde_400(client, bd):
+    farmacia, cliente, producto = cargar_datos(bd)
+
+    respuesta = client.post('/api/ventas/lote', json={'ventas': [venta(farmacia, cliente, 1)] * (MAX_VENTAS_LOTE + 1)})
+    assert respuesta.status_code == 400
+    assert stock(bd, producto) == 5
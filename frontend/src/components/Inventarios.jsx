@@ -1,6 +1,7 @@
 import { useState, useEffect } from 'react'
 import { Button } from '@/components/ui/button.jsx'
 import { Upload, Download, Search } from 'lucide-react'
+import { esperarImportacion } from '@/lib/importaciones.js'
 
 function Inventarios() {
   const [farmacias, setFarmacias] = useState([])
@@ -63,18 +64,19 @@ function Inventarios() {
         body: formData,
       })
 
-      const result = await response.json()
+      const trabajo = await response.json()
       
       if (response.ok) {
+        const result = await esperarImportacion(trabajo.job_id)
         alert(`Inventario cargado exitosamente. ${result.inventarios_procesados} productos procesados.`)
         setUploadFile(null)
         fetchInventarios()
       } else {
-        alert(`Error: ${result.error}`)
+        alert(`Error: ${trabajo.error}`)
       }
     } catch (error) {
       console.error('Error uploading file:', error)
-      alert('Error al cargar el archivo')
+      alert(`Error al cargar el archivo: ${error.message}`)
     } finally {
       setUploading(false)
     }
@@ -114,11 +116,11 @@ function Inventarios() {
           <div className="space-y-4">
             <div>
               <label className="block text-sm font-medium text-gray-700 mb-1">
-                Archivo Excel (.xlsx, .xls)
+                Archivo Excel o CSV (.xlsx, .csv)
               </label>
               <input
                 type="file"
-                accept=".xlsx,.xls"
+                accept=".xlsx,.csv"
                 onChange={(e) => setUploadFile(e.target.files[0])}
                 className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-blue-500"
               />
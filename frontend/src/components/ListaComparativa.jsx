@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react'
 import { Search, Upload, TrendingUp, Package, Users, ChevronDown, ChevronUp, Percent, CreditCard } from 'lucide-react'
+import { esperarImportacion } from '@/lib/importaciones.js'
 
 const Button = ({ children, onClick, variant = 'default', size = 'default', className = '', ...props }) => {
   const baseClasses = 'inline-flex items-center justify-center rounded-md font-medium transition-colors focus-visible:outline-none focus-visible:ring-2 focus-visible:ring-ring focus-visible:ring-offset-2 disabled:opacity-50 disabled:pointer-events-none ring-offset-background'
@@ -98,18 +99,19 @@ const ListaComparativa = () => {
         body: formData
       })
 
-      const result = await response.json()
+      const trabajo = await response.json()
       
       if (response.ok) {
+        const result = await esperarImportacion(trabajo.job_id)
         alert(`Lista procesada exitosamente:\n- Productos nuevos: ${result.productos_nuevos}\n- Productos actualizados: ${result.productos_actualizados}`)
         fetchProveedores()
         fetchEstadisticas()
         setShowUploadModal(false)
       } else {
-        alert(`Error: ${result.error}`)
+        alert(`Error: ${trabajo.error}`)
       }
     } catch (error) {
-      alert('Error subiendo archivo')
+      alert(`Error subiendo archivo: ${error.message}`)
     }
   }
 
@@ -421,7 +423,7 @@ const ListaComparativa = () => {
                 </label>
                 <input
                   type="file"
-                  accept=".xlsx,.xls"
+                  accept=".xlsx,.csv"
                   onChange={(e) => {
                     if (e.target.files[0] && uploadingProveedor) {
                       handleFileUpload(uploadingProveedor, e.target.files[0])
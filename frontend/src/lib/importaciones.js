@@ -0,0 +1,19 @@
+// Espera a que termine un trabajo de importación en segundo plano
+export async function esperarImportacion(jobId, intervalo = 1000) {
+  while (true) {
+    const response = await fetch(`/api/imports/${jobId}`)
+    const trabajo = await response.json()
+
+    if (!response.ok) {
+      throw new Error(trabajo.error)
+    }
+    if (trabajo.estado === 'completado') {
+      return trabajo.resultado
+    }
+    if (trabajo.estado === 'error') {
+      throw new Error(trabajo.mensaje_error)
+    }
+
+    await new Promise(resolve => setTimeout(resolve, intervalo))
+  }
+}